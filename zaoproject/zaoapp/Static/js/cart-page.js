@@ -0,0 +1,210 @@
+// Cart page: line editing (batched to the cart API) and checkout.
+const cartPage = document.getElementById('cart-page');
+
+// Format price
+function formatMoney(value) {
+  return 'Ksh.' + parseFloat(value).toFixed(2);
+}
+
+// Load cart from backend API
+function loadCart() {
+  fetch(document.body.dataset.cartUrl)
+    .then(response => response.json())
+    .then(data => displayCartItems(data))
+    .catch(error => console.error('Error loading cart:', error));
+}
+
+// Display cart items
+function displayCartItems(data) {
+  const container = document.getElementById('cart-items-container');
+  const subtotalEl = document.getElementById('subtotal');
+  const shippingEl = document.getElementById('shipping');
+  const totalEl = document.getElementById('cart-total');
+
+  const items = data.items || [];
+  const cartTotal = data.total || 0;
+
+  if (items.length === 0) {
+    container.innerHTML = `
+      <div class="alert alert-info text-center">
+        <p>Your cart is empty. <a href="${cartPage.dataset.indexUrl}">Continue shopping</a></p>
+      </div>
+    `;
+    subtotalEl.textContent = formatMoney(0);
+    shippingEl.textContent = formatMoney(0);
+    totalEl.textContent = formatMoney(0);
+    return;
+  }
+
+  // Build cart items table
+  let html = `
+    <div class="table-responsive">
+      <table class="table table-hover">
+        <thead class="table-light">
+          <tr>
+            <th>Product</th>
+            <th>Price</th>
+            <th>Quantity</th>
+            <th>Subtotal</th>
+            <th>Action</th>
+          </tr>
+        </thead>
+        <tbody>
+  `;
+
+  items.forEach(item => {
+    const lineTotal = item.price * item.quantity;
+    html += `
+      <tr>
+        <td>
+          <h6 class="mb-1">${item.name}</h6>
+        </td>
+        <td>${formatMoney(item.price)}</td>
+        <td>
+          <div class="d-flex align-items-center gap-2">
+            <button class="btn btn-sm btn-outline-secondary qty-decrease" data-product-id="${item.product_id}">−</button>
+            <input type="number" class="form-control form-control-sm qty-input" 
+                   value="${item.quantity}" min="1" data-product-id="${item.product_id}" 
+                   style="width: 60px; text-align: center;">
+            <button class="btn btn-sm btn-outline-secondary qty-increase" data-product-id="${item.product_id}">+</button>
+          </div>
+        </td>
+        <td>${formatMoney(lineTotal)}</td>
+        <td>
+          <button class="btn btn-sm btn-danger remove-item" data-product-id="${item.product_id}">
+            Remove
+          </button>
+        </td>
+      </tr>
+    `;
+  });
+
+  const shippingCost = cartTotal > 0 ? 200 : 0;
+  const total = cartTotal + shippingCost;
+
+  html += `
+        </tbody>
+      </table>
+    </div>
+  `;
+
+  container.innerHTML = html;
+
+  // Update totals
+  subtotalEl.textContent = formatMoney(cartTotal);
+  shippingEl.textContent = formatMoney(shippingCost);
+  totalEl.textContent = formatMoney(total);
+
+  // Attach event listeners
+  attachCartEventListeners();
+}
+
+// Line changes are queued and flushed to the batch endpoint together, so a
+// burst of spinner clicks costs one request instead of one per click.
+const pendingOperations = {};
+let flushTimer = null;
+
+function updateCartItem(productId, quantity) {
+  pendingOperations[productId] = { op: 'set', product_id: productId, quantity: quantity };
+  const inputEl = document.querySelector(`input[data-product-id="${productId}"]`);
+  if (inputEl && quantity > 0) {
+    inputEl.value = quantity;
+  }
+  clearTimeout(flushTimer);
+  flushTimer = setTimeout(flushCartOperations, 300);
+}
+
+function flushCartOperations() {
+  const operations = Object.values(pendingOperations);
+  if (operations.length === 0) return;
+  operations.forEach(op => delete pendingOperations[op.product_id]);
+
+  fetch(cartPage.dataset.batchUrl, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]')?.value || '',
+    },
+    body: JSON.stringify({ operations: operations }),
+  })
+    .then(response => response.json())
+    .then(data => {
+      if (data.success) {
+        displayCartItems(data);
+      } else {
+        alert('Error updating cart: ' + (data.error || 'Unknown error'));
+      }
+    })
+    .catch(error => console.error('Error updating cart:', error));
+}
+
+// Attach event listeners for cart actions
+function attachCartEventListeners() {
+  // Quantity increase buttons
+  document.querySelectorAll('.qty-increase').forEach(btn => {
+    btn.addEventListener('click', function() {
+      const productId = parseInt(this.getAttribute('data-product-id'));
+      const inputEl = document.querySelector(`input[data-product-id="${productId}"]`);
+      const newQty = parseInt(inputEl.value) + 1;
+      updateCartItem(productId, newQty);
+    });
+  });
+
+  // Quantity decrease buttons
+  document.querySelectorAll('.qty-decrease').forEach(btn => {
+    btn.addEventListener('click', function() {
+      const productId = parseInt(this.getAttribute('data-product-id'));
+      const inputEl = document.querySelector(`input[data-product-id="${productId}"]`);
+      const newQty = parseInt(inputEl.value) - 1;
+      if (newQty > 0) {
+        updateCartItem(productId, newQty);
+      }
+    });
+  });
+
+  // Quantity input fields
+  document.querySelectorAll('.qty-input').forEach(input => {
+    input.addEventListener('change', function() {
+      const productId = parseInt(this.getAttribute('data-product-id'));
+      const newQty = parseInt(this.value);
+      if (newQty > 0) {
+        updateCartItem(productId, newQty);
+      } else {
+        this.value = '1';
+      }
+    });
+  });
+
+  // Remove item buttons
+  document.querySelectorAll('.remove-item').forEach(btn => {
+    btn.addEventListener('click', function() {
+      const productId = parseInt(this.getAttribute('data-product-id'));
+      if (confirm('Remove this item from cart?')) {
+        updateCartItem(productId, 0);
+      }
+    });
+  });
+}
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+  loadCart();
+});
+
+// Checkout button
+document.getElementById('checkout-btn').addEventListener('click', function() {
+  fetch(document.body.dataset.cartUrl)
+    .then(response => response.json())
+    .then(data => {
+      if (data.items.length === 0) {
+        alert('Your cart is empty. Add items before checking out.');
+        return;
+      }
+      window.location.href = cartPage.dataset.orderUrl;
+    });
+});
+
+// Reload cart when page comes into focus
+window.addEventListener('focus', function() {
+  loadCart();
+});
@@ -0,0 +1,288 @@
+// Storefront cart: sidebar, add-to-cart buttons and server-pushed updates.
+(function () {
+  // DOM elements
+  const badge = document.getElementById('cart-badge-count');
+  const sidebarCount = document.getElementById('cart-sidebar-count');
+  const sidebarItems = document.getElementById('cart-sidebar-items');
+  const sidebarTotal = document.getElementById('cart-sidebar-total');
+  // URLs and login state come from data-* attributes on <body>
+  const config = document.body.dataset;
+  const isUserAuthenticated = config.authenticated;
+
+  // Get CSRF token from cookie
+  function getCsrfToken() {
+    let csrfToken = '';
+    const name = 'csrftoken';
+    if (document.cookie && document.cookie !== '') {
+      const cookies = document.cookie.split(';');
+      for (let i = 0; i < cookies.length; i++) {
+        const cookie = cookies[i].trim();
+        if (cookie.substring(0, name.length + 1) === (name + '=')) {
+          csrfToken = decodeURIComponent(cookie.substring(name.length + 1));
+          break;
+        }
+      }
+    }
+    return csrfToken;
+  }
+
+  function formatMoney(value) {
+    return 'Ksh.' + parseFloat(value).toFixed(2);
+  }
+
+  // Last cart state shown, so pushed deltas can be applied locally
+  let cartState = { items: [], total: 0 };
+  let cartSocket = null;
+  let reconnectDelay = 1000;
+
+  // Apply a change pushed by the server to the displayed cart
+  function applyCartEvent(message) {
+    const payload = message.data || {};
+    if (message.type === 'cart_update') {
+      updateCartDisplay(payload);
+    } else if (message.type === 'cart_patch') {
+      // Several events merged by the server: optional snapshot, then line changes
+      if (payload.snapshot) {
+        updateCartDisplay(payload.snapshot);
+      }
+      applyLineChanges(payload.lines || []);
+    } else if (message.type === 'cart_item_removed') {
+      applyLineChanges([{ product_id: payload.product_id, quantity: 0 }]);
+    } else if (message.type === 'cart_item_added') {
+      applyLineChanges([payload]);
+    }
+  }
+
+  function applyLineChanges(lines) {
+    if (lines.length === 0) return;
+    const items = cartState.items.slice();
+    for (const line of lines) {
+      const index = items.findIndex(item => item.product_id === line.product_id);
+      if (line.quantity === 0) {
+        if (index !== -1) {
+          items.splice(index, 1);
+        }
+      } else if (index !== -1) {
+        items[index] = Object.assign({}, items[index], { quantity: line.quantity });
+      } else {
+        // A line we have no name/price for yet; the ETag makes this cheap.
+        loadCartFromBackend();
+        return;
+      }
+    }
+    const total = items.reduce((sum, item) => sum + item.price * item.quantity, 0);
+    updateCartDisplay({ items: items, total: total });
+  }
+
+  // Server-driven cart updates for this user only (choose ws/wss by page protocol)
+  function connectCartSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    cartSocket = new WebSocket(`${protocol}://${window.location.host}/ws/cart/`);
+
+    cartSocket.onopen = function() {
+      reconnectDelay = 1000;
+      // Catch up on anything missed while disconnected
+      loadCartFromBackend();
+    };
+
+    cartSocket.onmessage = function(e) {
+      applyCartEvent(JSON.parse(e.data));
+    };
+
+    cartSocket.onclose = function() {
+      setTimeout(connectCartSocket, reconnectDelay);
+      reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+    };
+  }
+
+  // Load cart from backend API (only if user is authenticated)
+  function loadCartFromBackend() {
+    if (isUserAuthenticated !== 'true') {
+      // User not authenticated, show empty cart
+      if (sidebarItems) {
+        sidebarItems.innerHTML = '<li class="list-group-item text-center text-muted">Log in to view your cart.</li>';
+      }
+      return;
+    }
+
+    fetch(config.cartUrl)
+      .then(response => response.json())
+      .then(data => updateCartDisplay(data))
+      .catch(error => console.error('Error loading cart from backend:', error));
+  }
+
+  function updateCartDisplay(data) {
+    // Calculate totals
+    const items = data.items || [];
+    const cartTotal = data.total || 0;
+    cartState = { items: items, total: cartTotal };
+
+    let totalQty = 0;
+    items.forEach(item => {
+      totalQty += item.quantity;
+    });
+
+    // Update badge
+    if (badge) {
+      badge.textContent = totalQty || 0;
+    }
+
+    // Update sidebar count
+    if (sidebarCount) {
+      sidebarCount.textContent = totalQty || 0;
+    }
+
+    // Update sidebar items list
+    if (sidebarItems) {
+      sidebarItems.innerHTML = '';
+
+      if (totalQty === 0) {
+        sidebarItems.innerHTML = '<li class="list-group-item text-center text-muted">Your cart is empty.</li>';
+      } else {
+        items.forEach(item => {
+          const li = document.createElement('li');
+          li.className = 'list-group-item d-flex justify-content-between lh-sm';
+          const lineTotal = item.price * item.quantity;
+          li.innerHTML = 
+            '<div>' +
+              '<h6 class="my-0">' + item.name + '</h6>' +
+              '<small class="text-body-secondary">Qty: ' + item.quantity + '</small>' +
+            '</div>' +
+            '<span class="text-body-secondary">' + formatMoney(lineTotal) + '</span>';
+          sidebarItems.appendChild(li);
+        });
+      }
+    }
+
+    // Update sidebar total
+    if (sidebarTotal) {
+      sidebarTotal.textContent = formatMoney(cartTotal);
+    }
+  }
+
+  // Add item to backend cart
+  function addToBackendCart(productId, quantity) {
+    if (isUserAuthenticated !== 'true') {
+      alert('Please log in to add items to your cart.');
+      window.location.href = config.loginUrl;
+      return;
+    }
+
+    const csrfToken = getCsrfToken();
+    console.log('CSRF Token:', csrfToken);
+
+    fetch(config.cartUpdateUrl, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-CSRFToken': csrfToken,
+      },
+      body: JSON.stringify({
+        product_id: productId,
+        quantity: quantity,
+      }),
+    })
+      .then(response => response.json())
+      .then(data => {
+        if (data.success) {
+          updateCartDisplay(data);
+        } else {
+          alert('Error adding item to cart: ' + (data.error || 'Unknown error'));
+        }
+      })
+      .catch(error => console.error('Error adding to cart:', error));
+  }
+
+  // Load cart on page load
+  loadCartFromBackend();
+
+  // Handle add to cart clicks
+  document.addEventListener('click', function (e) {
+    const btn = e.target.closest('.btn-cart');
+    if (!btn) return;
+    e.preventDefault();
+
+    // Get product data from data attributes
+    let productId = btn.getAttribute('data-product-id');
+    let productName = btn.getAttribute('data-product-name');
+    let productPrice = btn.getAttribute('data-product-price');
+
+    console.log('Button clicked - Debug info:', {
+      productId,
+      productName,
+      productPrice,
+      buttonHTML: btn.outerHTML
+    });
+
+    // Find the quantity input in the same product card
+    let qty = 1;
+    const container = btn.closest('.button-area');
+    if (container) {
+      const input = container.querySelector('input.quantity');
+      if (input) {
+        const val = parseInt(input.value, 10);
+        if (!isNaN(val) && val > 0) {
+          qty = val;
+        }
+      }
+    }
+
+    // If productId provided, parse and proceed
+    if (productId) {
+      productId = parseInt(productId, 10);
+      if (isNaN(productId)) {
+        alert('Error: Invalid product ID: ' + productId);
+        return;
+      }
+
+      console.log('Adding to cart (direct):', { productId, productName, productPrice, qty });
+      addToBackendCart(productId, qty);
+      return;
+    }
+
+    // Fallback: if productId missing, attempt to lookup by product name
+    if (!productName) {
+      alert('Error: Product ID and name are missing. Cannot add to cart.');
+      return;
+    }
+
+    // Call product lookup endpoint
+    fetch(config.productFindUrl + '?name=' + encodeURIComponent(productName))
+      .then(resp => {
+        if (!resp.ok) throw new Error('Product lookup failed');
+        return resp.json();
+      })
+      .then(data => {
+        if (data && data.id) {
+          console.log('Adding to cart (lookup):', { productId: data.id, productName: data.name, productPrice: data.price, qty });
+          addToBackendCart(data.id, qty);
+        } else {
+          alert('Product lookup did not return an id.');
+        }
+      })
+      .catch(err => {
+        console.error('Product lookup error:', err);
+        alert('Could not find product by name. Please contact support.');
+      });
+
+    // Show success feedback
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '<svg width="18" height="18"><use xlink:href="#check"></use></svg> Added!';
+    btn.classList.add('disabled');
+    setTimeout(() => {
+      btn.innerHTML = originalText;
+      btn.classList.remove('disabled');
+    }, 2000);
+  });
+
+  if (isUserAuthenticated === 'true') {
+    connectCartSocket();
+  }
+
+  // Reload cart when page comes into focus, unless updates are being pushed
+  window.addEventListener('focus', function() {
+    if (!cartSocket || cartSocket.readyState !== WebSocket.OPEN) {
+      loadCartFromBackend();
+    }
+  });
+})();
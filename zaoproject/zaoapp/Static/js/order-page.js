@@ -0,0 +1,282 @@
+// Checkout page: order summary from the server cart, and placing the order.
+const orderPage = document.getElementById('order-page');
+
+// Idempotency key of the checkout attempt in progress. It is kept until the
+// server confirms the order, so a retry (or a reload after a lost response)
+// cannot place the order twice.
+const checkoutKeyStorage = 'zaoconnect_checkout_key';
+const checkoutRetries = 3;
+
+// East African countries and their counties
+const countriesData = {
+  KE: {
+    name: 'Kenya',
+    code: '+254',
+    counties: [
+      'Nairobi',
+      'Mombasa',
+      'Kisumu',
+      'Nakuru',
+      'Machakos',
+      'Kericho',
+      'Eldoret',
+      'Nyeri',
+      'Murang\'a',
+      'Kiambu'
+    ]
+  },
+  UG: {
+    name: 'Uganda',
+    code: '+256',
+    counties: [
+      'Kampala',
+      'Jinja',
+      'Gulu',
+      'Lira',
+      'Mbale',
+      'Mbarara',
+      'Kasese',
+      'Masaka',
+      'Fort Portal',
+      'Arua'
+    ]
+  },
+  TZ: {
+    name: 'Tanzania',
+    code: '+255',
+    counties: [
+      'Dar es Salaam',
+      'Dodoma',
+      'Arusha',
+      'Moshi',
+      'Iringa',
+      'Mbeya',
+      'Songea',
+      'Tabora',
+      'Mwanza',
+      'Kigoma'
+    ]
+  },
+  RW: {
+    name: 'Rwanda',
+    code: '+250',
+    counties: [
+      'Kigali',
+      'Muhanga',
+      'Huye',
+      'Ruhengeri',
+      'Gitarama',
+      'Butare',
+      'Gisenyi',
+      'Cyangugu',
+      'Rwamagana',
+      'Kayonza'
+    ]
+  },
+  BU: {
+    name: 'Burundi',
+    code: '+257',
+    counties: [
+      'Bujumbura',
+      'Gitega',
+      'Ngozi',
+      'Muyinga',
+      'Kirundo',
+      'Cankuzo',
+      'Ruyigi',
+      'Muramvya',
+      'Nzeyimana',
+      'Makamba'
+    ]
+  },
+  ET: {
+    name: 'Ethiopia',
+    code: '+251',
+    counties: [
+      'Addis Ababa',
+      'Dire Dawa',
+      'Adama',
+      'Awasa',
+      'Mekelle',
+      'Bahir Dar',
+      'Gondar',
+      'Adwa',
+      'Jijiga',
+      'Harar'
+    ]
+  },
+  SS: {
+    name: 'South Sudan',
+    code: '+211',
+    counties: [
+      'Juba',
+      'Wau',
+      'Malakal',
+      'Kassala',
+      'Bentiu',
+      'Yambio',
+      'Torit',
+      'Renk',
+      'Kapoeta',
+      'Gogrial'
+    ]
+  }
+};
+
+// Format money function
+function formatMoney(value) {
+  return 'Ksh.' + parseFloat(value).toFixed(2);
+}
+
+function escapeHtml(text) {
+  const div = document.createElement('div');
+  div.textContent = text;
+  return div.innerHTML;
+}
+
+// Display order summary from the server cart
+function displayOrderSummary(data) {
+  const container = document.getElementById('order-items-summary');
+  const items = data.items || [];
+
+  if (items.length === 0) {
+    container.innerHTML = `
+      <div class="alert alert-warning">
+        <p class="mb-0">Your cart is empty. <a href="${orderPage.dataset.indexUrl}">Continue shopping</a></p>
+      </div>
+    `;
+    document.querySelector('#checkout-form button[type=submit]').disabled = true;
+    return;
+  }
+
+  let html = '<div class="mb-3">';
+  items.forEach(item => {
+    html += `
+      <div class="d-flex justify-content-between mb-2 small">
+        <div>
+          <span class="text-dark">${escapeHtml(item.name)}</span><br>
+          <span class="text-muted">×${item.quantity}</span>
+        </div>
+        <span class="fw-semibold">${formatMoney(item.price * item.quantity)}</span>
+      </div>
+    `;
+  });
+  html += '</div>';
+  container.innerHTML = html;
+  showTotals(data.total, 200);
+}
+
+function showTotals(subtotal, shipping) {
+  document.getElementById('summary-subtotal').textContent = formatMoney(subtotal);
+  document.getElementById('summary-shipping').textContent = formatMoney(shipping);
+  document.getElementById('summary-total').textContent = formatMoney(subtotal + shipping);
+}
+
+function loadOrderSummary() {
+  fetch(document.body.dataset.cartUrl)
+    .then(response => response.json())
+    .then(displayOrderSummary)
+    .catch(error => console.error('Error loading cart:', error));
+}
+
+// Update counties based on selected country
+function updateCounties() {
+  const countrySelect = document.getElementById('country-select');
+  const countySelect = document.getElementById('county-select');
+  const countryCodeSpan = document.getElementById('country-code');
+  const selectedCountry = countrySelect.value;
+
+  countySelect.innerHTML = '<option value="">Select a county...</option>';
+  if (selectedCountry && countriesData[selectedCountry]) {
+    const countryData = countriesData[selectedCountry];
+    countryCodeSpan.textContent = countryData.code;
+    countryData.counties.forEach(county => {
+      const option = document.createElement('option');
+      option.value = county;
+      option.textContent = county;
+      countySelect.appendChild(option);
+    });
+  }
+}
+
+function checkoutKey() {
+  let key = sessionStorage.getItem(checkoutKeyStorage);
+  if (!key) {
+    key = crypto.randomUUID ? crypto.randomUUID() : String(Date.now()) + Math.random().toString(36).slice(2);
+    sessionStorage.setItem(checkoutKeyStorage, key);
+  }
+  return key;
+}
+
+// POST the order, retrying network failures with the same key.
+function submitOrder(payload, attempt = 1) {
+  return fetch(orderPage.dataset.checkoutUrl, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]')?.value || '',
+    },
+    body: JSON.stringify(payload),
+  }).catch(error => {
+    if (attempt >= checkoutRetries) throw error;
+    return new Promise(resolve => setTimeout(resolve, 1000 * attempt))
+      .then(() => submitOrder(payload, attempt + 1));
+  });
+}
+
+function showConfirmation(order) {
+  const confirmation = document.getElementById('order-confirmation');
+  confirmation.innerHTML = `
+    <h5 class="alert-heading">Order #${order.id} placed</h5>
+    <p class="mb-0">Total ${formatMoney(order.total)}. We will contact you about payment and delivery.</p>
+  `;
+  confirmation.classList.remove('d-none');
+  document.getElementById('checkout-form').classList.add('d-none');
+  showTotals(order.subtotal, order.shipping);
+}
+
+// Handle form submission
+document.getElementById('checkout-form').addEventListener('submit', function (e) {
+  e.preventDefault();
+
+  const country = document.getElementById('country-select').value;
+  const county = document.getElementById('county-select').value;
+  const mobile = document.getElementById('mobile-number').value.trim();
+  const address = document.getElementById('delivery-address').value;
+
+  if (!country || !county || !mobile) {
+    alert('Please fill in all required fields (Country, County, Mobile Number)');
+    return;
+  }
+
+  const submitButton = this.querySelector('button[type=submit]');
+  submitButton.disabled = true;
+  submitOrder({
+    idempotency_key: checkoutKey(),
+    country: country,
+    county: county,
+    mobile_number: countriesData[country].code + mobile,
+    delivery_address: address,
+  })
+    .then(response => response.json().then(data => ({ ok: response.ok, data: data })))
+    .then(({ ok, data }) => {
+      if (ok) {
+        sessionStorage.removeItem(checkoutKeyStorage);
+        showConfirmation(data);
+      } else {
+        submitButton.disabled = false;
+        alert('Could not place the order: ' + (data.error || 'Unknown error'));
+      }
+    })
+    .catch(error => {
+      submitButton.disabled = false;
+      console.error('Error placing order:', error);
+      alert('Could not reach the server. Please check your connection and try again.');
+    });
+});
+
+// Initialize
+document.getElementById('country-select').value = 'KE';
+updateCounties();
+document.getElementById('country-select').addEventListener('change', updateCounties);
+loadOrderSummary();
@@ -0,0 +1,206 @@
+// Wishlist functionality - similar to cart
+(function() {
+  const wishlistStorageKey = 'zaoconnect_wishlist';
+  let wishlist = {};
+
+  const wishlistBadge = document.getElementById('wishlist-badge-count');
+  const wishlistSidebarCount = document.getElementById('wishlist-sidebar-count');
+  const wishlistSidebarItems = document.getElementById('wishlist-sidebar-items');
+  const moveToCartBtn = document.getElementById('move-to-cart-btn');
+  const clearWishlistBtn = document.getElementById('clear-wishlist-btn');
+
+  // Load wishlist from localStorage
+  function loadWishlistFromStorage() {
+    try {
+      const stored = localStorage.getItem(wishlistStorageKey);
+      wishlist = stored ? JSON.parse(stored) : {};
+      console.log('Wishlist loaded from localStorage:', wishlist);
+    } catch (e) {
+      console.error('Error loading wishlist from localStorage:', e);
+      wishlist = {};
+    }
+  }
+
+  // Save wishlist to localStorage
+  function saveWishlistToStorage() {
+    try {
+      localStorage.setItem(wishlistStorageKey, JSON.stringify(wishlist));
+      console.log('Wishlist saved to localStorage');
+    } catch (e) {
+      console.error('Error saving wishlist to localStorage:', e);
+    }
+  }
+
+  function updateWishlistDisplay() {
+    let totalItems = 0;
+
+    for (const productId in wishlist) {
+      totalItems++;
+    }
+
+    // Update badge
+    if (wishlistBadge) {
+      wishlistBadge.textContent = totalItems || 0;
+    }
+
+    // Update sidebar count
+    if (wishlistSidebarCount) {
+      wishlistSidebarCount.textContent = totalItems || 0;
+    }
+
+    // Update sidebar items list
+    if (wishlistSidebarItems) {
+      wishlistSidebarItems.innerHTML = '';
+
+      if (totalItems === 0) {
+        wishlistSidebarItems.innerHTML = '<li class="list-group-item text-center text-muted">Your wishlist is empty.</li>';
+        moveToCartBtn.disabled = true;
+        clearWishlistBtn.disabled = true;
+      } else {
+        for (const productId in wishlist) {
+          const item = wishlist[productId];
+          const li = document.createElement('li');
+          li.className = 'list-group-item d-flex justify-content-between align-items-center';
+          li.innerHTML = 
+            '<div>' +
+              '<h6 class="my-0">' + item.name + '</h6>' +
+              '<small class="text-body-secondary">' + formatMoney(item.price) + '</small>' +
+            '</div>' +
+            '<button class="btn btn-sm btn-outline-danger remove-from-wishlist" data-product-id="' + productId + '">Remove</button>';
+          wishlistSidebarItems.appendChild(li);
+        }
+        moveToCartBtn.disabled = false;
+        clearWishlistBtn.disabled = false;
+      }
+    }
+
+    saveWishlistToStorage();
+  }
+
+  // Add to wishlist
+  function addToWishlist(productId, productName, productPrice) {
+    if (!wishlist[productId]) {
+      wishlist[productId] = {
+        name: productName,
+        price: productPrice
+      };
+      updateWishlistDisplay();
+      console.log('Item added to wishlist:', { productId, productName, productPrice });
+    } else {
+      console.log('Item already in wishlist');
+    }
+  }
+
+  // Remove from wishlist
+  function removeFromWishlist(productId) {
+    if (wishlist[productId]) {
+      delete wishlist[productId];
+      updateWishlistDisplay();
+      console.log('Item removed from wishlist:', productId);
+    }
+  }
+
+  // Handle add to wishlist clicks (heart icon on products)
+  document.addEventListener('click', function(e) {
+    const btn = e.target.closest('.btn-wishlist');
+    if (!btn) return;
+    e.preventDefault();
+
+    let productId = btn.getAttribute('data-product-id');
+    let productName = btn.getAttribute('data-product-name') || 'Product';
+    let productPrice = parseFloat(btn.getAttribute('data-product-price') || '0');
+
+    // If missing productId, generate one from the product name
+    if (!productId) {
+      const productItem = btn.closest('.product-item');
+      if (productItem) {
+        const nameEl = productItem.querySelector('h3');
+        if (nameEl) {
+          productName = nameEl.textContent.trim();
+        }
+
+        const priceEl = productItem.querySelector('.text-dark.fw-semibold');
+        if (priceEl) {
+          const priceText = priceEl.textContent.trim();
+          const priceMatch = priceText.match(/Ksh\.[\s]*(\d+(?:\.\d{2})?)/);
+          if (priceMatch && priceMatch[1]) {
+            productPrice = parseFloat(priceMatch[1]);
+          }
+        }
+      }
+
+      productId = 'product_' + productName.replace(/\s+/g, '_').toLowerCase();
+    }
+
+    if (!productId || productPrice <= 0) {
+      console.warn('Missing or invalid product data', { productId, productName, productPrice });
+      return;
+    }
+
+    addToWishlist(productId, productName, productPrice);
+
+    // Show success feedback
+    const originalHTML = btn.innerHTML;
+    btn.innerHTML = '<svg width="18" height="18"><use xlink:href="#check"></use></svg>';
+    btn.classList.add('disabled');
+    setTimeout(() => {
+      btn.innerHTML = originalHTML;
+      btn.classList.remove('disabled');
+    }, 1500);
+  });
+
+  // Remove from wishlist sidebar
+  document.addEventListener('click', function(e) {
+    const btn = e.target.closest('.remove-from-wishlist');
+    if (!btn) return;
+    const productId = btn.getAttribute('data-product-id');
+    removeFromWishlist(productId);
+  });
+
+  // Move all to cart
+  moveToCartBtn.addEventListener('click', function() {
+    if (Object.keys(wishlist).length === 0) return;
+
+    for (const productId in wishlist) {
+      const item = wishlist[productId];
+      // Add to cart using the cart functionality
+      if (cart[productId]) {
+        cart[productId].qty += 1;
+      } else {
+        cart[productId] = {
+          name: item.name,
+          price: item.price,
+          qty: 1
+        };
+      }
+    }
+
+    updateCartDisplay();
+
+    // Clear wishlist
+    wishlist = {};
+    updateWishlistDisplay();
+
+    // Close wishlist sidebar and show message
+    const wishlistOffcanvas = document.getElementById('offcanvasWishlist');
+    const offcanvas = new bootstrap.Offcanvas(wishlistOffcanvas);
+    offcanvas.hide();
+
+    alert('✓ All items moved to cart!');
+  });
+
+  // Clear wishlist
+  clearWishlistBtn.addEventListener('click', function() {
+    if (Object.keys(wishlist).length === 0) return;
+
+    if (confirm('Clear your entire wishlist?')) {
+      wishlist = {};
+      updateWishlistDisplay();
+      console.log('Wishlist cleared');
+    }
+  });
+
+  // Initialize wishlist on page load
+  loadWishlistFromStorage();
+  updateWishlistDisplay();
+})();
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import Contact, Product, Cart, CartItem
+from . import inventory
+from .models import ArchivedCart, Contact, Product, Cart, CartItem, Job, Order, OrderLine
 
 
 @admin.register(Product)
@@ -13,15 +14,23 @@ class ProductAdmin(admin.ModelAdmin):
     fields = ('name', 'description', 'price', 'stock', 'is_active', 'image', 'image_preview', 'created_at', 'updated_at')
     readonly_fields = ('image_preview', 'created_at', 'updated_at')
 
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == 'stock':
+            kwargs['show_hidden_initial'] = True  # see inventory.save_product
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        inventory.save_product(obj, form)
+
     def image_thumb(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="width:48px;height:48px;object-fit:cover;border-radius:4px;" />', obj.image.url)
+            return format_html('<img src="{}" style="width:48px;height:48px;object-fit:cover;border-radius:4px;" />', obj.thumbnail_url)
         return '—'
     image_thumb.short_description = 'Image'
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width:200px;border-radius:8px;" />', obj.image.url)
+            return format_html('<img src="{}" style="max-width:200px;border-radius:8px;" />', obj.image_url_for(400))
         return 'No image uploaded'
     image_preview.short_description = 'Preview'
 
@@ -35,21 +44,56 @@ class ContactAdmin(admin.ModelAdmin):
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
-    readonly_fields = ('product', 'quantity', 'created_at', 'updated_at')
-    fields = ('product', 'quantity', 'created_at', 'updated_at')
+    readonly_fields = ('product', 'quantity', 'unit_price', 'created_at', 'updated_at')
+    fields = ('product', 'quantity', 'unit_price', 'created_at', 'updated_at')
 
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'created_at', 'updated_at')
+    list_display = ('user', 'item_count', 'total', 'created_at', 'updated_at')
     search_fields = ('user__username', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('item_count', 'total', 'created_at', 'updated_at')
     inlines = [CartItemInline]
 
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-    list_display = ('cart', 'product', 'quantity', 'created_at')
+    list_display = ('cart', 'product', 'quantity', 'unit_price', 'reserved_quantity', 'reserved_until', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('cart__user__username', 'product__name')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('unit_price', 'reserved_quantity', 'reserved_until', 'created_at', 'updated_at')
+
+
+@admin.register(ArchivedCart)
+class ArchivedCartAdmin(admin.ModelAdmin):
+    list_display = ('user', 'item_count', 'total', 'last_active', 'archived_at')
+    list_filter = ('archived_at',)
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'item_count', 'total', 'lines', 'last_active', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+    can_delete = False
+    readonly_fields = ('product', 'product_name', 'unit_price', 'quantity')
+    fields = ('product', 'product_name', 'unit_price', 'quantity')
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'total', 'county', 'created_at')
+    list_filter = ('status', 'country', 'created_at')
+    search_fields = ('user__username', 'mobile_number')
+    readonly_fields = ('user', 'idempotency_key', 'subtotal', 'shipping', 'total', 'created_at')
+    inlines = [OrderLineInline]
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'user', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'worker')
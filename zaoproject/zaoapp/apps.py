@@ -7,3 +7,4 @@ class ZaoappConfig(AppConfig):
 
     def ready(self):
         import zaoapp.signals
+        import zaoapp.tasks
@@ -0,0 +1,34 @@
+"""Authentication for async views.
+
+Django 4.2 loads ``request.user`` lazily with synchronous queries, which an
+async view may not run, and its ``login_required`` does not support
+coroutines. ``aget_user`` runs Django's own ``get_user`` in a thread, so the
+configured session engine, authentication backends and session hash checks
+apply exactly as they do to sync views. (Django 5.0's ``request.auser()``
+does the same.)
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.contrib.auth.views import redirect_to_login
+
+
+async def aget_user(request):
+    """Resolve ``request.user`` without blocking the event loop and return it."""
+    user = request.__dict__.get('_async_user')
+    if user is None:
+        user = await sync_to_async(get_user)(request)
+        request._async_user = request.user = user
+    return user
+
+
+def alogin_required(view):
+    """``login_required`` for async views."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
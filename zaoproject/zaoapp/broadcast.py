@@ -0,0 +1,29 @@
+"""Server-side publishing of cart changes to the owner's WebSocket group."""
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def cart_group_name(user_id):
+    return f'cart_user_{user_id}'
+
+
+def publish_cart_event(user_id, event_type, data):
+    """Send ``data`` to the user's sockets once the current transaction commits.
+
+    The frame is encoded here once and forwarded as-is by every consumer.
+    """
+    text = json.dumps({'type': event_type, 'data': data})
+
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(
+            cart_group_name(user_id),
+            {'type': event_type, 'data': data, 'text': text},
+        )
+
+    transaction.on_commit(send)
@@ -0,0 +1,128 @@
+"""Expiry of idle carts.
+
+A cart nobody has changed for ``CART_IDLE_TTL`` seconds is deleted with its
+lines, optionally keeping a copy of what it held as an ``ArchivedCart``.
+Empty carts go sooner, after ``CART_EMPTY_IDLE_TTL``. A user whose cart was
+purged gets a new one on their next cart write (see ``carts``).
+
+Carts are found oldest first along the ``updated_at`` indexes and deleted a
+batch at a time, each batch in its own short transaction, so SQLite's
+database-wide write lock is never held for longer than one batch. A cart
+changed after it was selected is skipped.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from . import inventory
+from .models import ArchivedCart, Cart, CartItem
+
+PURGE_BATCH = 200
+
+
+def idle_ttl():
+    return timedelta(seconds=getattr(settings, 'CART_IDLE_TTL', 30 * 24 * 60 * 60))
+
+
+def empty_idle_ttl():
+    return timedelta(seconds=getattr(settings, 'CART_EMPTY_IDLE_TTL', 24 * 60 * 60))
+
+
+def idle_carts(now=None):
+    """The carts due for purging as ``(querysets, cutoff)`` pairs, empty carts first."""
+    now = now or timezone.now()
+    return [
+        (Cart.objects.filter(item_count=0), now - empty_idle_ttl()),
+        (Cart.objects.all(), now - idle_ttl()),
+    ]
+
+
+def purge_idle_carts(archive=False, batch_size=PURGE_BATCH, pause=0, dry_run=False, now=None):
+    """Delete idle carts; returns counts of ``carts``, ``lines``, ``archived`` and ``batches``.
+
+    ``pause`` seconds are slept between batches to let other writers in.
+    With ``dry_run`` the carts are only counted.
+    """
+    stats = {'carts': 0, 'lines': 0, 'archived': 0, 'batches': 0}
+    for carts, cutoff in idle_carts(now):
+        carts = carts.filter(updated_at__lt=cutoff)
+        if dry_run:
+            stats['carts'] += carts.count()
+            stats['lines'] += CartItem.objects.filter(cart__in=carts).count()
+            continue
+        last = None
+        while True:
+            page = carts.order_by('updated_at', 'pk')
+            if last is not None:
+                # Seek past the previous batch, so skipped carts are not retried.
+                page = page.filter(Q(updated_at__gt=last[0]) | Q(updated_at=last[0], pk__gt=last[1]))
+            batch = list(page.values_list('updated_at', 'pk')[:batch_size])
+            if not batch:
+                break
+            last = batch[-1]
+            purged = _purge_batch(carts, [pk for _, pk in batch], archive)
+            for key, count in purged.items():
+                stats[key] += count
+            stats['batches'] += 1
+            if pause:
+                time.sleep(pause)
+    return stats
+
+
+def _purge_batch(carts, cart_ids, archive):
+    with transaction.atomic():
+        carts = carts.filter(pk__in=cart_ids)
+        if connection.features.has_select_for_update_skip_locked:
+            # Leave carts being updated right now for the next run.
+            carts = carts.select_for_update(skip_locked=True)
+        claimed = list(carts.values('pk', 'user_id', 'item_count', 'total', 'updated_at'))
+        if not claimed:
+            return {'carts': 0, 'lines': 0, 'archived': 0}
+        ids = [cart['pk'] for cart in claimed]
+        lines = CartItem.objects.filter(cart_id__in=ids)
+
+        archived = 0
+        if archive:
+            archived = len(ArchivedCart.objects.bulk_create(
+                _archive(cart, contents) for cart, contents in _cart_contents(claimed, lines) if contents
+            ))
+
+        # Stock still reserved by the lines (if the sweeper has not run yet)
+        # goes back in product order, as apply_cart_operations takes it.
+        held = (
+            lines.filter(reserved_quantity__gt=0).order_by('product_id')
+            .values('product_id').annotate(units=Sum('reserved_quantity'))
+        )
+        for row in held:
+            inventory.return_stock(row['product_id'], row['units'])
+        # A plain DELETE: the per-line post_delete handlers would bump and
+        # publish changes of carts about to disappear, one query per line.
+        deleted_lines = lines._raw_delete(lines.db)
+        deleted_carts = Cart.objects.filter(pk__in=ids)._raw_delete(lines.db)
+    return {'carts': deleted_carts, 'lines': deleted_lines, 'archived': archived}
+
+
+def _cart_contents(claimed, lines):
+    contents = {cart['pk']: [] for cart in claimed}
+    for line in lines.order_by('id').values('cart_id', 'product_id', 'product__name', 'unit_price', 'quantity'):
+        contents[line['cart_id']].append({
+            'product_id': line['product_id'],
+            'name': line['product__name'],
+            'unit_price': str(line['unit_price']),
+            'quantity': line['quantity'],
+        })
+    return [(cart, contents[cart['pk']]) for cart in claimed]
+
+
+def _archive(cart, contents):
+    return ArchivedCart(
+        user_id=cart['user_id'],
+        item_count=cart['item_count'],
+        total=cart['total'],
+        lines=contents,
+        last_active=cart['updated_at'],
+    )
@@ -0,0 +1,255 @@
+"""Cart write path shared by the cart API views.
+
+Users get a cart on their first cart write, not at registration, so
+reading an empty cart or saving a user never writes one. ``request_cart``
+looks it up (or creates it) once per request.
+
+Each cart stores its ``item_count`` and ``total`` so reads need only the cart
+row. Every change to a line adjusts them by its difference, with ``F()``
+expressions in the same transaction as the line write; ``check_totals``
+finds and repairs carts whose counters have drifted from their lines.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from . import inventory
+from .broadcast import publish_cart_event
+from .models import Cart, CartItem, Product
+
+OPERATIONS = ('set', 'increment', 'remove')
+MAX_BATCH_OPERATIONS = 100
+
+# Carts compared per query by check_totals
+CHECK_BATCH = 1000
+CENT = Decimal('0.01')
+
+
+class CartOperationError(ValueError):
+    """Raised when a cart operation is malformed."""
+
+
+class UnknownProductError(CartOperationError):
+    """Raised when an operation references a product that does not exist."""
+
+
+def request_cart(request, create=False):
+    """The request user's cart, or None if they have none and not ``create``."""
+    cart = request.__dict__.get('_cart')
+    if cart is None:
+        if create:
+            cart, created = Cart.objects.get_or_create(user_id=request.user.pk)
+        else:
+            cart = Cart.objects.filter(user_id=request.user.pk).first()
+        request._cart = cart
+    return cart
+
+
+async def arequest_cart(request, create=False):
+    """``request_cart`` for async views."""
+    cart = request.__dict__.get('_cart')
+    if cart is None:
+        if create:
+            cart, created = await Cart.objects.aget_or_create(user_id=request.user.pk)
+        else:
+            cart = await Cart.objects.filter(user_id=request.user.pk).afirst()
+        request._cart = cart
+    return cart
+
+
+def parse_operations(raw_operations):
+    """Validate a list of ``{op, product_id, quantity}`` dicts.
+
+    Returns a list of ``(op, product_id, quantity)`` tuples. ``quantity`` is
+    ignored for ``remove`` and may be negative for ``increment``.
+    """
+    if not isinstance(raw_operations, list) or not raw_operations:
+        raise CartOperationError('operations must be a non-empty list')
+    if len(raw_operations) > MAX_BATCH_OPERATIONS:
+        raise CartOperationError(f'at most {MAX_BATCH_OPERATIONS} operations per request')
+
+    operations = []
+    for raw in raw_operations:
+        if not isinstance(raw, dict):
+            raise CartOperationError('each operation must be an object')
+        op = raw.get('op', 'set')
+        product_id = raw.get('product_id')
+        quantity = raw.get('quantity', 1 if op == 'increment' else 0)
+        if op not in OPERATIONS:
+            raise CartOperationError(f'unknown op {op!r}')
+        if not _is_int(product_id) or product_id < 1:
+            raise CartOperationError('invalid product_id')
+        if op != 'remove' and not _is_int(quantity):
+            raise CartOperationError('invalid quantity')
+        if op == 'set' and quantity < 0:
+            raise CartOperationError('quantity must be zero or more')
+        operations.append((op, product_id, quantity if op != 'remove' else 0))
+    return operations
+
+
+def apply_cart_operations(cart, operations):
+    """Apply parsed operations to ``cart`` in one transaction.
+
+    Final quantities are computed in Python from a single read of the affected
+    lines, then written with one bulk upsert and one bulk delete. Lines whose
+    final quantity is zero or less are removed. Each written line reserves
+    its full quantity from stock (see ``inventory``); if any product runs
+    short, ``OutOfStockError`` is raised and nothing is changed. The cart's
+    counters and version change in one UPDATE. Changed lines are pushed to
+    the owner's sockets after commit. ``cart``'s version and counters are
+    refreshed.
+
+    The delete bypasses the ``CartItem`` post_delete handlers, which would
+    adjust the cart, look up its owner and return stock once per line;
+    that is done here in aggregate instead.
+    """
+    product_ids = {product_id for _, product_id, _ in operations}
+    with transaction.atomic():
+        needed = {product_id for op, product_id, _ in operations if op != 'remove'}
+        prices = {}
+        if needed:
+            prices = dict(Product.objects.filter(pk__in=needed).values_list('pk', 'price'))
+            missing = needed - prices.keys()
+            if missing:
+                raise UnknownProductError(f'unknown product_id {min(missing)}')
+
+        if connection.features.has_select_for_update:
+            # One update per cart at a time; SQLite's write lock already ensures this.
+            list(Cart.objects.select_for_update().filter(pk=cart.pk).values_list('pk'))
+        held = {}
+        current = {}
+        subtotals = {}
+        lines = (
+            CartItem.objects.filter(cart=cart, product_id__in=product_ids)
+            .values_list('product_id', 'quantity', 'reserved_quantity', 'unit_price')
+        )
+        for product_id, quantity, reserved, unit_price in lines:
+            current[product_id] = quantity
+            held[product_id] = reserved
+            subtotals[product_id] = unit_price * quantity
+        quantities = dict(current)
+        for op, product_id, quantity in operations:
+            if op == 'set':
+                quantities[product_id] = quantity
+            elif op == 'increment':
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            else:
+                quantities[product_id] = 0
+
+        reserved_until = timezone.now() + inventory.reservation_ttl()
+        upserts = []
+        removals = []
+        added_items, added_total = 0, Decimal('0')
+        # In product order, so concurrent carts lock stock rows in the same order.
+        for product_id, quantity in sorted(quantities.items()):
+            if quantity <= 0:
+                if product_id in current:
+                    inventory.return_stock(product_id, held[product_id])
+                    removals.append(product_id)
+                    added_items -= current[product_id]
+                    added_total -= subtotals[product_id]
+                continue
+            if quantity == current.get(product_id) == held.get(product_id):
+                continue
+            inventory.change_reservation(product_id, held.get(product_id, 0), quantity)
+            upserts.append(CartItem(
+                cart=cart, product_id=product_id, quantity=quantity, unit_price=prices[product_id],
+                reserved_quantity=quantity, reserved_until=reserved_until,
+            ))
+            added_items += quantity - current.get(product_id, 0)
+            added_total += prices[product_id] * quantity - subtotals.get(product_id, 0)
+
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity', 'unit_price', 'reserved_quantity', 'reserved_until', 'updated_at'],
+            )
+        if removals:
+            removed = CartItem.objects.filter(cart=cart, product_id__in=removals)
+            removed._raw_delete(removed.db)
+        if upserts or removals:
+            Cart.bump_version(cart.pk, items=added_items, total=added_total)
+            cart.refresh_from_db(fields=['version', 'item_count', 'total'])
+
+        # Neither bulk write sends signals, so publish the changes here.
+        for item in upserts:
+            publish_cart_event(cart.user_id, 'cart_item_added', {
+                'product_id': item.product_id,
+                'quantity': item.quantity,
+            })
+        for product_id in removals:
+            publish_cart_event(cart.user_id, 'cart_item_removed', {'product_id': product_id})
+
+
+def clear_cart(cart):
+    """Remove every line of ``cart``, as one ``apply_cart_operations`` batch."""
+    product_ids = CartItem.objects.filter(cart=cart).values_list('product_id', flat=True)
+    operations = [('remove', product_id, 0) for product_id in product_ids]
+    if operations:
+        apply_cart_operations(cart, operations)
+
+
+def reprice_lines(product):
+    """Move cart lines of ``product`` to its current price, adjusting their carts' totals."""
+    stale = (
+        CartItem.objects.filter(product=product).exclude(unit_price=product.price)
+        .values_list('pk', 'cart_id', 'quantity', 'unit_price')
+    )
+    for pk, cart_id, quantity, unit_price in stale:
+        with transaction.atomic():
+            # Skipped if the line changed since it was read; its writer set the price.
+            changed = CartItem.objects.filter(pk=pk, quantity=quantity, unit_price=unit_price).update(
+                unit_price=product.price,
+            )
+            if changed:
+                Cart.bump_version(cart_id, total=(product.price - unit_price) * quantity)
+
+
+def invalidate_product_carts(product_id):
+    """Make the cached payloads and ETags of carts holding the product stale.
+
+    For changes to what cart lines show of a product (name, image); prices
+    go through ``reprice_lines``.
+    """
+    Cart.objects.filter(items__product_id=product_id).update(version=F('version') + 1)
+
+
+def check_totals(fix=False):
+    """Compare each cart's stored counters with its lines.
+
+    Returns ``(cart_id, stored, actual)`` for every cart that differs, each
+    count an ``(item_count, total)`` pair. With ``fix``, those carts are
+    recounted from their lines.
+    """
+    drifted = []
+    last_pk = 0
+    while True:
+        batch = list(
+            Cart.objects.filter(pk__gt=last_pk).order_by('pk')
+            .annotate(line_count=Sum('items__quantity'), line_total=Sum(ExpressionWrapper(
+                F('items__unit_price') * F('items__quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )))
+            .values_list('pk', 'item_count', 'total', 'line_count', 'line_total')[:CHECK_BATCH]
+        )
+        if not batch:
+            break
+        for pk, item_count, total, line_count, line_total in batch:
+            stored = (item_count, total.quantize(CENT))
+            actual = (line_count or 0, (line_total or Decimal('0')).quantize(CENT))
+            if stored != actual:
+                drifted.append((pk, stored, actual))
+        last_pk = batch[-1][0]
+    if fix and drifted:
+        ids = [pk for pk, _, _ in drifted]
+        for start in range(0, len(ids), CHECK_BATCH):
+            Cart.recount(ids[start:start + CHECK_BATCH])
+    return drifted
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
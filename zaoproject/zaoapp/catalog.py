@@ -0,0 +1,176 @@
+"""Catalog reads for the storefront: the cached home page fragments and the listing API.
+
+Every cache key embeds the current catalog version, which the ``Product``
+``post_save``/``post_delete`` handlers bump after commit, so any product change
+(dashboard, admin or shell) makes all cached catalog entries unreachable at
+once. Entries also expire after ``CATALOG_CACHE_TIMEOUT`` so that workers with
+a process-local cache converge after another worker's bump.
+"""
+import base64
+import binascii
+import time
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import images
+from .models import Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CACHE_TIMEOUT = 60 * 5
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Fields the product listing API may return, mapped to the columns they need.
+LISTING_FIELDS = {
+    'id': ('id',),
+    'name': ('name',),
+    'description': ('description',),
+    'price': ('price',),
+    'stock': ('stock',),
+    'image_url': ('image', 'image_variants'),
+    'image_srcset': ('image', 'image_variants'),
+    'created_at': ('created_at',),
+}
+DEFAULT_LISTING_FIELDS = ('id', 'name', 'price', 'stock', 'image_url', 'image_srcset')
+# Width of the listing's image_url; clients should prefer image_srcset
+LISTING_IMAGE_WIDTH = 320
+
+# Parts of the home page rendered from the product list, cached together:
+# fragment name -> template
+STOREFRONT_FRAGMENTS = {
+    'product_grid': 'product_grid.html',
+    'product_carousel': 'product_carousel.html',
+    'latest_carousel': 'latest_products_carousel.html',
+}
+# Rendered width of product images in the storefront carousels
+CAROUSEL_IMAGE_SIZES = '(min-width: 1200px) 20vw, (min-width: 768px) 33vw, 50vw'
+
+# How long a rebuild may hold the lock, and how long others wait for it.
+REBUILD_LOCK_TIMEOUT = 30
+REBUILD_WAIT = 5
+REBUILD_POLL = 0.05
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a cleared cache never reuses old keys.
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+def active_products():
+    return get_or_build(
+        f'catalog:{catalog_version()}:active_products',
+        lambda: list(Product.objects.filter(is_active=True)),
+    )
+
+
+def storefront_html():
+    """The rendered product grid and carousels of the storefront, by fragment name."""
+    fragments = get_or_build(f'catalog:{catalog_version()}:storefront', _render_storefront)
+    return {name: mark_safe(html) for name, html in fragments.items()}
+
+
+def _render_storefront():
+    context = {'products': active_products(), 'carousel_image_sizes': CAROUSEL_IMAGE_SIZES}
+    return {name: render_to_string(template, context) for name, template in STOREFRONT_FRAGMENTS.items()}
+
+
+def get_or_build(key, build, timeout=CATALOG_CACHE_TIMEOUT):
+    """Return the cached value for ``key``, building it on a miss.
+
+    Only the request that wins the rebuild lock calls ``build``; concurrent
+    misses wait for its result instead of all hitting the database. If the
+    rebuild takes longer than ``REBUILD_WAIT`` they build it themselves.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        deadline = time.monotonic() + REBUILD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(REBUILD_POLL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        return build()
+
+    try:
+        value = build()
+        cache.set(key, value, timeout)
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+def product_page(cursor=None, limit=PAGE_SIZE, fields=DEFAULT_LISTING_FIELDS):
+    """Return one page of active products, newest first, and the next cursor.
+
+    Pages are found by seeking past the last ``(created_at, id)`` seen rather
+    than with OFFSET, so every page costs the same index range scan. Only the
+    columns behind ``fields`` are selected.
+    """
+    columns = {'id', 'created_at'}.union(*(LISTING_FIELDS[field] for field in fields))
+    products = (
+        Product.objects.filter(is_active=True)
+        .order_by('-created_at', '-id')
+        .values(*columns)
+    )
+    if cursor is not None:
+        created_at, pk = cursor
+        # The redundant created_at <= bound lets SQLite seek the index.
+        products = products.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+        )
+
+    rows = list(products[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+    return [_listing_row(row, fields) for row in rows], next_cursor
+
+
+def encode_cursor(created_at, pk):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ``ValueError`` if it is malformed."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('invalid cursor')
+
+
+def _listing_row(row, fields):
+    values = {}
+    for field in fields:
+        if field == 'image_url':
+            values[field] = images.image_url(row['image'], row['image_variants'], LISTING_IMAGE_WIDTH)
+        elif field == 'image_srcset':
+            values[field] = images.srcset(row['image'], row['image_variants'])
+        elif field == 'price':
+            values[field] = float(row['price'])
+        elif field == 'created_at':
+            values[field] = row['created_at'].isoformat()
+        else:
+            values[field] = row[field]
+    return values
@@ -0,0 +1,355 @@
+"""A channel layer shared by every worker process on one host, backed by SQLite.
+
+``InMemoryChannelLayer`` only reaches sockets held by the process that sent
+the message, so with several gunicorn workers a cart update published by one
+worker never reaches a socket held by another. This layer keeps messages and
+group memberships in a small SQLite database (WAL mode) that all workers open.
+
+Each process owns the channels it creates with ``new_channel()``; a single
+poller per process and event loop fetches everything addressed to those
+channels in one query and hands it to the waiting ``receive()`` calls, backing
+off to ``poll_interval`` while idle. Polls and cleanups look for rows with a
+plain read first and only take the write lock when there is something to
+claim or delete, so an idle site does not keep locking the file. Messages
+must be JSON-serializable.
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import string
+import time
+import weakref
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    body TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, id);
+CREATE INDEX IF NOT EXISTS messages_owner ON messages (owner, id);
+CREATE INDEX IF NOT EXISTS messages_expires ON messages (expires);
+CREATE TABLE IF NOT EXISTS groups (
+    grp TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    joined REAL NOT NULL,
+    PRIMARY KEY (grp, channel)
+);
+CREATE INDEX IF NOT EXISTS groups_channel ON groups (channel);
+"""
+
+MIN_POLL_INTERVAL = 0.001
+
+# SQL for _owner(), used when fanning out to group members.
+OWNER_SQL = "substr({0}, 1, instr({0}, '!'))"
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    extensions = ['groups', 'flush']
+
+    def __init__(
+        self,
+        path='channels.sqlite3',
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.05,
+        cleanup_interval=5,
+        **kwargs,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.cleanup_interval = cleanup_interval
+        self._pid = None
+        self._last_cleanup = 0
+
+    # Per-process state. Recreated after a fork (gunicorn --preload) so that
+    # workers never share a connection, executor thread or channel prefix.
+
+    def _ensure_process(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-channel-layer')
+        self._connection = None
+        self._receivers = weakref.WeakKeyDictionary()
+        self.client_prefix = f'{self._pid}.{_random_token()}'
+        self._owners = set()
+
+    async def _run(self, func, *args):
+        self._ensure_process()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _db(self):
+        # Only ever called on the executor thread.
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _write(self, statements):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            results = [db.execute(sql, params) for sql, params in statements]
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return results
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        body = json.dumps(message)
+        sent = await self._run(self._send, channel, body, self.get_capacity(channel))
+        if not sent:
+            raise ChannelFull(channel)
+
+    def _send(self, channel, body, capacity):
+        cursor, = self._write([(
+            'INSERT INTO messages (channel, owner, body, expires) '
+            'SELECT ?, ?, ?, ? WHERE (SELECT COUNT(*) FROM messages WHERE channel = ?) < ?',
+            (channel, _owner(channel), body, time.time() + self.expiry, channel, capacity),
+        )])
+        return cursor.rowcount == 1
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if '!' not in channel:
+            return await self._receive_shared(channel)
+        self._ensure_process()
+        self._owners.add(_owner(channel))
+        loop = asyncio.get_running_loop()
+        receiver = self._receivers.get(loop)
+        if receiver is None:
+            receiver = self._receivers[loop] = _LocalReceiver(self)
+        return await receiver.get(channel)
+
+    async def _receive_shared(self, channel):
+        # Normal channels may be read by any process, so each read claims a row.
+        interval = MIN_POLL_INTERVAL
+        while True:
+            body = await self._run(self._claim_one, channel)
+            if body is not None:
+                return json.loads(body)
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.poll_interval)
+
+    def _claim_one(self, channel):
+        db = self._db()
+        if not db.execute('SELECT EXISTS (SELECT 1 FROM messages WHERE channel = ?)', (channel,)).fetchone()[0]:
+            return None
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT id, body FROM messages WHERE channel = ? AND expires >= ? ORDER BY id LIMIT 1',
+                (channel, time.time()),
+            ).fetchone()
+            if row is not None:
+                db.execute('DELETE FROM messages WHERE id = ?', (row[0],))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return row[1] if row else None
+
+    def _claim_local(self, owners):
+        """Fetch and delete every live message addressed to this process."""
+        db = self._db()
+        now = time.time()
+        placeholders = ', '.join('?' * len(owners))
+        pending = db.execute(
+            f'SELECT EXISTS (SELECT 1 FROM messages WHERE owner IN ({placeholders}))', owners,
+        ).fetchone()[0]
+        if not pending:
+            self._maybe_clean(now)
+            return []
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            rows = db.execute(
+                f'SELECT id, channel, body, expires FROM messages WHERE owner IN ({placeholders}) ORDER BY id',
+                owners,
+            ).fetchall()
+            if rows:
+                db.execute(
+                    f'DELETE FROM messages WHERE owner IN ({placeholders}) AND id <= ?',
+                    (*owners, rows[-1][0]),
+                )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._maybe_clean(now)
+        return [(channel, expires, body) for _, channel, body, expires in rows if expires >= now]
+
+    def _maybe_clean(self, now):
+        if now - self._last_cleanup > self.cleanup_interval:
+            self._clean_expired(now)
+
+    def _clean_expired(self, now):
+        # A channel with an expired message is no longer being read; drop it
+        # from its groups like the in-memory layer does.
+        self._last_cleanup = now
+        stale = self._db().execute(
+            'SELECT EXISTS (SELECT 1 FROM messages WHERE expires < ?) '
+            'OR EXISTS (SELECT 1 FROM groups WHERE joined < ?)',
+            (now, now - self.group_expiry),
+        ).fetchone()[0]
+        if not stale:
+            return
+        self._write([
+            ('DELETE FROM groups WHERE channel IN (SELECT channel FROM messages WHERE expires < ?)', (now,)),
+            ('DELETE FROM messages WHERE expires < ?', (now,)),
+            ('DELETE FROM groups WHERE joined < ?', (now - self.group_expiry,)),
+        ])
+
+    async def new_channel(self, prefix='specific.'):
+        self._ensure_process()
+        owner = f'{prefix}{self.client_prefix}!'
+        self._owners.add(owner)
+        return f'{owner}{_random_token()}'
+
+    # Flush extension
+
+    async def flush(self):
+        await self._run(self._write, [('DELETE FROM messages', ()), ('DELETE FROM groups', ())])
+
+    async def close(self):
+        if self._pid == os.getpid():
+            self._executor.shutdown(wait=False)
+            self._pid = None
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(self._write, [(
+            'INSERT OR REPLACE INTO groups (grp, channel, joined) VALUES (?, ?, ?)',
+            (group, channel, time.time()),
+        )])
+
+    async def group_discard(self, group, channel):
+        self.require_valid_channel_name(channel)
+        self.require_valid_group_name(group)
+        await self._run(self._write, [(
+            'DELETE FROM groups WHERE grp = ? AND channel = ?', (group, channel),
+        )])
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        await self._run(self._group_send, group, json.dumps(message))
+
+    def _group_send(self, group, body):
+        # One insert fans the message out to every member that has room under
+        # its channel's capacity; full channels are skipped, as with the
+        # in-memory layer.
+        now = time.time()
+        members = [
+            (channel, self.get_capacity(channel))
+            for channel, in self._db().execute('SELECT channel FROM groups WHERE grp = ?', (group,))
+        ]
+        if members:
+            self._write([(
+                f'WITH members (channel, capacity) AS (VALUES {", ".join(["(?, ?)"] * len(members))}) '
+                f'INSERT INTO messages (channel, owner, body, expires) '
+                f'SELECT g.channel, {OWNER_SQL.format("g.channel")}, ?, ? FROM members g '
+                f'WHERE (SELECT COUNT(*) FROM messages m WHERE m.channel = g.channel) < g.capacity',
+                (*[value for member in members for value in member], body, now + self.expiry),
+            )])
+        self._maybe_clean(now)
+
+
+class _LocalReceiver:
+    """Hands messages fetched for this process to the coroutines waiting on them.
+
+    Bound to one event loop; the layer keeps one per loop.
+    """
+
+    def __init__(self, layer):
+        self.layer = layer
+        # channel -> (expires, body) pairs in arrival order, so oldest first
+        self.messages = defaultdict(deque)
+        # channel -> futures of the receive() calls waiting on it
+        self.waiters = defaultdict(set)
+        self.task = None
+
+    async def get(self, channel):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.poll())
+        while True:
+            messages = self.messages.get(channel)
+            while messages:
+                expires, body = messages.popleft()
+                if expires >= time.time():
+                    return json.loads(body)
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters[channel].add(waiter)
+            try:
+                await waiter
+            finally:
+                self.waiters[channel].discard(waiter)
+                if not self.waiters[channel]:
+                    del self.waiters[channel]
+                    if channel in self.messages and not self.messages[channel]:
+                        del self.messages[channel]
+
+    async def poll(self):
+        interval = MIN_POLL_INTERVAL
+        while self.waiters:
+            rows = await self.layer._run(self.layer._claim_local, tuple(self.layer._owners))
+            for channel, expires, body in rows:
+                self.messages[channel].append((expires, body))
+                for waiter in self.waiters.get(channel, ()):
+                    if not waiter.done():
+                        waiter.set_result(None)
+            if rows:
+                interval = MIN_POLL_INTERVAL
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, self.layer.poll_interval)
+            self.drop_abandoned()
+
+    def drop_abandoned(self):
+        # Messages for channels nobody reads any more would otherwise pile up.
+        now = time.time()
+        for channel in [c for c in self.messages if c not in self.waiters]:
+            messages = self.messages[channel]
+            while messages and messages[0][0] < now:
+                messages.popleft()
+            if not messages:
+                del self.messages[channel]
+
+
+def _owner(channel):
+    """The process-specific part of a channel name, up to and including the "!".
+
+    Empty for normal channels, which any process may read.
+    """
+    return channel[:channel.index('!') + 1] if '!' in channel else ''
+
+
+def _random_token():
+    return ''.join(random.choice(string.ascii_letters) for _ in range(12))
@@ -1,13 +1,42 @@
+import asyncio
 import json
+
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .broadcast import cart_group_name
+from .instrumentation import ConsumerMetricsMixin
+
+# Close code sent to clients whose outbound queue overflowed.
+CLOSE_SLOW_CONSUMER = 4008
+
 
+class CartConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    """Pushes the connected user's own cart changes to their sockets.
+
+    The group is derived from the authenticated user, not the URL, and the
+    server is the only publisher: messages sent by the client are ignored.
+
+    Outbound events are buffered per connection. Events arriving within
+    ``CART_WS_COALESCE_WINDOW`` seconds (or while a previous frame is still
+    being written) are merged into a single frame, and a connection whose
+    buffer grows past ``CART_WS_MAX_PENDING`` events is closed rather than
+    allowed to grow the worker's memory.
+    """
 
-class CartConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.room_group_name = f'cart_{self.room_name}'
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
 
-        # Join room group
+        self.room_group_name = cart_group_name(user.pk)
+        self.pending = []
+        self.flush_task = None
+        self.coalesce_window = getattr(settings, 'CART_WS_COALESCE_WINDOW', 0.05)
+        self.max_pending = getattr(settings, 'CART_WS_MAX_PENDING', 200)
+
+        # Join the user's group
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -16,42 +45,79 @@ class CartConsumer(AsyncWebsocketConsumer):
         await self.accept()
 
     async def disconnect(self, close_code):
-        # Leave room group
+        if not hasattr(self, 'room_group_name'):
+            return
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        # Leave the user's group
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    # Receive message from WebSocket
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        message_type = data.get('type', 'cart_update')
-
-        # Broadcast to group
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': message_type,
-                'data': data
-            }
-        )
+    async def receive(self, text_data=None, bytes_data=None):
+        # Cart changes are published by the server from the write paths.
+        pass
 
-    # Receive message from room group
+    # Receive message from the user's group
     async def cart_update(self, event):
-        # Send to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'cart_update',
-            'data': event['data']
-        }))
+        await self.enqueue(event)
 
     async def cart_item_added(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'cart_item_added',
-            'data': event['data']
-        }))
+        await self.enqueue(event)
 
     async def cart_item_removed(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'cart_item_removed',
-            'data': event['data']
-        }))
+        await self.enqueue(event)
+
+    async def enqueue(self, event):
+        self.pending.append(event)
+        if len(self.pending) > self.max_pending:
+            # The client is not keeping up; drop it instead of buffering forever.
+            self.pending = []
+            if self.flush_task is not None:
+                self.flush_task.cancel()
+            await self.close(code=CLOSE_SLOW_CONSUMER)
+            return
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_after_window())
+
+    async def flush_after_window(self):
+        try:
+            await asyncio.sleep(self.coalesce_window)
+            while self.pending:
+                events, self.pending = self.pending, []
+                await self.send(text_data=coalesce_events(events))
+        finally:
+            self.flush_task = None
+
+
+def coalesce_events(events):
+    """Encode buffered group events as one WebSocket frame.
+
+    A single event is forwarded as the text the publisher encoded once for
+    every recipient. Several events are merged into a ``cart_patch`` frame
+    holding the latest full snapshot, if any, plus the final quantity of each
+    line changed after it (0 meaning removed).
+    """
+    if len(events) == 1:
+        event = events[0]
+        return event.get('text') or json.dumps({'type': event['type'], 'data': event['data']})
+
+    snapshot = None
+    lines = {}
+    for event in events:
+        data = event['data']
+        if event['type'] == 'cart_update':
+            snapshot = data
+            lines = {}
+        elif event['type'] == 'cart_item_added':
+            lines[data['product_id']] = data['quantity']
+        elif event['type'] == 'cart_item_removed':
+            lines[data['product_id']] = 0
+    return json.dumps({
+        'type': 'cart_patch',
+        'data': {
+            'snapshot': snapshot,
+            'lines': [{'product_id': pid, 'quantity': qty} for pid, qty in lines.items()],
+        },
+    })
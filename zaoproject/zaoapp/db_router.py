@@ -0,0 +1,131 @@
+"""Read replica routing for catalog and cart reads.
+
+``ReplicaRouter`` sends reads of the catalog and cart models made while
+serving a request to one of ``settings.DATABASE_REPLICAS``, and everything
+else to the primary (``default``). That covers writes, reads of other
+models, reads inside a transaction on the primary, and all work outside
+requests such as jobs, management commands and WebSocket consumers.
+Replicas lag the primary, so once a request writes catalog or cart data
+(adding to a cart, say), its later reads go to the primary. So do the
+browser's requests for the next ``REPLICA_PIN_SECONDS``, tracked with a
+cookie set by ``ReplicaPinMiddleware``. Keep that longer than the replicas'
+lag. A replica that cannot be opened is skipped for
+``REPLICA_RETRY_SECONDS``, and its reads go to the primary meanwhile.
+
+Locally, replicas are read-only copies of the SQLite primary refreshed by
+``manage.py sync_replicas``; see ``REPLICA_DATABASE_FILES`` in settings.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_primary'
+REPLICA_RETRY_SECONDS = 30
+
+# Models whose reads may be served from a replica
+REPLICA_MODELS = {'zaoapp.product', 'zaoapp.cart', 'zaoapp.cartitem'}
+
+_request_routing = ContextVar('request_routing', default=None)
+# Replica alias -> time.monotonic() until which it is considered down
+_down_until = {}
+
+
+class RequestRouting:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 30)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _request_routing.get()
+        if (
+            routing is None or routing.pinned or routing.wrote
+            or model._meta.label_lower not in REPLICA_MODELS
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        available = [alias for alias in replicas() if _available(alias)]
+        return random.choice(available) if available else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        routing = _request_routing.get()
+        if routing is not None and model._meta.label_lower in REPLICA_MODELS:
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+def _available(alias):
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _down_until[alias] = time.monotonic() + REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+class ReplicaPinMiddleware:
+    """Enables replica reads for the request, unless the browser wrote recently.
+
+    A response to a request that wrote catalog or cart data sets the pin
+    cookie, which sends the browser's reads to the primary until it expires.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_routing.reset(token)
+        return self.remember_write(routing, response)
+
+    async def __acall__(self, request):
+        routing = RequestRouting(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_routing.reset(token)
+        return self.remember_write(routing, response)
+
+    def remember_write(self, routing, response):
+        if routing.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True, samesite='Lax')
+        return response
@@ -58,6 +58,37 @@ class ProductForm(forms.ModelForm):
             'image': forms.ClearableFileInput(attrs={'class': 'form-control'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Lets inventory.save_product apply an edit as a change since the form was opened.
+        self.fields['stock'].show_hidden_initial = True
+
+
+class CheckoutForm(forms.Form):
+    """Delivery details posted by the checkout page, with its idempotency key."""
+
+    COUNTRIES = [
+        ('KE', 'Kenya'),
+        ('UG', 'Uganda'),
+        ('TZ', 'Tanzania'),
+        ('RW', 'Rwanda'),
+        ('BU', 'Burundi'),
+        ('ET', 'Ethiopia'),
+        ('SS', 'South Sudan'),
+    ]
+
+    idempotency_key = forms.RegexField(regex=r'^[A-Za-z0-9_-]{8,64}$')
+    country = forms.ChoiceField(choices=COUNTRIES)
+    county = forms.CharField(max_length=100)
+    mobile_number = forms.RegexField(regex=r'^\+?[0-9]{9,15}$', max_length=20)
+    delivery_address = forms.CharField(max_length=500, required=False)
+
+    def delivery(self):
+        return {
+            name: self.cleaned_data[name]
+            for name in ('country', 'county', 'mobile_number', 'delivery_address')
+        }
+
 
 class UserProfileForm(forms.ModelForm):
     """Form for users to edit their profile (username, email, first_name, last_name)."""
@@ -0,0 +1,131 @@
+"""Resized WebP/JPEG derivatives of product images, for ``srcset``.
+
+``generate_variants`` writes one file per width and format next to the
+original (``products/banana_320w.webp``) and returns a dict that is stored on
+``Product.image_variants``::
+
+    {"source": "products/banana.png", "width": 1200, "height": 900,
+     "webp": {"160": "products/banana_160w.webp", ...},
+     "jpeg": {"160": "products/banana_160w.jpg", ...},
+     "versions": {"products/banana_160w.webp": "3f2a9c01b7de", ...}}
+
+``source`` records which upload the variants were made from, so variants left
+over from a replaced image are never served. ``versions`` holds each file's
+``media.content_version``, so their versioned URLs are built without touching
+the file system; variants recorded before it existed fall back to
+``storage.url``.
+"""
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import media
+
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+
+# format key -> (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def generate_variants(image_name, storage=default_storage):
+    """Write every derivative of ``image_name`` and return the variants dict."""
+    with storage.open(image_name, 'rb') as fh:
+        image = ImageOps.exif_transpose(Image.open(fh))
+        image.load()
+    width, height = image.size
+    widths = sorted({w for w in VARIANT_WIDTHS if w < width} | {min(width, VARIANT_WIDTHS[-1])})
+
+    stem = posixpath.splitext(image_name)[0]
+    variants = {'source': image_name, 'width': width, 'height': height, 'versions': {}}
+    frames = {'webp': _without_palette(image), 'jpeg': _flatten(image)}
+    for key, (pil_format, extension, options) in FORMATS.items():
+        variants[key] = {}
+        for w in widths:
+            frame = frames[key]
+            if w != width:
+                frame = frame.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+            out = BytesIO()
+            frame.save(out, pil_format, **options)
+            content = out.getvalue()
+            name = f'{stem}_{w}w.{extension}'
+            if storage.exists(name):
+                storage.delete(name)
+            name = variants[key][str(w)] = storage.save(name, ContentFile(content))
+            variants['versions'][name] = media.content_version(content)
+    return variants
+
+
+def delete_variants(variants, keep=(), storage=default_storage):
+    """Delete the files of ``variants``, except names in ``keep``."""
+    for key in FORMATS:
+        for name in (variants or {}).get(key, {}).values():
+            if name not in keep:
+                storage.delete(name)
+
+
+def variant_names(variants):
+    return {name for key in FORMATS for name in (variants or {}).get(key, {}).values()}
+
+
+def current_variants(image_name, variants):
+    """``variants`` if they were made from ``image_name``, else ``None``."""
+    if image_name and variants and variants.get('source') == image_name:
+        return variants
+    return None
+
+
+def srcset(image_name, variants, key='webp', storage=default_storage):
+    """A ``srcset`` value for the variants in format ``key``, or ``''``."""
+    variants = current_variants(image_name, variants)
+    if variants is None:
+        return ''
+    sized = sorted(variants[key].items(), key=lambda item: int(item[0]))
+    return ', '.join(f'{_variant_url(variants, name, storage)} {w}w' for w, name in sized)
+
+
+def image_url(image_name, variants, width=None, key='jpeg', storage=default_storage):
+    """The URL of the smallest variant at least ``width`` wide.
+
+    Falls back to the largest variant, and to the original upload when there
+    are no variants yet.
+    """
+    if not image_name:
+        return None
+    variants = current_variants(image_name, variants)
+    if variants is None:
+        return storage.url(image_name)
+    sized = sorted((int(w), name) for w, name in variants[key].items())
+    if width is not None:
+        for w, name in sized:
+            if w >= width:
+                return _variant_url(variants, name, storage)
+    return _variant_url(variants, sized[-1][1], storage)
+
+
+def _variant_url(variants, name, storage):
+    version = variants.get('versions', {}).get(name)
+    if version is None or not isinstance(storage, media.VersionedMediaStorage):
+        return storage.url(name)
+    return storage.versioned_url(name, version)
+
+
+def _without_palette(image):
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _flatten(image):
+    image = _without_palette(image)
+    if image.mode == 'RGB':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
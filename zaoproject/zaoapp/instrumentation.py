@@ -0,0 +1,274 @@
+"""Per-request performance metrics.
+
+``InstrumentationMiddleware`` measures every HTTP request, and
+``ConsumerMetricsMixin`` every event a WebSocket consumer handles:
+- wall time
+- database queries and the time spent in them
+- cache hits and misses
+- template rendering time
+
+Each measurement is reported three ways:
+- in a ``Server-Timing`` response header, shown by browser dev tools
+- as one JSON log line on the ``zaoapp.instrumentation`` logger
+- in rolling per-view percentiles, served in Prometheus text format by the
+  staff-only ``metrics`` view
+
+Queries are counted by an execute wrapper installed on every new database
+connection (see ``signals``). Cache lookups are reported by
+``sqlite_cache``. Template time comes from the template backend in this
+module, set in ``TEMPLATES``.
+
+The percentiles cover the last ``WINDOW`` samples per view. They are kept per
+process, so with several gunicorn workers each scrape sees the worker that
+answered it.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+# Samples kept per view and measurement for the percentiles
+WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Measurement -> help text of the Prometheus summary zaoapp_<measurement>
+MEASUREMENTS = {
+    'duration_seconds': 'Wall time of requests and WebSocket events.',
+    'db_queries': 'Database queries per request.',
+    'db_duration_seconds': 'Time spent in database queries per request.',
+    'cache_hits': 'Cache hits per request.',
+    'cache_misses': 'Cache misses per request.',
+    'template_duration_seconds': 'Time spent rendering templates per request.',
+}
+
+_current = ContextVar('request_metrics', default=None)
+# (measurement, view) -> Window
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+class Metrics:
+    """What one request or WebSocket event has cost so far."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.rendering = False
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def measurements(self):
+        return {
+            'duration_seconds': self.duration,
+            'db_queries': self.db_queries,
+            'db_duration_seconds': self.db_time,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'template_duration_seconds': self.template_time,
+        }
+
+    def server_timing(self):
+        return ', '.join([
+            f'total;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'template;dur={self.template_time * 1000:.1f}',
+        ])
+
+
+class Window:
+    """The last ``WINDOW`` values of a measurement, plus its running count and sum."""
+
+    def __init__(self):
+        self.values = deque(maxlen=WINDOW)
+        self.count = 0
+        self.sum = 0
+
+    def add(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self):
+        values = sorted(self.values)
+        return [(q, values[min(int(q * len(values)), len(values) - 1)]) for q in QUANTILES]
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper counting the queries of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def instrument_connection(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def record_cache_lookup(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def record(view, metrics, **details):
+    """Add finished ``metrics`` to ``view``'s percentiles and log them."""
+    measurements = metrics.measurements()
+    with _windows_lock:
+        for measurement, value in measurements.items():
+            window = _windows.get((measurement, view))
+            if window is None:
+                window = _windows[measurement, view] = Window()
+            window.add(value)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'view': view, **details, **measurements}))
+
+
+def reset():
+    with _windows_lock:
+        _windows.clear()
+
+
+def totals(view):
+    """``{measurement: (sum, count)}`` recorded for ``view`` since the last ``reset()``."""
+    with _windows_lock:
+        return {
+            measurement: (window.sum, window.count)
+            for (measurement, name), window in _windows.items() if name == view
+        }
+
+
+def prometheus_text():
+    """The percentiles of every view, in Prometheus text exposition format."""
+    with _windows_lock:
+        windows = {
+            key: (window.quantiles(), window.sum, window.count) for key, window in sorted(_windows.items())
+        }
+    lines = []
+    for measurement, help_text in MEASUREMENTS.items():
+        name = f'zaoapp_{measurement}'
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} summary']
+        for (key, view), (quantiles, total, count) in windows.items():
+            if key != measurement:
+                continue
+            label = f'view="{_escape(view)}"'
+            lines += [f'{name}{{{label},quantile="{q}"}} {value}' for q, value in quantiles]
+            lines += [f'{name}_sum{{{label}}} {total}', f'{name}_count{{{label}}} {count}']
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class InstrumentationMiddleware:
+    """Measures each request and reports it (see the module docstring).
+
+    Goes first in ``MIDDLEWARE`` so that the other middleware is measured too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = Metrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = Metrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        metrics.finish()
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        record(view, metrics, method=request.method, status=response.status_code)
+        response['Server-Timing'] = metrics.server_timing()
+        return response
+
+
+class ConsumerMetricsMixin:
+    """Measures each event a Channels consumer handles, as the middleware does requests.
+
+    Events are reported as ``<consumer class>.<event type>``, such as
+    ``CartConsumer.cart_update``.
+    """
+
+    async def dispatch(self, message):
+        metrics = Metrics()
+        token = _current.set(metrics)
+        try:
+            await super().dispatch(message)
+        finally:
+            _current.reset(token)
+            metrics.finish()
+            record(f'{type(self).__name__}.{message["type"]}', metrics)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Django's template backend, timing each render for the request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            # Templates rendered while rendering another are already timed.
+            return self.template.render(context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics.rendering = False
@@ -0,0 +1,150 @@
+"""Stock accounting for carts and checkout.
+
+``Product.stock`` is the number of units still available to carts. Adding a
+product to a cart reserves units by lowering ``stock`` in one conditional
+UPDATE (``... SET stock = stock - n WHERE stock >= n``), so concurrent
+requests can never reserve more than there is, and no change is lost to a
+read-modify-write in Python. The units a line holds are recorded on the line
+(``CartItem.reserved_quantity``) until ``reserved_until``, which each change
+to the line pushes ``CART_RESERVATION_TTL`` seconds ahead.
+
+``release_expired`` returns the stock of abandoned lines. It is run by
+``manage.py release_reservations`` and periodically by ``run_jobs``. A line
+whose reservation expired stays in the cart and is reserved again on its
+next change or at checkout, where ``consume_reservations`` turns the
+reservations into sales.
+
+The catalog cache is not invalidated by reservations, so storefront pages
+may show a stock count up to ``CATALOG_CACHE_TIMEOUT`` old. The count that
+matters is the one checked here. Every stock change sets
+``Product.updated_at``, which the staff report is keyed on (see ``reports``).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import CartItem, Product
+
+# Expired lines released per query by release_expired
+RELEASE_BATCH = 500
+
+
+class OutOfStockError(Exception):
+    """Raised when fewer units are in stock than an operation needs."""
+
+    def __init__(self, product_id, requested, available):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f'only {available} in stock for product_id {product_id}')
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'CART_RESERVATION_TTL', 15 * 60))
+
+
+def take_stock(product_id, quantity):
+    """Remove ``quantity`` units from stock, or raise ``OutOfStockError``."""
+    if quantity <= 0:
+        return
+    taken = Product.objects.filter(pk=product_id, stock__gte=quantity).update(
+        stock=F('stock') - quantity, updated_at=timezone.now(),
+    )
+    if not taken:
+        available = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first()
+        raise OutOfStockError(product_id, quantity, available or 0)
+
+
+def return_stock(product_id, quantity):
+    """Put ``quantity`` units back in stock."""
+    if quantity > 0:
+        Product.objects.filter(pk=product_id).update(stock=F('stock') + quantity, updated_at=timezone.now())
+
+
+def change_reservation(product_id, held, wanted):
+    """Change a line's reservation of ``product_id`` from ``held`` to ``wanted`` units."""
+    if wanted > held:
+        take_stock(product_id, wanted - held)
+    else:
+        return_stock(product_id, held - wanted)
+
+
+def consume_reservations(cart):
+    """Turn the cart's reservations into sales; call inside the checkout transaction.
+
+    Lines that hold fewer units than their quantity (an expired reservation,
+    or a line added outside the cart API) take the rest from stock now, so
+    this raises ``OutOfStockError`` if it has run out. Returns the lines,
+    with their products.
+    """
+    lines = list(
+        CartItem.objects.select_for_update().filter(cart=cart)
+        .select_related('product').order_by('product_id')
+    )
+    for line in lines:
+        change_reservation(line.product_id, line.reserved_quantity, line.quantity)
+    CartItem.objects.filter(cart=cart).update(reserved_quantity=0, reserved_until=None)
+    for line in lines:
+        line.reserved_quantity, line.reserved_until = 0, None
+    return lines
+
+
+def release_expired(now=None):
+    """Give the stock held by expired reservations back; returns the units released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        expired = list(
+            CartItem.objects.filter(reserved_quantity__gt=0, reserved_until__lt=now)
+            .values_list('pk', 'product_id', 'reserved_quantity')[:RELEASE_BATCH]
+        )
+        if not expired:
+            return released
+        for pk, product_id, quantity in expired:
+            with transaction.atomic():
+                # Skipped if a cart update changed the line since it was read.
+                cleared = CartItem.objects.filter(
+                    pk=pk, reserved_quantity=quantity, reserved_until__lt=now,
+                ).update(reserved_quantity=0, reserved_until=None)
+                if cleared:
+                    return_stock(product_id, quantity)
+                    released += quantity
+
+
+def save_product(product, form):
+    """Save ``product`` as edited in ``form`` without losing concurrent stock changes.
+
+    A changed stock count is applied as the difference from the count the
+    form was opened with (sent back as a hidden initial value), so units
+    reserved or sold in the meantime stay accounted for. Only the fields the
+    form changed are written.
+    """
+    if product.pk is None:
+        product.save()
+        return product
+    with transaction.atomic():
+        if 'stock' in form.changed_data:
+            delta = form.cleaned_data['stock'] - _opened_stock(form)
+            Product.objects.filter(pk=product.pk).update(stock=Greatest(F('stock') + delta, 0))
+        fields = [name for name in form.changed_data if name != 'stock']
+        # Saved even when only the stock changed, so post_save handlers run.
+        product.save(update_fields=[*fields, 'updated_at'])
+    product.refresh_from_db(fields=['stock'])
+    return product
+
+
+def _opened_stock(form):
+    field = form.fields['stock']
+    if field.show_hidden_initial:
+        try:
+            value = field.to_python(form.data.get(form.add_initial_prefix('stock')))
+        except ValidationError:
+            value = None
+        if value is not None:
+            return value
+    return form.initial['stock']
@@ -0,0 +1,155 @@
+"""A database-backed job queue for slow work that should not hold a request.
+
+Tasks are plain functions registered with ``@task``; ``enqueue()`` stores a
+``Job`` row and returns at once, and ``manage.py run_jobs`` claims and runs
+pending jobs. Arguments and results must be JSON-serializable.
+
+A failing job is retried with exponential backoff until it has been tried
+``max_attempts`` times. A task's ``concurrency`` caps how many of its jobs run
+at once across all workers; the cap is checked in the same UPDATE that claims
+the job, so two workers cannot both take the last slot. Jobs left running by
+a worker that died are handed out again once ``JOB_LEASE_TIMEOUT`` passes.
+"""
+import logging
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Pending jobs considered per claim attempt
+CLAIM_BATCH = 20
+
+_registry = {}
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: object
+    max_attempts: int = 3
+    retry_delay: float = 5
+    concurrency: int = None
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, user=None, **kwargs):
+        return Job.objects.create(
+            task=self.name, args=list(args), kwargs=kwargs, user=user,
+            max_attempts=self.max_attempts,
+        )
+
+
+def task(name=None, max_attempts=3, retry_delay=5, concurrency=None):
+    """Register a function as a task; call ``func.enqueue(...)`` to queue it."""
+    def decorator(func):
+        spec = Task(name or f'{func.__module__}.{func.__name__}', func, max_attempts, retry_delay, concurrency)
+        _registry[spec.name] = spec
+        return spec
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def lease_timeout():
+    return timedelta(seconds=getattr(settings, 'JOB_LEASE_TIMEOUT', 15 * 60))
+
+
+def claim(worker):
+    """Mark the next runnable job as running for ``worker`` and return it.
+
+    Returns ``None`` when nothing can run right now.
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.PENDING, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', 'task')[:CLAIM_BATCH]
+    )
+    for pk, name in candidates:
+        spec = _registry.get(name)
+        if spec is None:
+            Job.objects.filter(pk=pk, status=Job.PENDING).update(
+                status=Job.FAILED, error=f'Unknown task {name!r}', finished_at=now,
+            )
+            continue
+        claimed = Job.objects.filter(pk=pk, status=Job.PENDING)
+        if spec.concurrency is not None:
+            running = (
+                Job.objects.filter(task=OuterRef('task'), status=Job.RUNNING)
+                .order_by().values('task').annotate(count=Count('id')).values('count')
+            )
+            claimed = claimed.alias(running=Coalesce(Subquery(running), Value(0))).filter(
+                running__lt=spec.concurrency,
+            )
+        if claimed.update(status=Job.RUNNING, worker=worker, started_at=now, attempts=F('attempts') + 1):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed job and record its result, scheduling a retry on failure."""
+    spec = _registry[job.task]
+    try:
+        result = spec.func(*job.args, **job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=spec.retry_delay * 2 ** (job.attempts - 1))
+            logger.warning('Job %s failed (attempt %s), retrying', job, job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.error('Job %s failed after %s attempts', job, job.attempts)
+    else:
+        job.status = Job.DONE
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'run_after', 'finished_at'])
+    return job
+
+
+def requeue_stale():
+    """Requeue jobs that have been running longer than the lease; returns how many.
+
+    The lease must be longer than the slowest task, since a live job past it
+    is assumed to belong to a dead worker.
+    """
+    cutoff = timezone.now() - lease_timeout()
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='Worker lease expired', finished_at=timezone.now(),
+    )
+    return failed + stale.update(status=Job.PENDING, worker='')
+
+
+def run_pending(worker, limit=None):
+    """Run jobs until none are runnable (or ``limit`` have run); return the count."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def find_active(name, args=()):
+    """The oldest unfinished ``name(*args)`` job, to avoid queueing duplicates."""
+    return (
+        Job.objects.filter(task=name, args=list(args), status__in=[Job.PENDING, Job.RUNNING])
+        .order_by('id').first()
+    )
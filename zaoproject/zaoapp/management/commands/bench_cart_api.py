@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.http import HttpResponseNotModified, JsonResponse
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import include, path
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import get_random_string
+from django.utils.http import parse_etags
+
+from zaoapp import search
+from zaoapp.carts import UnknownProductError, apply_cart_operations, parse_operations
+from zaoapp.models import Cart, CartItem, Product
+from zaoapp.views import CART_CACHE_TIMEOUT
+
+from .bench_channel_layer import percentile
+
+
+# The sync cart views as they were before the API went async, as a baseline.
+
+@login_required
+def sync_get_cart(request):
+    cart, created = Cart.objects.get_or_create(user=request.user)
+    etag = cart.etag
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        cache_key = f'cart:payload:{request.user.pk}'
+        cached = cache.get(cache_key)
+        if cached and cached[0] == etag:
+            payload = cached[1]
+        else:
+            payload = cart.to_dict()
+            cache.set(cache_key, (etag, payload), CART_CACHE_TIMEOUT)
+        response = JsonResponse(payload)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def sync_update_cart(request):
+    data = json.loads(request.body)
+    operations = parse_operations([{'op': 'set', 'product_id': data['product_id'], 'quantity': data['quantity']}])
+    cart, created = Cart.objects.get_or_create(user=request.user)
+    try:
+        apply_cart_operations(cart, operations)
+    except UnknownProductError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+    return JsonResponse({'success': True, **cart.to_dict()})
+
+
+def sync_find_product_by_name(request):
+    product = search.find_by_name(request.GET['name'])
+    if not product:
+        return JsonResponse({'error': 'product not found'}, status=404)
+    return JsonResponse({'id': product.id, 'name': product.name, 'price': float(product.price)})
+
+
+urlpatterns = [
+    path('sync/api/cart/get/', sync_get_cart),
+    path('sync/api/cart/update/', sync_update_cart),
+    path('sync/api/products/find/', sync_find_product_by_name),
+    path('', include('zaoproject.urls')),
+]
+
+SCENARIOS = ('cart', 'cart-304', 'update', 'find')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/s and latency of the cart API views (async for writes, sync for '
+        'reads) with the all-sync views they replaced, under ASGI, driven in-process by '
+        'concurrent clients.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per scenario and variant.')
+        parser.add_argument('--users', type=int, default=100, help='Shoppers the clients are spread over.')
+        parser.add_argument('--lines', type=int, default=10, help='Lines in each cart.')
+        parser.add_argument('--scenario', choices=SCENARIOS, action='append', help='Run only these scenarios.')
+
+    def handle(self, *args, **options):
+        # Request metrics are not logged one by one.
+        logging.getLogger('zaoapp.instrumentation').setLevel(logging.WARNING)
+        with tempfile.TemporaryDirectory() as directory:
+            # A throwaway file database: an in-memory one cannot take concurrent writers.
+            connections['default'].settings_dict['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            # Likewise a throwaway cache file, which run_benchmarks clears between runs.
+            caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+            caches['default']['LOCATION'] = str(Path(directory) / 'cache.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                with override_settings(ROOT_URLCONF=__name__, DEBUG=False, CACHES=caches):
+                    self.run_benchmarks(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+    def run_benchmarks(self, options):
+        sessions, products = seed(options['users'], options['lines'])
+        app = ASGIHandler()
+        self.stdout.write(
+            f'{options["connections"]} connections, {options["requests"]} requests per run, '
+            f'{options["users"]} users with {options["lines"]} lines each\n'
+        )
+        self.stdout.write(
+            f'{"scenario":<10}{"views":<7}{"req/s":>9}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}'
+        )
+        for scenario in options['scenario'] or SCENARIOS:
+            for variant in ('sync', 'async'):
+                cache.clear()
+                requests = [
+                    build_request(scenario, variant, sessions[i % len(sessions)], products, i)
+                    for i in range(options['requests'])
+                ]
+                result = asyncio.run(drive(app, requests, options['connections']))
+                self.report(scenario, variant, result)
+
+    def report(self, scenario, variant, result):
+        elapsed, latencies, errors = result
+        latencies.sort()
+        self.stdout.write(
+            f'{scenario:<10}{variant:<7}{len(latencies) / elapsed:>9.0f}'
+            f'{statistics.median(latencies) * 1000:>10.1f}'
+            f'{percentile(latencies, 99) * 1000:>10.1f}{errors:>8}'
+        )
+
+
+def seed(users, lines):
+    products = Product.objects.bulk_create(
+        Product(name=f'Bench product {i}', price=Decimal('1.50') + i, stock=10 ** 9) for i in range(max(lines, 20))
+    )
+    search.rebuild_index()
+    sessions = []
+    for i in range(users):
+        user = User.objects.create_user(f'bench{i}')
+        cart, created = Cart.objects.get_or_create(user=user)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=1, unit_price=product.price)
+            for product in products[:lines]
+        )
+        Cart.recount([cart.pk])
+        cart.refresh_from_db(fields=['version'])
+        client = Client()
+        client.force_login(user)
+        sessions.append((client.cookies['sessionid'].value, cart.etag))
+    return sessions, [product.pk for product in products]
+
+
+def build_request(scenario, variant, session, products, i):
+    """An ASGI ``(scope, body)`` pair for request ``i`` of ``scenario``."""
+    session_id, etag = session
+    prefix = '/sync' if variant == 'sync' else ''
+    csrf = get_random_string(32)
+    headers = [(b'host', b'testserver'), (b'cookie', f'sessionid={session_id}; csrftoken={csrf}'.encode())]
+    method, query, body = 'GET', '', b''
+    if scenario in ('cart', 'cart-304'):
+        url = '/api/cart/get/'
+        if scenario == 'cart-304':
+            headers.append((b'if-none-match', etag.encode()))
+    elif scenario == 'update':
+        url, method = '/api/cart/update/', 'POST'
+        body = json.dumps({'product_id': products[i % len(products)], 'quantity': i % 5}).encode()
+        headers += [(b'content-type', b'application/json'), (b'x-csrftoken', csrf.encode())]
+    else:
+        url, query = '/api/products/find/', urlencode({'name': f'product {i % len(products)}'})
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': prefix + url, 'raw_path': (prefix + url).encode(),
+        'query_string': query.encode(), 'root_path': '', 'headers': headers,
+        'client': ('127.0.0.1', 40000 + i % 20000), 'server': ('testserver', 80),
+    }
+    return scope, body
+
+
+async def call(app, scope, body):
+    """Run one request through ``app`` and return the response status."""
+    status = 0
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Future()  # the client never disconnects
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def drive(app, requests, connections):
+    """Send ``requests`` through ``app`` from ``connections`` concurrent clients."""
+    queue = list(reversed(requests))
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while queue:
+            scope, body = queue.pop()
+            started = time.perf_counter()
+            status = await call(app, scope, body)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return time.perf_counter() - start, latencies, errors
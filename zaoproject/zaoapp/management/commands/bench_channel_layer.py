@@ -0,0 +1,68 @@
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from zaoapp.channel_layers import SQLiteChannelLayer
+
+
+class Command(BaseCommand):
+    help = 'Compare group fan-out throughput and latency of the SQLite and in-memory channel layers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--receivers', type=int, default=50, help='Channels in the group.')
+        parser.add_argument('--messages', type=int, default=200, help='Group sends per run.')
+
+    def handle(self, *args, **options):
+        receivers, messages = options['receivers'], options['messages']
+        self.stdout.write(f'{receivers} receivers x {messages} group sends\n')
+        self.stdout.write(f'{"layer":<22}{"deliveries/s":>14}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+        in_memory = InMemoryChannelLayer(capacity=messages)
+        self.report('in-memory', asyncio.run(fan_out(in_memory, in_memory, receivers, messages)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'channels.sqlite3'
+            # Separate instances, as two worker processes would have.
+            sender = SQLiteChannelLayer(path=path, capacity=messages)
+            receiver = SQLiteChannelLayer(path=path, capacity=messages)
+            self.report('sqlite (2 instances)', asyncio.run(fan_out(sender, receiver, receivers, messages)))
+
+    def report(self, name, result):
+        elapsed, latencies = result
+        latencies.sort()
+        self.stdout.write(
+            f'{name:<22}{len(latencies) / elapsed:>14.0f}'
+            f'{statistics.median(latencies) * 1000:>10.2f}'
+            f'{percentile(latencies, 95) * 1000:>10.2f}'
+            f'{percentile(latencies, 99) * 1000:>10.2f}'
+        )
+
+
+async def fan_out(sender, receiver, receivers, messages):
+    channels = [await receiver.new_channel() for _ in range(receivers)]
+    for channel in channels:
+        await receiver.group_add('bench', channel)
+    latencies = []
+
+    async def consume(channel):
+        for _ in range(messages):
+            message = await receiver.receive(channel)
+            latencies.append(time.perf_counter() - message['sent'])
+
+    consumers = [asyncio.ensure_future(consume(channel)) for channel in channels]
+    start = time.perf_counter()
+    for _ in range(messages):
+        await sender.group_send('bench', {'type': 'bench', 'sent': time.perf_counter()})
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - start
+    await sender.flush()
+    return elapsed, latencies
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
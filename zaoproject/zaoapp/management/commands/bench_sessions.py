@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import statistics
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import reverse
+
+from zaoapp.sqlite_backend.base import close_pool
+
+from . import bench_cart_api
+from .bench_channel_layer import percentile
+
+SCENARIOS = ('cart-304', 'cart')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the per-request cost of authenticated cart API calls with database sessions '
+        'and a per-process cache, and with cached_db sessions on the shared cache in settings.CACHES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=100, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario and profile.')
+        parser.add_argument('--users', type=int, default=100, help='Shoppers the clients are spread over.')
+        parser.add_argument('--lines', type=int, default=10, help='Lines in each cart.')
+        parser.add_argument('--scenario', choices=SCENARIOS, action='append', help='Run only these scenarios.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{options["connections"]} connections, {options["requests"]} requests per run, '
+            f'{options["users"]} users with {options["lines"]} lines each\n'
+        )
+        self.stdout.write(
+            f'{"scenario":<10}{"sessions":<11}{"req/s":>9}{"p50 ms":>10}{"p99 ms":>10}{"queries":>9}{"errors":>8}'
+        )
+        # Failed requests are counted, not logged one by one, and neither are request metrics.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        logging.getLogger('zaoapp.instrumentation').setLevel(logging.WARNING)
+        for scenario in options['scenario'] or SCENARIOS:
+            for profile in ('db', 'cached_db'):
+                self.stdout.write(self.run_profile(scenario, profile, options))
+
+    def run_profile(self, scenario, profile, options):
+        database = connections['default'].settings_dict
+        with tempfile.TemporaryDirectory() as directory:
+            database['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            if profile == 'db':
+                profile_settings = {
+                    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+                    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                }
+            else:
+                caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+                caches['default']['LOCATION'] = str(Path(directory) / 'cache.sqlite3')
+                profile_settings = {
+                    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+                    'CACHES': caches,
+                }
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                with override_settings(
+                    ROOT_URLCONF=bench_cart_api.__name__, DEBUG=False,
+                    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                    **profile_settings,
+                ):
+                    cache.clear()
+                    sessions, products = bench_cart_api.seed(options['users'], options['lines'])
+                    queries = count_queries(scenario, sessions[0])
+                    requests = [
+                        bench_cart_api.build_request(scenario, 'async', sessions[i % len(sessions)], products, i)
+                        for i in range(options['requests'])
+                    ]
+                    elapsed, latencies, errors = asyncio.run(
+                        bench_cart_api.drive(ASGIHandler(), requests, options['connections'])
+                    )
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                close_pool()
+        latencies.sort()
+        return (
+            f'{scenario:<10}{profile:<11}{len(latencies) / elapsed:>9.0f}'
+            f'{statistics.median(latencies) * 1000:>10.1f}'
+            f'{percentile(latencies, 99) * 1000:>10.1f}{queries:>9}{errors:>8}'
+        )
+
+
+def count_queries(scenario, session):
+    """Database queries made by one warm request of ``scenario``."""
+    session_id, etag = session
+    client = Client()
+    client.cookies['sessionid'] = session_id
+    headers = {'If-None-Match': etag} if scenario == 'cart-304' else {}
+    client.get(reverse('get_cart'), headers=headers)
+    with CaptureQueriesContext(connections['default']) as queries:
+        client.get(reverse('get_cart'), headers=headers)
+    return len(queries)
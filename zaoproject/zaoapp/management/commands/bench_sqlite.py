@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import statistics
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from zaoapp.sqlite_backend.base import close_pool
+
+from . import bench_cart_api
+from .bench_channel_layer import percentile
+
+SCENARIOS = ('update', 'cart')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cart API throughput on Django's default SQLite setup and on the tuned "
+        'profile in settings.DATABASES (WAL, pragmas, BEGIN IMMEDIATE, connection pool).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=100, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario and profile.')
+        parser.add_argument('--users', type=int, default=100, help='Shoppers the clients are spread over.')
+        parser.add_argument('--lines', type=int, default=10, help='Lines in each cart.')
+        parser.add_argument('--scenario', choices=SCENARIOS, action='append', help='Run only these scenarios.')
+
+    def handle(self, *args, **options):
+        database = connections['default'].settings_dict
+        tuned = settings.DATABASES['default'].get('OPTIONS', {})
+        profiles = [('default', {}), ('tuned', tuned)]
+        self.stdout.write(
+            f'{options["connections"]} connections, {options["requests"]} requests per run, '
+            f'{options["users"]} users with {options["lines"]} lines each\n'
+        )
+        self.stdout.write(f'{"scenario":<10}{"profile":<9}{"req/s":>9}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        # Failed requests are counted, not logged one by one, and neither are request metrics.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        logging.getLogger('zaoapp.instrumentation').setLevel(logging.WARNING)
+        saved_options = database['OPTIONS']
+        try:
+            for name, profile_options in profiles:
+                database['OPTIONS'] = dict(profile_options)
+                for scenario in options['scenario'] or SCENARIOS:
+                    # A fresh file each run: WAL mode stays set on the file.
+                    self.stdout.write(self.run_profile(database, scenario, name, options))
+        finally:
+            database['OPTIONS'] = saved_options
+
+    def run_profile(self, database, scenario, name, options):
+        with tempfile.TemporaryDirectory() as directory:
+            database['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                with override_settings(
+                    ROOT_URLCONF=bench_cart_api.__name__, DEBUG=False,
+                    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                ):
+                    cache.clear()
+                    sessions, products = bench_cart_api.seed(options['users'], options['lines'])
+                    requests = [
+                        bench_cart_api.build_request(scenario, 'async', sessions[i % len(sessions)], products, i)
+                        for i in range(options['requests'])
+                    ]
+                    elapsed, latencies, errors = asyncio.run(
+                        bench_cart_api.drive(ASGIHandler(), requests, options['connections'])
+                    )
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                close_pool()
+        latencies.sort()
+        return (
+            f'{scenario:<10}{name:<9}{len(latencies) / elapsed:>9.0f}'
+            f'{statistics.median(latencies) * 1000:>10.1f}'
+            f'{percentile(latencies, 99) * 1000:>10.1f}{errors:>8}'
+        )
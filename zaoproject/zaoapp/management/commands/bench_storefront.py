@@ -0,0 +1,373 @@
+import asyncio
+import json
+import logging
+import random
+import resource
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from PIL import Image
+
+from zaoapp import instrumentation, jobs, search
+from zaoapp.carts import apply_cart_operations
+from zaoapp.models import Cart, CartItem, Product
+from zaoapp.sqlite_backend.base import close_pool
+from zaoproject import asgi
+
+from . import bench_cart_api
+from .bench_channel_layer import percentile
+
+SCENARIOS = ('index', 'cart', 'update', 'find', 'report', 'ws-connect', 'ws-push')
+
+# Scenario -> the view (or consumer event) whose queries it reports
+VIEWS = {
+    'index': 'index',
+    'cart': 'get_cart',
+    'update': 'update_cart',
+    'find': 'find_product_by_name',
+    'report': 'product_admin_report_pdf',
+    'ws-connect': 'CartConsumer.websocket.connect',
+    'ws-push': 'CartConsumer.cart_item_added',
+}
+
+# Result -> +1 if it regresses by going up, -1 by going down. The other
+# results are shown but not compared.
+CHECKED = {
+    'requests_per_second': -1,
+    'p95_ms': 1,
+    'queries_per_request': 1,
+    'errors': 1,
+    'peak_rss_mb': 1,
+    'build_seconds': 1,
+}
+
+IMAGE_COLOURS = ('#d35400', '#27ae60', '#2980b9', '#8e44ad', '#f1c40f', '#c0392b', '#16a085', '#7f8c8d')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic storefront and load-test the storefront page, cart API, product '
+        'search, PDF report and cart WebSockets through the ASGI application, in-process. '
+        'With --compare, fail if a result regressed against a saved baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100, help='Products, each with an image.')
+        parser.add_argument('--users', type=int, default=100, help='Shoppers, with carts of varying size.')
+        parser.add_argument('--max-lines', type=int, default=20, help='Largest cart.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per HTTP scenario.')
+        parser.add_argument('--connections', type=int, default=50, help='Concurrent HTTP clients.')
+        parser.add_argument('--sockets', type=int, default=200, help='Concurrent cart WebSockets.')
+        parser.add_argument('--pushes', type=int, default=5, help='Cart changes pushed to every socket.')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the dataset and requests.')
+        parser.add_argument('--scenario', choices=SCENARIOS, action='append', help='Run only these scenarios.')
+        parser.add_argument('--save', metavar='FILE', help='Write the results to FILE as JSON, as a baseline.')
+        parser.add_argument('--compare', metavar='FILE', help='Fail if results regressed against FILE.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Fraction a checked result may move the wrong way before it counts as a regression.',
+        )
+
+    def handle(self, *args, **options):
+        config = {
+            key: options[key]
+            for key in ('products', 'users', 'max_lines', 'requests', 'connections', 'sockets', 'pushes', 'seed')
+        }
+        baseline = {}
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline: {exc}')
+            if baseline.get('config') != config:
+                raise CommandError(f'The baseline was recorded with other options: {baseline.get("config")}')
+
+        # Failed requests are counted, not logged one by one, and neither are request metrics.
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        logging.getLogger('zaoapp.instrumentation').setLevel(logging.WARNING)
+        with tempfile.TemporaryDirectory() as directory:
+            results = self.run(Path(directory), options)
+
+        if options['save']:
+            Path(options['save']).write_text(json.dumps({'config': config, 'results': results}, indent=2))
+        if baseline:
+            regressions = compare(results, baseline['results'], options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(f'Regression: {regression}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} result(s) regressed against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}'))
+
+    def run(self, directory, options):
+        database = connections['default'].settings_dict
+        database['TEST']['NAME'] = str(directory / 'bench.sqlite3')
+        caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+        caches['default']['LOCATION'] = str(directory / 'cache.sqlite3')
+        layers = {
+            alias: {**config, 'CONFIG': dict(config.get('CONFIG', {}))} for alias, config in settings.CHANNEL_LAYERS.items()
+        }
+        layers['default']['CONFIG']['path'] = directory / 'channels.sqlite3'
+        # The manifest only exists after collectstatic
+        storages = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }
+
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            with override_settings(
+                DEBUG=False, CACHES=caches, CHANNEL_LAYERS=layers, STORAGES=storages,
+                MEDIA_ROOT=directory / 'media', REPORTS_ROOT=directory / 'reports',
+            ):
+                cache.clear()
+                rng = random.Random(options['seed'])
+                started = time.perf_counter()
+                dataset = seed(rng, options)
+                self.stdout.write(
+                    f'Seeded {options["products"]} products and {options["users"]} carts '
+                    f'in {time.perf_counter() - started:.1f}s; {options["requests"]} requests per scenario '
+                    f'from {options["connections"]} clients, {options["sockets"]} sockets\n'
+                )
+                self.stdout.write(
+                    f'{"scenario":<12}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+                    f'{"queries":>9}{"errors":>8}{"rss MB":>8}'
+                )
+                results = {}
+                for scenario in options['scenario'] or SCENARIOS:
+                    instrumentation.reset()
+                    results[scenario] = self.measure(scenario, rng, dataset, options)
+                    self.report(scenario, results[scenario])
+                return results
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            close_pool()
+
+    def measure(self, scenario, rng, dataset, options):
+        extra = {}
+        if scenario == 'ws-connect':
+            elapsed, latencies, errors = asyncio.run(open_sockets(dataset, options['sockets']))
+        elif scenario == 'ws-push':
+            elapsed, latencies, errors = asyncio.run(push_to_sockets(dataset, options))
+        else:
+            if scenario == 'report':
+                extra['build_seconds'] = build_report(dataset)
+            requests = [build_request(scenario, rng, dataset, i) for i in range(options['requests'])]
+            elapsed, latencies, errors = asyncio.run(
+                bench_cart_api.drive(asgi.application, requests, options['connections'])
+            )
+        latencies.sort()
+        queries, count = instrumentation.totals(VIEWS[scenario]).get('db_queries', (0, 0))
+        return {
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_per_request': round(queries / count, 2) if count else 0,
+            'errors': errors,
+            # Peak resident memory of the process so far (kilobytes on Linux)
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            **extra,
+        }
+
+    def report(self, scenario, result):
+        self.stdout.write(
+            f'{scenario:<12}{result["requests_per_second"]:>9.0f}{result["p50_ms"]:>9.1f}'
+            f'{result["p95_ms"]:>9.1f}{result["p99_ms"]:>9.1f}{result["queries_per_request"]:>9}'
+            f'{result["errors"]:>8}{result["peak_rss_mb"]:>8.0f}'
+        )
+        if 'build_seconds' in result:
+            self.stdout.write(f'{"":<12}report built in {result["build_seconds"]:.2f}s')
+
+
+def seed(rng, options):
+    """Products with images, and carts of 0 to ``max_lines`` lines with a logged-in session each."""
+    images = [_jpeg(colour) for colour in IMAGE_COLOURS]
+    products = []
+    for i in range(options['products']):
+        product = Product(
+            name=f'Bench product {i}',
+            description=f'Synthetic product {i} for benchmarks.',
+            price=Decimal(rng.randrange(100, 500000)) / 100,
+            stock=10 ** 9,
+        )
+        product.image.save(f'bench-{i}.jpg', ContentFile(rng.choice(images)), save=False)
+        product.save()
+        products.append(product)
+    # The image variants, as the run_jobs worker would make them
+    jobs.run_pending('bench')
+    search.rebuild_index()
+
+    users = []
+    for i in range(options['users']):
+        user = User.objects.create_user(f'bench{i}')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=rng.randint(1, 5), unit_price=product.price)
+            for product in rng.sample(products, rng.randint(0, min(options['max_lines'], len(products))))
+        )
+        users.append(user)
+    Cart.recount(list(Cart.objects.values_list('pk', flat=True)))
+
+    sessions = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        sessions.append((client.cookies['sessionid'].value, Cart.objects.get(user=user).etag))
+    staff = User.objects.create_superuser('bench-staff', 'staff@example.com', None)
+    client = Client()
+    client.force_login(staff)
+    return {
+        'users': users,
+        'sessions': sessions,
+        'products': [product.pk for product in products],
+        'staff_session': client.cookies['sessionid'].value,
+    }
+
+
+def _jpeg(colour):
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), colour).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def build_request(scenario, rng, dataset, i):
+    session = rng.choice(dataset['sessions'])
+    if scenario in ('cart', 'update', 'find'):
+        return bench_cart_api.build_request(scenario, 'async', session, dataset['products'], rng.randrange(10 ** 6))
+    if scenario == 'index':
+        return get_request('/', session[0], i)
+    return get_request('/dashboard/products/report/pdf/', dataset['staff_session'], i)
+
+
+def get_request(path, session_id, i):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', f'sessionid={session_id}'.encode())],
+        'client': ('127.0.0.1', 40000 + i % 20000), 'server': ('testserver', 80),
+    }
+    return scope, b''
+
+
+def build_report(dataset):
+    """Ask for the report, which queues its job, and run the job; returns the seconds it took."""
+    client = Client()
+    client.cookies['sessionid'] = dataset['staff_session']
+    started = time.perf_counter()
+    client.get('/dashboard/products/report/pdf/')
+    jobs.run_pending('bench')
+    return round(time.perf_counter() - started, 3)
+
+
+def socket_scope(session_id):
+    return {
+        'type': 'websocket', 'path': '/ws/cart/', 'raw_path': b'/ws/cart/', 'query_string': b'',
+        'headers': [(b'host', b'testserver'), (b'cookie', f'sessionid={session_id}'.encode())],
+        'subprotocols': [], 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+
+
+async def open_sockets(dataset, count):
+    """Open ``count`` cart sockets at once and close them again."""
+    elapsed, latencies, errors, sockets = await connect_sockets(dataset, count)
+    await disconnect(sockets)
+    return elapsed, latencies, errors
+
+
+async def connect_sockets(dataset, count):
+    """Open ``count`` cart sockets at once, spread over the users."""
+    latencies = []
+    sockets = []
+    errors = 0
+
+    async def connect(i):
+        nonlocal errors
+        user_index = i % len(dataset['users'])
+        communicator = ApplicationCommunicator(asgi.application, socket_scope(dataset['sessions'][user_index][0]))
+        started = time.perf_counter()
+        await communicator.send_input({'type': 'websocket.connect'})
+        response = await communicator.receive_output(timeout=30)
+        latencies.append(time.perf_counter() - started)
+        if response['type'] != 'websocket.accept':
+            errors += 1
+            return
+        sockets.append((dataset['users'][user_index], communicator))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connect(i) for i in range(count)))
+    return time.perf_counter() - start, latencies, errors, sockets
+
+
+async def disconnect(sockets):
+    for _, communicator in sockets:
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+    await asyncio.gather(*(communicator.wait(timeout=30) for _, communicator in sockets))
+
+
+async def push_to_sockets(dataset, options):
+    """Change each connected user's cart ``pushes`` times and time the frames reaching their sockets."""
+    _, _, errors, sockets = await connect_sockets(dataset, options['sockets'])
+    users = {user.pk: user for user, _ in sockets}
+    carts = {cart.user_id: cart for cart in await sync_to_async(list)(Cart.objects.filter(user_id__in=users))}
+    product = dataset['products'][0]
+    latencies = []
+    elapsed = 0
+
+    def change_carts(quantity, sent):
+        for user_id, cart in carts.items():
+            sent[user_id] = time.perf_counter()
+            apply_cart_operations(cart, [('set', product, quantity)])
+
+    async def receive(user, communicator, sent, received):
+        nonlocal errors
+        try:
+            await communicator.receive_output(timeout=30)
+        except asyncio.TimeoutError:
+            errors += 1
+            return
+        received.append(time.perf_counter())
+        latencies.append(received[-1] - sent[user.pk])
+        # Changes published after the first frame went out arrive in a second one.
+        while not await communicator.receive_nothing(timeout=0.2):
+            await communicator.receive_output()
+
+    for push in range(options['pushes']):
+        sent, received = {}, []
+        start = time.perf_counter()
+        await asyncio.gather(
+            sync_to_async(change_carts)(push + 1, sent),
+            *(receive(user, communicator, sent, received) for user, communicator in sockets),
+        )
+        # Up to the last delivery, leaving out the wait for stray frames
+        elapsed += max(received, default=start) - start
+    await disconnect(sockets)
+    return elapsed, latencies, errors
+
+
+def compare(results, baseline, tolerance):
+    """Descriptions of the checked results that moved the wrong way by more than ``tolerance``."""
+    regressions = []
+    for scenario, result in results.items():
+        for key, direction in CHECKED.items():
+            if key not in result or key not in baseline.get(scenario, {}):
+                continue
+            old, new = baseline[scenario][key], result[key]
+            limit = old * (1 + tolerance * direction)
+            if (new - limit) * direction > 0:
+                regressions.append(f'{scenario} {key} {old} -> {new}')
+    return regressions
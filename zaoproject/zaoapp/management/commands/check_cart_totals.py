@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from zaoapp import carts
+
+
+class Command(BaseCommand):
+    help = "Compare every cart's stored item count and total with its lines, optionally repairing drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Recount drifted carts from their lines.')
+
+    def handle(self, *args, **options):
+        drifted = carts.check_totals(fix=options['fix'])
+        for cart_id, (count, total), (line_count, line_total) in drifted:
+            self.stdout.write(
+                f'cart {cart_id}: stored {count} items / {total}, lines {line_count} items / {line_total}'
+            )
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All cart totals match their lines.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Recounted {len(drifted)} carts.'))
+        else:
+            raise CommandError(f'{len(drifted)} carts have drifted; run with --fix to repair them.')
@@ -0,0 +1,44 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from zaoapp.models import Product
+from zaoapp.tasks import make_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Create resized WebP/JPEG copies of product images that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate existing variants too.')
+        parser.add_argument('--enqueue', action='store_true', help='Queue jobs for run_jobs instead of working inline.')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_variants')
+        done = 0
+        for product in products.iterator():
+            if not (options['force'] or product.needs_image_variants):
+                continue
+            if options['enqueue']:
+                make_image_variants.enqueue(product.pk, force=options['force'])
+            elif make_image_variants(product.pk, force=options['force']) is not None:
+                product.refresh_from_db(fields=['image_variants'])
+                self.report(product)
+            done += 1
+        verb = 'Queued' if options['enqueue'] else 'Processed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {done} product images.'))
+
+    def report(self, product):
+        original = _size(product.image.name)
+        card = product.image_variants['webp']
+        width = min(card, key=lambda w: abs(int(w) - 320))
+        self.stdout.write(
+            f'{product.image.name}: {original // 1024} KB original, '
+            f'{_size(card[width]) // 1024} KB at {width}px (webp)'
+        )
+
+
+def _size(name):
+    try:
+        return default_storage.size(name)
+    except OSError:
+        return 0
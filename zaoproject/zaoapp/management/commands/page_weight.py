@@ -0,0 +1,122 @@
+import gzip
+import json
+import re
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+try:
+    import brotli
+except ImportError:  # optional, as for WhiteNoise
+    brotli = None
+
+DEFAULT_PAGES = ['/', '/cart/', '/login/', '/register/', '/contact/']
+ASSET_RE = re.compile(r'<(?:script|link|img|source)\b[^>]*?\b(?:src|href)="([^"]+)"', re.IGNORECASE)
+
+
+class Command(BaseCommand):
+    help = 'Report bytes transferred per page (HTML plus same-origin assets), compressed as served.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages', nargs='*', default=DEFAULT_PAGES)
+        parser.add_argument('--save', metavar='FILE', help='Write the results to FILE as JSON.')
+        parser.add_argument('--compare', metavar='FILE', help='Show the change against results saved earlier.')
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline: {exc}')
+
+        client = Client()
+        results = {}
+        encoding = 'br' if brotli else 'gzip'
+        self.stdout.write(f'Sizes are {encoding}-compressed; external (CDN) assets are not counted.\n')
+        self.stdout.write(
+            f'{"page":<14}{"html":>10}{"inline js":>11}{"assets":>11}{"first view":>12}{"304s":>6}'
+        )
+        for page in options['pages']:
+            results[page] = self.measure(client, page)
+            self.report(page, results[page], baseline.get(page))
+
+        if options['save']:
+            Path(options['save']).write_text(json.dumps(results, indent=2))
+
+    def measure(self, client, page):
+        response = client.get(page)
+        if response.status_code != 200:
+            raise CommandError(f'{page} returned {response.status_code}')
+        html = response.content
+        assets = {}
+        for url in dict.fromkeys(ASSET_RE.findall(html.decode('utf-8', 'replace'))):
+            parts = urlsplit(url)
+            if parts.netloc:
+                continue
+            body = _asset_body(parts.path)
+            if body is not None:
+                # Hashed (versioned) URLs are cached by the browser after the first view.
+                assets[url] = {'bytes': _compressed_size(body), 'cached': _is_versioned(parts)}
+        asset_bytes = sum(asset['bytes'] for asset in assets.values())
+        html_bytes = _compressed_size(html)
+        return {
+            'html': html_bytes,
+            'assets': asset_bytes,
+            'first_view': html_bytes + asset_bytes,
+            # Unversioned assets cost a conditional request (a 304) on every view.
+            'revalidations': sum(1 for asset in assets.values() if not asset['cached']),
+            'inline_script': sum(len(s) for s in re.findall(rb'<script>(.*?)</script>', html, re.S)),
+        }
+
+    def report(self, page, result, before):
+        line = (
+            f'{page:<14}{_kb(result["html"]):>10}{_kb(result["inline_script"]):>11}'
+            f'{_kb(result["assets"]):>11}{_kb(result["first_view"]):>12}{result["revalidations"]:>6}'
+        )
+        if before:
+            line += (
+                f'   was {_kb(before["html"])} html, {_kb(before["first_view"])} first view,'
+                f' {before["revalidations"]} 304s'
+            )
+        self.stdout.write(line)
+
+
+def _asset_body(path):
+    for prefix, root in ((settings.STATIC_URL, None), (settings.MEDIA_URL, settings.MEDIA_ROOT)):
+        prefix = '/' + prefix.strip('/') + '/'
+        if not path.startswith(prefix):
+            continue
+        name = path[len(prefix):]
+        if root is None:
+            found = finders.find(_unhashed(name)) or Path(settings.STATIC_ROOT) / name
+        else:
+            found = Path(root) / name
+        try:
+            return Path(found).read_bytes()
+        except OSError:
+            return None
+    return None
+
+
+def _unhashed(name):
+    # styles/style.3f2a1b9c0d4e.css -> styles/style.css
+    return re.sub(r'\.[0-9a-f]{12}(\.[^./]+)$', r'\1', name)
+
+
+def _is_versioned(parts):
+    return 'v=' in parts.query or _unhashed(parts.path) != parts.path
+
+
+def _compressed_size(body):
+    if brotli:
+        return len(brotli.compress(body))
+    return len(gzip.compress(body, 9))
+
+
+def _kb(size):
+    return f'{size / 1024:.1f} KB'
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from zaoapp import cart_lifecycle
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete carts idle for longer than CART_IDLE_TTL (empty ones after CART_EMPTY_IDLE_TTL), '
+        'in short batches. Meant to run daily, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive', action='store_true', help='Keep what each purged cart held as an ArchivedCart.')
+        parser.add_argument('--batch-size', type=int, default=cart_lifecycle.PURGE_BATCH, help='Carts deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to wait between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the carts that would be purged.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = cart_lifecycle.purge_idle_carts(
+            archive=options['archive'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(f'Would purge {stats["carts"]} carts with {stats["lines"]} lines.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {stats["carts"]} carts and {stats["lines"]} lines '
+            f'({stats["archived"]} archived) in {stats["batches"]} batches, {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from zaoapp import search
+
+
+class Command(BaseCommand):
+    help = 'Recompute normalized product names and refill the full-text search index.'
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index()
+        backend = 'FTS5' if search.fts_available() else 'search_name fallback'
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products ({backend}).'))
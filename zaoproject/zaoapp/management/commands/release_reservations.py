@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from zaoapp import inventory
+
+
+class Command(BaseCommand):
+    help = 'Return the stock held by expired cart reservations (run_jobs also does this every minute).'
+
+    def handle(self, *args, **options):
+        released = inventory.release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} reserved units.'))
@@ -0,0 +1,79 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from zaoapp import inventory, jobs
+
+# Seconds between checks for jobs abandoned by dead workers and for expired
+# cart reservations
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (reports, image processing, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Jobs to run at once.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when idle.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is runnable.')
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(target=self.work, args=(f'{name}:{i}', options), name=f'job-worker-{i}')
+            for i in range(options['concurrency'])
+        ]
+        self.stdout.write(f'Running jobs with {len(threads)} worker threads')
+        for thread in threads:
+            thread.start()
+        next_stale_check = 0
+        while any(thread.is_alive() for thread in threads):
+            if not options['burst'] and time.monotonic() >= next_stale_check:
+                self.requeue_stale()
+                self.release_reservations()
+                next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+            self.stopping.wait(1)
+
+    def stop(self, signum, frame):
+        self.stdout.write('Finishing running jobs, then stopping')
+        self.stopping.set()
+
+    def requeue_stale(self):
+        try:
+            requeued = jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} abandoned jobs')
+        finally:
+            connection.close()
+
+    def release_reservations(self):
+        try:
+            released = inventory.release_expired()
+            if released:
+                self.stdout.write(f'Released {released} units held by expired cart reservations')
+        finally:
+            connection.close()
+
+    def work(self, worker, options):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                job = jobs.claim(worker)
+                if job is None:
+                    if options['burst']:
+                        break
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+                job = jobs.run(job)
+                self.stdout.write(f'{job} after {job.attempts} attempt(s)')
+        finally:
+            connection.close()
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from zaoapp import db_router
+from zaoapp.sqlite_backend.base import sqlite_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the SQLite read replicas (settings.REPLICA_DATABASE_FILES) with a consistent '
+        'copy of the primary, replacing each file atomically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying every INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        aliases = db_router.replicas()
+        if not aliases:
+            raise CommandError('No replicas configured; add files to REPLICA_DATABASE_FILES.')
+        primary = connections[db_router.PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas copies SQLite databases only.')
+        while True:
+            for alias in aliases:
+                started = time.monotonic()
+                path = sqlite_path(connections[alias].settings_dict['NAME'])
+                size = copy_database(primary, path)
+                self.stdout.write(f'{alias}: copied {size / 1024:.0f} KB in {time.monotonic() - started:.2f}s')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+
+def copy_database(primary, path):
+    """Copy the database of connection ``primary`` to ``path``; returns its size in bytes.
+
+    The backup API reads one snapshot of the primary without blocking its
+    writers in WAL mode. The copy is written beside ``path`` and then renamed
+    over it, so readers see either the old file or the new one. Connections
+    still open on the old file are dropped by the backend's pool.
+    """
+    primary.ensure_connection()
+    temporary = f'{path}.tmp'
+    copy = sqlite3.connect(temporary)
+    try:
+        primary.connection.backup(copy)
+        # Replicas are opened read-only, which a WAL database cannot be
+        # without its -shm file.
+        copy.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        copy.close()
+    os.replace(temporary, path)
+    return os.path.getsize(path)
@@ -0,0 +1,207 @@
+"""Serving uploaded media in production.
+
+``VersionedMediaStorage`` adds ``?v=<content hash>`` to every media URL, so a
+response for a URL that carries the current hash can be cached for a year;
+unversioned or outdated URLs are revalidated on every use. ``serve`` answers
+conditional requests from the ETag/Last-Modified pair and single byte-range
+requests.
+
+File bodies are sent the cheapest way the server allows: with
+``MEDIA_ACCEL_REDIRECT`` set, nginx sends the file itself (sendfile); under
+WSGI, ``FileResponse`` hands the file to ``wsgi.file_wrapper``; under ASGI it
+is streamed from a worker thread in blocks, since Django would otherwise read
+a synchronous file iterator into memory before sending it.
+"""
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+
+BLOCK_SIZE = 64 * 1024
+VERSIONED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UNVERSIONED_CACHE_CONTROL = 'public, no-cache'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class VersionedMediaStorage(FileSystemStorage):
+    """File system storage whose URLs change whenever the file's content does."""
+
+    def url(self, name):
+        url = super().url(name)
+        try:
+            return f'{url}?v={file_version(self.path(name))}'
+        except OSError:
+            return url
+
+    def versioned_url(self, name, version):
+        """``url(name)`` for a file whose ``content_version`` is already known.
+
+        Saves the stat (and, for files not seen yet, the hashing) ``url`` does.
+        """
+        return f'{super().url(name)}?v={version}'
+
+
+def file_version(path):
+    st = os.stat(path)
+    return _content_hash(path, st.st_size, st.st_mtime_ns)
+
+
+def content_version(content):
+    """The version in the URL of a file holding the bytes ``content``."""
+    return _version(hashlib.sha256(content))
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path, size, mtime_ns):
+    # Keyed by size and mtime so a rewritten file is hashed again.
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return _version(digest)
+
+
+def _version(digest):
+    return digest.hexdigest()[:12]
+
+
+@require_http_methods(['GET', 'HEAD'])
+def serve(request, path):
+    """Serve a file from ``MEDIA_ROOT``."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('No such file')
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404('No such file')
+
+    version = _content_hash(full_path, st.st_size, st.st_mtime_ns)
+    etag = f'"{version}"'
+    last_modified = int(st.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': (
+            VERSIONED_CACHE_CONTROL if request.GET.get('v') == version else UNVERSIONED_CACHE_CONTROL
+        ),
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return _with_headers(response, headers)
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT', None)
+    if accel_prefix:
+        # nginx handles ranges for redirected files itself.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path)
+        return _with_headers(response, headers)
+
+    size = st.st_size
+    byte_range = _requested_range(request, size, etag, last_modified)
+    if byte_range is None:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return _with_headers(response, headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_aread(full_path, start, length), content_type=content_type)
+    elif length == size:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        response = StreamingHttpResponse(_read(full_path, start, length), content_type=content_type)
+    if length != size:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    return _with_headers(response, headers)
+
+
+def _requested_range(request, size, etag, last_modified):
+    """The inclusive ``(start, end)`` to send, or ``None`` if unsatisfiable.
+
+    Malformed, multi-part and outdated (``If-Range``) requests get the whole
+    file.
+    """
+    everything = (0, size - 1) if size else (0, -1)
+    header = request.headers.get('Range')
+    if not header or not _if_range_matches(request, etag, last_modified):
+        return everything
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.groups() == ('', ''):
+        return everything
+
+    first, last = match.groups()
+    if first == '':
+        # The final ``last`` bytes
+        suffix = int(last)
+        if suffix == 0:
+            return None
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return None
+    if end < start:
+        return everything
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            block = fh.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+async def _aread(path, start, length):
+    fh = await asyncio.to_thread(open, path, 'rb')
+    try:
+        await asyncio.to_thread(fh.seek, start)
+        while length > 0:
+            block = await asyncio.to_thread(fh.read, min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        fh.close()
+
+
+def _with_headers(response, headers):
+    for name, value in headers.items():
+        response[name] = value
+    return response
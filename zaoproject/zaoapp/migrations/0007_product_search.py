@@ -0,0 +1,59 @@
+# Generated by Django 4.2.27 on 2026-10-18 04:20
+
+import unicodedata
+
+from django.db import OperationalError, migrations, models
+
+
+def normalize_name(name):
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    return ' '.join(name.casefold().split())
+
+
+def fill_search_names(apps, schema_editor):
+    Product = apps.get_model('zaoapp', 'Product')
+    products = list(Product.objects.only('id', 'name'))
+    for product in products:
+        product.search_name = normalize_name(product.name)
+    Product.objects.bulk_update(products, ['search_name'], batch_size=500)
+
+
+def create_fts_table(apps, schema_editor):
+    # SQLite only, and only where the FTS5 extension is compiled in; search
+    # falls back to search_name lookups otherwise.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE zaoapp_product_fts USING fts5("
+            "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        'INSERT INTO zaoapp_product_fts (rowid, name, description) '
+        'SELECT id, name, description FROM zaoapp_product'
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS zaoapp_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zaoapp', '0006_product_listing_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.27 on 2026-10-18 06:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_totals(apps, schema_editor):
+    Cart = apps.get_model('zaoapp', 'Cart')
+    CartItem = apps.get_model('zaoapp', 'CartItem')
+    Product = apps.get_model('zaoapp', 'Product')
+    CartItem.objects.update(
+        unit_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]),
+    )
+    for cart in Cart.objects.all():
+        lines = list(CartItem.objects.filter(cart_id=cart.pk))
+        cart.item_count = sum(line.quantity for line in lines)
+        cart.total = sum((line.unit_price * line.quantity for line in lines), Decimal('0'))
+        cart.save(update_fields=['item_count', 'total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zaoapp', '0011_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
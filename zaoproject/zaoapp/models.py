@@ -1,5 +1,13 @@
+import unicodedata
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import images
 
 class Contact(models.Model):
     name = models.CharField(max_length=100)
@@ -11,47 +19,372 @@ class Contact(models.Model):
         return f"{self.name} ({self.email})"
 
 
+def normalize_name(name):
+    """Case-fold, strip accents and collapse whitespace."""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch))
+    return ' '.join(name.casefold().split())
+
+
 class Product(models.Model):
     name = models.CharField(max_length=150, unique=True)
+    # normalize_name(name), for indexed exact-name lookups
+    search_name = models.CharField(max_length=150, db_index=True, editable=False, default='')
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Resized WebP/JPEG copies of image, filled in by a background job
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # Keyset pagination of the storefront listing
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_active_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def webp_srcset(self):
+        return images.srcset(self.image.name, self.image_variants, 'webp')
+
+    @property
+    def jpeg_srcset(self):
+        return images.srcset(self.image.name, self.image_variants, 'jpeg')
+
+    def image_url_for(self, width):
+        """URL of the smallest stored copy of the image at least ``width`` px wide."""
+        return images.image_url(self.image.name, self.image_variants, width)
+
+    @property
+    def thumbnail_url(self):
+        return self.image_url_for(160)
+
+    @property
+    def card_image_url(self):
+        """Fallback ``src`` for product cards, for browsers without srcset."""
+        return self.image_url_for(320)
+
+    @property
+    def needs_image_variants(self):
+        if self.image:
+            return images.current_variants(self.image.name, self.image_variants) is None
+        return bool(self.image_variants)
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
+
+# Cart lines show images at most this wide (in CSS pixels, at 2x)
+CART_IMAGE_WIDTH = 160
+
 
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    version = models.PositiveIntegerField(default=0)
+    # Sums over the lines (quantity, and unit_price * quantity), kept up to
+    # date by each line change; see bump_version and check_cart_totals
+    item_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Idle carts, oldest first, for cart_lifecycle
+            models.Index(fields=['updated_at'], name='cart_updated_idx'),
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(item_count=0),
+                name='cart_empty_updated_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Cart for {self.user.username}"
 
+    @property
+    def etag(self):
+        return f'"{self.pk}.{self.version}"'
+
+    @classmethod
+    def bump_version(cls, cart_id, items=0, total=0):
+        """Mark the cart as changed so cached reads and ETags are invalidated.
+
+        ``items`` and ``total`` are added to the stored counters in the same
+        UPDATE, so callers inside a transaction change lines and totals together.
+        """
+        cls.objects.filter(pk=cart_id).update(
+            version=F('version') + 1,
+            item_count=F('item_count') + items,
+            total=F('total') + total,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def recount(cls, cart_ids):
+        """Recompute the stored counters of ``cart_ids`` from their lines."""
+        lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        return cls.objects.filter(pk__in=cart_ids).update(
+            item_count=Coalesce(Subquery(lines.annotate(n=Sum('quantity')).values('n')), 0),
+            total=Coalesce(
+                Subquery(lines.annotate(t=Sum(_subtotal_expression())).values('t')),
+                Decimal('0'),
+                output_field=_subtotal_expression().output_field,
+            ),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+
     def get_total(self):
-        return sum(item.get_subtotal() for item in self.items.all())
+        return self.total
+
+    def to_dict(self):
+        """Serialize the cart's lines with one joined query; counts come from the cart row."""
+        return self._payload(list(self.items.for_payload()))
+
+    async def ato_dict(self):
+        """``to_dict`` for async code."""
+        return self._payload([item async for item in self.items.for_payload()])
+
+    def _payload(self, lines):
+        items = []
+        for item in lines:
+            product = item.product
+            items.append({
+                'product_id': product.id,
+                'name': product.name,
+                'price': float(item.unit_price),
+                'quantity': item.quantity,
+                'image_url': product.image_url_for(CART_IMAGE_WIDTH),
+                'image_srcset': product.webp_srcset,
+            })
+        return {'items': items, 'item_count': self.item_count, 'total': float(self.total)}
+
+
+def _subtotal_expression():
+    return ExpressionWrapper(
+        F('unit_price') * F('quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class CartItemQuerySet(models.QuerySet):
+    def for_payload(self):
+        """Join each line to the product columns ``Cart.to_dict`` shows."""
+        return (
+            self.select_related('product')
+            .only('quantity', 'unit_price', 'cart_id', 'product__id', 'product__name',
+                  'product__image', 'product__image_variants')
+            .order_by('id')
+        )
+
+    def total(self):
+        return self.aggregate(total=Sum(_subtotal_expression()))['total'] or Decimal('0')
 
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Product.price when the line was last written; kept current by carts.reprice_lines
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Units taken from Product.stock for this line until reserved_until; see inventory
+    reserved_quantity = models.PositiveIntegerField(default=0)
+    reserved_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = ('cart', 'product')
+        indexes = [
+            # Expired reservations, for the sweeper
+            models.Index(
+                fields=['reserved_until'],
+                condition=models.Q(reserved_quantity__gt=0),
+                name='cartitem_reserved_until_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        if 'quantity' in field_names and 'unit_price' in field_names:
+            # What the line contributes to the stored cart totals, for post_save
+            item._counted = item.get_counts()
+        return item
+
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        super().save(*args, **kwargs)
 
     def get_subtotal(self):
-        return self.product.price * self.quantity
+        return self.unit_price * self.quantity
+
+    def get_counts(self):
+        """``(quantity, subtotal)``: what the line adds to its cart's counters."""
+        return self.quantity, self.get_subtotal()
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.name}"
+
+class ArchivedCart(models.Model):
+    """What an idle cart held when ``cart_lifecycle`` purged it."""
+
+    user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='+')
+    item_count = models.PositiveIntegerField()
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    # [{"product_id", "name", "unit_price", "quantity"}, ...]
+    lines = models.JSONField(default=list)
+    last_active = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived cart of user #{self.user_id} ({self.item_count} items)"
+
+
+class Order(models.Model):
+    """A placed order; lines snapshot the product name and price at checkout. See ``orders``."""
+
+    PENDING = 'pending'
+    PAID = 'paid'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PENDING, 'Awaiting payment'),
+        (PAID, 'Paid'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='orders')
+    # Supplied by the client per checkout attempt, so a retried request finds its order
+    idempotency_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    shipping = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    country = models.CharField(max_length=2)
+    county = models.CharField(max_length=100)
+    mobile_number = models.CharField(max_length=20)
+    delivery_address = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created_at', '-id')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='order_user_idempotency_key'),
+        ]
+        indexes = [
+            # A user's order history, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.pk} ({self.get_status_display()})"
+
+    def to_dict(self, lines=None):
+        data = {
+            'id': self.pk,
+            'status': self.status,
+            'subtotal': float(self.subtotal),
+            'shipping': float(self.shipping),
+            'total': float(self.total),
+            'created_at': self.created_at.isoformat(),
+        }
+        if lines is not None:
+            data['lines'] = [line.to_dict() for line in lines]
+        return data
+
+
+class OrderLine(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, null=True, on_delete=models.SET_NULL, related_name='+')
+    product_name = models.CharField(max_length=150)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'name': self.product_name,
+            'unit_price': float(self.unit_price),
+            'quantity': self.quantity,
+        }
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_jobs``; see ``jobs``."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    worker = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created_at',)
+        indexes = [
+            # The worker's claim query
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['task', 'status'], name='job_task_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def to_dict(self):
+        return {
+            'id': self.pk,
+            'task': self.task,
+            'status': self.status,
+            'attempts': self.attempts,
+            'result': self.result,
+            'error': self.error.strip().splitlines()[-1] if self.error else None,
+        }
@@ -0,0 +1,107 @@
+"""Checkout: turning a cart into an order, and order history.
+
+``place_order`` works in one transaction. It turns the cart's stock
+reservations into sales (``inventory.consume_reservations``), writes the
+lines with one ``bulk_create``, copying each product's name and current price,
+and empties the cart as one ``carts.apply_cart_operations`` batch.
+
+Every checkout attempt carries a key generated by the client. A request
+repeating a key gets the order the first request placed instead of a second
+one, so clients can retry safely after losing a response. Keys are unique per
+user, which the database enforces for concurrent retries too.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Q
+
+from . import carts, inventory
+from .catalog import encode_cursor
+from .models import Order, OrderLine
+
+# Flat delivery fee, as shown on the checkout page
+SHIPPING_FEE = Decimal('200.00')
+
+HISTORY_PAGE_SIZE = 10
+MAX_HISTORY_PAGE_SIZE = 50
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be checked out."""
+
+
+class EmptyCartError(CheckoutError):
+    pass
+
+
+def place_order(cart, idempotency_key, delivery):
+    """Place an order for everything in ``cart``; returns ``(order, created)``.
+
+    ``delivery`` holds the ``country``, ``county``, ``mobile_number`` and
+    ``delivery_address`` fields. Raises ``EmptyCartError``, or
+    ``inventory.OutOfStockError`` if a line's stock has run out.
+    """
+    existing = find_order(cart.user_id, idempotency_key)
+    if existing is not None:
+        return existing, False
+    try:
+        with transaction.atomic():
+            lines = inventory.consume_reservations(cart)
+            if not lines:
+                raise EmptyCartError('cart is empty')
+            subtotal = sum((line.product.price * line.quantity for line in lines), Decimal('0'))
+            order = Order.objects.create(
+                user_id=cart.user_id,
+                idempotency_key=idempotency_key,
+                subtotal=subtotal,
+                shipping=SHIPPING_FEE,
+                total=subtotal + SHIPPING_FEE,
+                **delivery,
+            )
+            OrderLine.objects.bulk_create([
+                OrderLine(
+                    order=order,
+                    product=line.product,
+                    product_name=line.product.name,
+                    unit_price=line.product.price,
+                    quantity=line.quantity,
+                )
+                for line in lines
+            ])
+            carts.apply_cart_operations(cart, [('remove', line.product_id, 0) for line in lines])
+    except IntegrityError:
+        # A concurrent request with the same key placed the order first.
+        existing = find_order(cart.user_id, idempotency_key)
+        if existing is None:
+            raise
+        return existing, False
+    return order, True
+
+
+def find_order(user_id, idempotency_key):
+    return Order.objects.filter(user_id=user_id, idempotency_key=idempotency_key).first()
+
+
+def order_history(user, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """One page of ``user``'s orders with their lines, newest first, and the next cursor.
+
+    Pages seek past the last ``(created_at, id)`` seen, along the
+    ``order_user_created_idx`` index, as ``catalog.product_page`` does.
+    """
+    orders = (
+        Order.objects.filter(user=user)
+        .order_by('-created_at', '-id')
+        .prefetch_related(Prefetch('lines', queryset=OrderLine.objects.order_by('id')))
+    )
+    if cursor is not None:
+        created_at, pk = cursor
+        orders = orders.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+        )
+
+    page = list(orders[:limit + 1])
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].pk)
+    return [order.to_dict(order.lines.all()) for order in page], next_cursor
@@ -0,0 +1,235 @@
+"""The staff product report: a PDF of every product, written page by page.
+
+Products are read with ``.iterator()`` over ``values_list`` and each page is
+written to disk as soon as it is full, so memory use stays flat however large
+the catalog is. Finished reports are kept under ``REPORTS_ROOT`` and named by
+``report_version``: the catalog version plus the last ``Product.updated_at``,
+which stock changes set too. An unchanged catalog is served from the existing
+file. After stock alone has moved, a report up to ``STOCK_MAX_AGE`` old is
+still served, as storefront pages show stock that old; otherwise busy carts
+would outdate every report before it was built. The report is built by the
+``product_report`` job, not in the request.
+
+Text is set in the standard Helvetica fonts, which only cover Windows-1252.
+Names with other characters are printed with "?" in their place, and
+logged.
+"""
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Max
+
+from . import catalog
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILENAME = 'products_report.pdf'
+# Seconds a report's stock column may lag behind, as the storefront's may
+STOCK_MAX_AGE = catalog.CATALOG_CACHE_TIMEOUT
+
+# A4 in points, and the layout of the original ReportLab report.
+PAGE_WIDTH, PAGE_HEIGHT = 595.27, 841.89
+BOTTOM_MARGIN = 60
+LINE_HEIGHT = 14
+COLUMNS = ((40, 'Name'), (300, 'Price'), (380, 'Stock'), (450, 'Active'))
+MAX_NAME_LENGTH = 53
+ITERATOR_CHUNK_SIZE = 2000
+# Names listed in the warning about characters the fonts lack
+LOSSY_NAMES_LOGGED = 10
+# What /WinAnsiEncoding maps to
+PDF_ENCODING = 'cp1252'
+
+
+def reports_root():
+    """``REPORTS_ROOT``, which must be set and outside the publicly served ``MEDIA_ROOT``."""
+    root = getattr(settings, 'REPORTS_ROOT', None)
+    if not root:
+        raise ImproperlyConfigured('REPORTS_ROOT must be set; reports are for staff only.')
+    root = Path(root)
+    if root.resolve().is_relative_to(Path(settings.MEDIA_ROOT).resolve()):
+        raise ImproperlyConfigured('REPORTS_ROOT must not be inside MEDIA_ROOT, which is served publicly.')
+    return root
+
+
+def report_version():
+    """Identifies the current catalog and stock; reports are built per version."""
+    changed = Product.objects.aggregate(last=Max('updated_at'))['last']
+    stamp = int(changed.timestamp() * 1_000_000) if changed else 0
+    return f'{catalog.catalog_version()}-{stamp}'
+
+
+def report_path(version):
+    return reports_root() / f'products-{version}.pdf'
+
+
+def open_report(version):
+    """The report to serve for ``version``, opened, or ``None`` if one must be built.
+
+    That is the report of ``version`` itself or, if stock has changed since,
+    one of the same catalog version written less than ``STOCK_MAX_AGE`` ago.
+    A newer report's build may delete either at any moment.
+    """
+    path = report_path(version)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    catalog_version = version.split('-')[0]
+    cutoff = time.time() - STOCK_MAX_AGE
+    for other in path.parent.glob(f'products-{catalog_version}-*.pdf'):
+        try:
+            if other.stat().st_mtime > cutoff:
+                return open(other, 'rb')
+        except FileNotFoundError:
+            pass
+    return None
+
+
+def write_product_report(path):
+    """Write the report to ``path`` atomically and remove older reports."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.products-', suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            _write_report(out)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    for old in path.parent.glob('products-*.pdf'):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def _write_report(out):
+    rows = (
+        Product.objects.order_by('name', 'id')
+        .values_list('name', 'price', 'stock', 'is_active')
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    pdf = PDFWriter(out)
+    generated = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+
+    page = pdf.new_page()
+    page.text(40, PAGE_HEIGHT - 50, 'Products Report', bold=True, size=16)
+    page.text(40, PAGE_HEIGHT - 70, f'Generated: {generated}')
+    y = PAGE_HEIGHT - 100
+    for x, heading in COLUMNS:
+        page.text(x, y, heading, bold=True, size=11)
+    y -= 18
+
+    lossy, lossy_names = 0, []
+    for name, price, stock, is_active in rows:
+        if y < BOTTOM_MARGIN:
+            pdf.end_page(page)
+            page = pdf.new_page()
+            y = PAGE_HEIGHT - 50
+        if len(name) > MAX_NAME_LENGTH:
+            name = name[:50] + '...'
+        if not _encodable(name):
+            lossy += 1
+            if len(lossy_names) < LOSSY_NAMES_LOGGED:
+                lossy_names.append(name)
+        for (x, _), value in zip(COLUMNS, (name, price, stock, 'Yes' if is_active else 'No')):
+            page.text(x, y, str(value))
+        y -= LINE_HEIGHT
+
+    pdf.end_page(page)
+    pdf.close()
+    if lossy:
+        logger.warning(
+            'The product report shows %d names with "?" for characters Helvetica lacks: %s%s',
+            lossy, ', '.join(lossy_names), ', ...' if lossy > len(lossy_names) else '',
+        )
+
+
+class PDFWriter:
+    """A minimal PDF writer that flushes each page as soon as it is finished.
+
+    Supports text in the standard Helvetica fonts only, which is all the
+    report needs. Objects 1-4 are reserved for the catalog, page tree and
+    fonts, which are written last once the page count is known.
+    """
+
+    CATALOG, PAGES, FONT, BOLD_FONT = 1, 2, 3, 4
+
+    def __init__(self, out):
+        self.out = out
+        self.offsets = {}
+        self.pages = []
+        self.next_id = 5
+        self.position = 0
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def new_page(self):
+        return _Page()
+
+    def end_page(self, page):
+        content, page_id = self._reserve(), self._reserve()
+        stream = b''.join(page.lines)
+        self._object(content, b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        self._object(page_id, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>'
+        ) % (self.PAGES, PAGE_WIDTH, PAGE_HEIGHT, self.FONT, self.BOLD_FONT, content))
+        self.pages.append(page_id)
+
+    def close(self):
+        kids = b' '.join(b'%d 0 R' % page for page in self.pages)
+        self._object(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.pages)))
+        self._object(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES)
+        for font_id, font in ((self.FONT, b'Helvetica'), (self.BOLD_FONT, b'Helvetica-Bold')):
+            self._object(font_id, (
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % font
+            ))
+
+        xref = self.position
+        size = self.next_id
+        entries = [b'0000000000 65535 f \n']
+        entries += [b'%010d 00000 n \n' % self.offsets[i] for i in range(1, size)]
+        self._write(b'xref\n0 %d\n%s' % (size, b''.join(entries)))
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            size, self.CATALOG, xref))
+
+    def _reserve(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        self._write(b'%d 0 obj\n%s\nendobj\n' % (object_id, body))
+
+    def _write(self, data):
+        self.out.write(data)
+        self.position += len(data)
+
+
+class _Page:
+    def __init__(self):
+        self.lines = []
+
+    def text(self, x, y, value, bold=False, size=10):
+        self.lines.append(b'BT /%s %d Tf %.2f %.2f Td (%s) Tj ET\n' % (
+            b'F2' if bold else b'F1', size, x, y, _pdf_string(value)))
+
+
+def _encodable(value):
+    try:
+        value.encode(PDF_ENCODING)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _pdf_string(value):
+    data = value.encode(PDF_ENCODING, errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
@@ -2,5 +2,7 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    re_path(r'ws/cart/$', consumers.CartConsumer.as_asgi()),
+    # Legacy room URL; the room name is ignored and the user's own group is used.
     re_path(r'ws/cart/(?P<room_name>\w+)/$', consumers.CartConsumer.as_asgi()),
 ]
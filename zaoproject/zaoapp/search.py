@@ -0,0 +1,113 @@
+"""Product search: normalized exact-name lookups and ranked partial matches.
+
+Exact lookups go through ``Product.search_name``, an indexed, normalized copy
+of the name. Partial matches use the ``zaoapp_product_fts`` SQLite FTS5 table
+over name and description, ranked with bm25 (name weighted above
+description) and with prefix matching on the last word for autocomplete.
+The FTS table is kept current from ``Product`` saves and deletes; run
+``manage.py rebuild_search_index`` after bulk updates that bypass them. On
+databases without FTS5 the search falls back to prefix/substring matches on
+``search_name``.
+"""
+import re
+
+from django.db import connection, connections, router
+
+from .models import Product, normalize_name
+
+FTS_TABLE = 'zaoapp_product_fts'
+# bm25 column weights for (name, description)
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_fts_available = None
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def find_by_name(name):
+    """The product named ``name`` (ignoring case/accents), else the best partial match."""
+    product = Product.objects.filter(search_name=normalize_name(name)).first()
+    if product is None:
+        matches = search_products(name, limit=1)
+        if matches:
+            product = Product.objects.filter(pk=matches[0]['id']).first()
+    return product
+
+
+def search_products(query, limit=10):
+    """Active products matching ``query``, best first, as ``id``/``name``/``price`` dicts."""
+    words = re.findall(r'\w+', normalize_name(query))
+    if not words:
+        return []
+    if fts_available():
+        return _fts_search(words, limit)
+    return _fallback_search(' '.join(words), limit)
+
+
+def _fts_search(words, limit):
+    # Quote every word so FTS syntax in user input is matched literally, and
+    # make the last one a prefix so partially typed words still match.
+    match = ' '.join(f'"{word}"' for word in words) + '*'
+    with connections[router.db_for_read(Product)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT p.id, p.name, p.price FROM {FTS_TABLE} f '
+            f'JOIN zaoapp_product p ON p.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND p.is_active '
+            f'ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s',
+            [match, NAME_WEIGHT, DESCRIPTION_WEIGHT, limit],
+        )
+        rows = cursor.fetchall()
+    return [{'id': pk, 'name': name, 'price': float(price)} for pk, name, price in rows]
+
+
+def _fallback_search(normalized, limit):
+    active = Product.objects.filter(is_active=True)
+    rows = list(active.filter(search_name__startswith=normalized).values('id', 'name', 'price')[:limit])
+    if len(rows) < limit:
+        seen = [row['id'] for row in rows]
+        rows += active.filter(search_name__contains=normalized).exclude(pk__in=seen).values(
+            'id', 'name', 'price')[:limit - len(rows)]
+    return [{**row, 'price': float(row['price'])} for row in rows]
+
+
+def index_product(product):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)',
+            [product.pk, product.name, product.description],
+        )
+
+
+def unindex_product(pk):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index():
+    """Recompute ``search_name`` for every product and refill the FTS table."""
+    products = list(Product.objects.only('id', 'name'))
+    for product in products:
+        product.search_name = normalize_name(product.name)
+    Product.objects.bulk_update(products, ['search_name'], batch_size=500)
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+                f'SELECT id, name, description FROM zaoapp_product'
+            )
+    return len(products)
@@ -1,18 +1,96 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.contrib.auth.models import User
-from .models import Cart
+from . import carts, instrumentation, inventory
+from .broadcast import publish_cart_event
+from .catalog import bump_catalog_version
+from .models import Cart, CartItem, Product
+from .search import index_product, unindex_product
+from .tasks import make_image_variants
 
 
-@receiver(post_save, sender=User)
-def create_user_cart(sender, instance, created, **kwargs):
-    """Create a Cart automatically when a new User is created."""
-    if created:
-        Cart.objects.create(user=instance)
+@receiver(post_save, sender=CartItem)
+def cart_item_saved(sender, instance, created, **kwargs):
+    """Update the cart's counters and version, and push the new quantity to the owner."""
+    counts = instance.get_counts()
+    counted = (0, 0) if created else getattr(instance, '_counted', None)
+    if counted is None:
+        # Saved without being loaded whole first: the old amounts are unknown.
+        Cart.recount([instance.cart_id])
+    else:
+        Cart.bump_version(instance.cart_id, items=counts[0] - counted[0], total=counts[1] - counted[1])
+    instance._counted = counts
+    user_id = _cart_owner_id(instance)
+    if user_id is not None:
+        publish_cart_event(user_id, 'cart_item_added', {
+            'product_id': instance.product_id,
+            'quantity': instance.quantity,
+        })
 
 
-@receiver(post_save, sender=User)
-def save_user_cart(sender, instance, **kwargs):
-    """Save the user's cart if it exists."""
-    if hasattr(instance, 'cart'):
-        instance.cart.save()
+@receiver(post_delete, sender=CartItem)
+def cart_item_deleted(sender, instance, **kwargs):
+    """Take the line out of the cart's counters and tell the owner it is gone."""
+    quantity, subtotal = instance.get_counts()
+    Cart.bump_version(instance.cart_id, items=-quantity, total=-subtotal)
+    user_id = _cart_owner_id(instance)
+    if user_id is not None:
+        publish_cart_event(user_id, 'cart_item_removed', {'product_id': instance.product_id})
+
+
+@receiver(post_delete, sender=CartItem)
+def release_deleted_reservation(sender, instance, **kwargs):
+    """Give the stock a removed cart line held back."""
+    inventory.return_stock(instance.product_id, instance.reserved_quantity)
+
+
+def _cart_owner_id(item):
+    if CartItem.cart.is_cached(item):
+        return item.cart.user_id
+    return Cart.objects.filter(pk=item.cart_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog(sender, instance, **kwargs):
+    """Make cached catalog reads stale once the product change is committed."""
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Product)
+def reprice_cart_lines(sender, instance, created, update_fields=None, **kwargs):
+    """Carry a price change into the carts holding the product."""
+    if not created and (update_fields is None or 'price' in update_fields):
+        carts.reprice_lines(instance)
+
+
+@receiver(post_save, sender=Product)
+def refresh_cart_lines(sender, instance, created, update_fields=None, **kwargs):
+    """Make carts holding the product show its new name or image."""
+    if not created and (update_fields is None or {'name', 'image'} & set(update_fields)):
+        carts.invalidate_product_carts(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, **kwargs):
+    index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def queue_image_variants(sender, instance, **kwargs):
+    """Resize a new or replaced image in the background."""
+    if instance.needs_image_variants:
+        pk = instance.pk
+        transaction.on_commit(lambda: make_image_variants.enqueue(pk))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Count the queries each request makes, for its metrics."""
+    instrumentation.instrument_connection(connection)
@@ -0,0 +1,161 @@
+"""Django's SQLite backend with connection setup, transaction mode and pooling options.
+
+``OPTIONS['init_command']`` holds statements (``;``-separated, usually
+PRAGMAs) run on every new connection. ``OPTIONS['transaction_mode']`` picks
+how transactions begin. Both work as in Django 5.1+.
+
+With ``IMMEDIATE``, a transaction takes the write lock when it starts,
+waiting up to ``busy_timeout`` for it, rather than on its first write.
+Upgrading a read lock mid-transaction cannot wait, so a deferred
+transaction fails at once with "database is locked" when another writer is
+active. A ``BEGIN`` that still times out is retried a few times with a
+randomized backoff. Nothing has run in the transaction yet, so this is safe.
+
+``OPTIONS['pool']`` (``True`` or ``{'max_size': n}``) keeps closed
+connections open for reuse within the process. Django's own persistent
+connections (``CONN_MAX_AGE``) are kept per thread. Under ASGI every request
+runs its database work in a thread of its own, so those connections are
+never reused: they pile up until garbage collected. With the pool,
+``CONN_MAX_AGE`` stays 0 and the connection a request closes is handed to
+the next request with its PRAGMAs already applied.
+"""
+import os
+import random
+import threading
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+BEGIN_RETRIES = 3
+# Seconds; doubled for each retry, and randomized so waiting writers spread out
+BEGIN_BACKOFF = 0.05
+
+DEFAULT_POOL_SIZE = 8
+
+# Idle connections per database file, for the process in _pool_pid:
+# {path: [(connection, inode), ...]}
+_pool = {}
+_pool_lock = threading.Lock()
+_pool_pid = None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in ('init_command', 'transaction_mode', 'pool'):
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = self._pooled_connection(conn_params['database'])
+        if conn is not None:
+            return conn
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict['OPTIONS'].get('init_command')
+        if init_command:
+            for statement in init_command.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+        return conn
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is None:
+            return None
+        mode = mode.upper()
+        if mode not in self.TRANSACTION_MODES:
+            raise ValueError(f'transaction_mode must be one of {", ".join(self.TRANSACTION_MODES)}')
+        return mode
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        statement = f'BEGIN {mode}' if mode else 'BEGIN'
+        for attempt in range(BEGIN_RETRIES + 1):
+            try:
+                self.cursor().execute(statement)
+                return
+            except OperationalError as e:
+                if attempt == BEGIN_RETRIES or 'locked' not in str(e):
+                    raise
+                time.sleep(random.uniform(0.5, 1.5) * BEGIN_BACKOFF * 2 ** attempt)
+
+    @property
+    def pool_size(self):
+        pool = self.settings_dict['OPTIONS'].get('pool')
+        if not pool or self.is_in_memory_db():
+            return 0
+        if isinstance(pool, dict):
+            return pool.get('max_size', DEFAULT_POOL_SIZE)
+        return DEFAULT_POOL_SIZE
+
+    def _pooled_connection(self, database):
+        if not self.pool_size:
+            return None
+        inode = _inode(database)
+        with _pool_lock:
+            idle = _process_pool().get(str(database), [])
+            while idle:
+                conn, conn_inode = idle.pop()
+                if conn_inode == inode:
+                    return conn
+                # The file was replaced (a test database recreated, say).
+                conn.close()
+        return None
+
+    def _close(self):
+        conn = self.connection
+        if conn is None or not self.pool_size or self.in_atomic_block:
+            return super()._close()
+        database = self.settings_dict['NAME']
+        inode = _inode(database)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            inode = None
+        with _pool_lock:
+            idle = _process_pool().setdefault(str(database), [])
+            if inode is not None and len(idle) < self.pool_size:
+                idle.append((conn, inode))
+                return
+        return super()._close()
+
+
+def close_pool():
+    """Close every idle pooled connection, e.g. before deleting a database file."""
+    with _pool_lock:
+        idle = [conn for conns in _process_pool().values() for conn, _ in conns]
+        _pool.clear()
+    for conn in idle:
+        conn.close()
+
+
+def _process_pool():
+    """``_pool``, emptied first if this process was forked since it was filled.
+
+    Call with ``_pool_lock`` held.
+    """
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        # Connections inherited from the parent must not be used, or closed.
+        _pool, _pool_pid = {}, os.getpid()
+    return _pool
+
+
+def sqlite_path(name):
+    """The file behind a database ``NAME``, which may be a ``file:`` URI."""
+    name = str(name)
+    if name.startswith('file:'):
+        name = name[len('file:'):].split('?', 1)[0]
+    return name
+
+
+def _inode(database):
+    try:
+        return os.stat(sqlite_path(database)).st_ino
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,215 @@
+"""A cache shared by every worker process on one host, backed by SQLite.
+
+``LocMemCache`` is per process, so each gunicorn worker keeps its own copy of
+every entry and cannot see the others' writes. This backend keeps entries in
+one SQLite file (WAL mode) that all workers open, so reads never wait for
+writers and a value set by one worker is seen by all of them.
+
+When a write would take the cache past ``MAX_ENTRIES``, expired entries are
+dropped and then the least recently used ``1/CULL_FREQUENCY`` of the rest.
+Recording every read would turn reads into writes, so an entry's last use is
+only updated when it is older than ``TOUCH_INTERVAL`` seconds: eviction order
+is accurate to about that. ``incr`` and ``add`` take the write lock, so they
+are atomic across processes. Values are pickled.
+
+Connections are pooled per process (and dropped after a fork), as the cache
+is used from a different thread on almost every ASGI request.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .instrumentation import record_cache_lookup
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+"""
+
+# Seconds between updates of an entry's last use when it is read
+TOUCH_INTERVAL = 60
+BUSY_TIMEOUT = 5
+MAX_IDLE_CONNECTIONS = 8
+
+# Idle connections per cache file, for the process in _pid
+_idle = {}
+_idle_lock = threading.Lock()
+_pid = None
+
+LIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+
+    @contextmanager
+    def _connection(self):
+        conn = _checkout(self.path)
+        try:
+            yield conn
+        finally:
+            _checkin(self.path, conn)
+
+    @contextmanager
+    def _write(self):
+        with self._connection() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        values = self._get_many([key])
+        return values[key] if key in values else default
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {key_map[key]: value for key, value in self._get_many(list(key_map)).items()}
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        with self._connection() as db:
+            rows = db.execute(
+                f'SELECT key, value, accessed FROM cache WHERE key IN ({", ".join("?" * len(keys))}) AND {LIVE}',
+                [*keys, now],
+            ).fetchall()
+            stale = [(now, key) for key, value, accessed in rows if accessed < now - TOUCH_INTERVAL]
+            if stale:
+                db.executemany('UPDATE cache SET accessed = ? WHERE key = ?', stale)
+        record_cache_lookup(hits=len(rows), misses=len(keys) - len(rows))
+        return {key: pickle.loads(value) for key, value, accessed in rows}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._connection() as db:
+            row = db.execute(f'SELECT 1 FROM cache WHERE key = ? AND {LIVE}', (key, time.time())).fetchone()
+        return row is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self.make_and_validate_key(key, version=version), self._dumps(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._write() as db:
+            self._cull(db, now, len(rows))
+            db.executemany('INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)', rows)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._write() as db:
+            db.execute(f'DELETE FROM cache WHERE key = ? AND NOT {LIVE}', (key, now))
+            self._cull(db, now, 1)
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, self._dumps(value), self.get_backend_timeout(timeout), now),
+            ).rowcount
+        return added == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as db:
+            touched = db.execute(
+                f'UPDATE cache SET expires = ? WHERE key = ? AND {LIVE}',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount
+        return touched == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as db:
+            row = db.execute(f'SELECT value FROM cache WHERE key = ? AND {LIVE}', (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute('UPDATE cache SET value = ? WHERE key = ?', (self._dumps(value), key))
+        return value
+
+    def delete(self, key, version=None):
+        return self._delete_many([self.make_and_validate_key(key, version=version)])
+
+    def delete_many(self, keys, version=None):
+        self._delete_many([self.make_and_validate_key(key, version=version) for key in keys])
+
+    def _delete_many(self, keys):
+        if not keys:
+            return False
+        with self._write() as db:
+            deleted = db.execute(f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(keys))})', keys).rowcount
+        return deleted > 0
+
+    def clear(self):
+        with self._write() as db:
+            db.execute('DELETE FROM cache')
+
+    def _cull(self, db, now, incoming):
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count + incoming <= self._max_entries:
+            return
+        count -= db.execute(f'DELETE FROM cache WHERE NOT {LIVE}', (now,)).rowcount
+        if count + incoming <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+        else:
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(count // self._cull_frequency, count + incoming - self._max_entries),),
+            )
+
+
+def _checkout(path):
+    global _idle, _pid
+    with _idle_lock:
+        if _pid != os.getpid():
+            # Connections inherited from the parent must not be used.
+            _idle, _pid = {}, os.getpid()
+        idle = _idle.get(path)
+        if idle:
+            return idle.pop()
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _checkin(path, conn):
+    if conn.in_transaction:
+        conn.rollback()
+    with _idle_lock:
+        idle = _idle.setdefault(path, [])
+        if len(idle) < MAX_IDLE_CONNECTIONS:
+            idle.append(conn)
+            return
+    conn.close()
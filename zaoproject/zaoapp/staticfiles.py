@@ -0,0 +1,19 @@
+"""Static files storage used in production; see ``STORAGES``."""
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise's hashed, precompressed storage, tolerant of dead CSS references.
+
+    The vendored stylesheets point at a few images that were never shipped;
+    those ``url()`` references are left as they are instead of failing
+    collectstatic.
+    """
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            return name
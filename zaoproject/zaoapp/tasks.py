@@ -0,0 +1,38 @@
+"""Background tasks run by ``manage.py run_jobs``; see ``jobs``."""
+from django.db import transaction
+from django.db.models import Q
+
+from . import carts, catalog, images, reports
+from .jobs import task
+from .models import Product
+
+
+@task('product_report', max_attempts=2, concurrency=1)
+def build_product_report(version):
+    """Write the product report for ``version`` (see ``reports.report_version``) unless it exists."""
+    path = reports.report_path(version)
+    if not path.exists():
+        reports.write_product_report(path)
+    return {'file': path.name}
+
+
+@task('product_image_variants', concurrency=2)
+def make_image_variants(product_id, force=False):
+    """Create the resized copies of a product's image and record them."""
+    product = Product.objects.filter(pk=product_id).only('id', 'image', 'image_variants').first()
+    if product is None or not (force or product.needs_image_variants):
+        return None
+    name = product.image.name
+    old = product.image_variants
+    new = images.generate_variants(name) if name else {}
+
+    # Only record them if the image was not replaced in the meantime; the
+    # replacement's own job makes its variants.
+    unchanged = Q(image=name) if name else Q(image='') | Q(image__isnull=True)
+    if not Product.objects.filter(unchanged, pk=product_id).update(image_variants=new):
+        images.delete_variants(new, keep=images.variant_names(old))
+        return None
+    images.delete_variants(old, keep=images.variant_names(new))
+    carts.invalidate_product_carts(product_id)
+    transaction.on_commit(catalog.bump_catalog_version)
+    return {'source': name, 'files': len(images.variant_names(new))}
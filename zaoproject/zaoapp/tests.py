@@ -1,3 +1,1560 @@
-from django.test import TestCase
+import json
+import logging
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from PIL import Image
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends import cached_db
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    cart_lifecycle, carts, catalog, db_router, images, instrumentation, inventory, jobs, media, reports, routing,
+    search, sqlite_cache,
+)
+from .broadcast import cart_group_name
+from .channel_layers import SQLiteChannelLayer
+from .carts import apply_cart_operations
+from .consumers import CLOSE_SLOW_CONSUMER
+from .management.commands import bench_storefront
+from .models import ArchivedCart, Cart, CartItem, Job, Order, OrderLine, Product
+from .sqlite_backend import base as sqlite_backend
+from .sqlite_cache import SQLiteCache
+
+
+def setUpModule():
+    # Keep off the files the running site's workers share, and serve static
+    # files without the manifest, which only exists after collectstatic.
+    directory = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(directory.cleanup)
+    test_settings = override_settings(
+        CACHES={'default': {
+            **settings.CACHES['default'],
+            'LOCATION': Path(directory.name) / 'cache.sqlite3',
+        }},
+        CHANNEL_LAYERS={'default': {
+            **settings.CHANNEL_LAYERS['default'],
+            'CONFIG': {'path': Path(directory.name) / 'channels.sqlite3'},
+        }},
+        STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        },
+    )
+    test_settings.enable()
+    unittest.addModuleCleanup(test_settings.disable)
+    # Request metrics are checked with assertLogs, not printed for every request.
+    metrics_logger = logging.getLogger('zaoapp.instrumentation')
+    unittest.addModuleCleanup(metrics_logger.setLevel, metrics_logger.level)
+    metrics_logger.setLevel(logging.WARNING)
+
+
+class CartTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper', password='secret123')
+        self.cart, _ = Cart.objects.get_or_create(user=self.user)
+        self.client.force_login(self.user)
+
+    def add_lines(self, count, start=0):
+        for i in range(start, start + count):
+            product = Product.objects.create(name=f'Product {i}', price=Decimal('2.50') + i, stock=100)
+            CartItem.objects.create(cart=self.cart, product=product, quantity=i + 1)
+
+    def post_batch(self, operations):
+        return self.client.post(
+            reverse('update_cart_batch'),
+            data=json.dumps({'operations': operations}),
+            content_type='application/json',
+        )
+
+
+class CartReadPathTests(CartTestMixin, TestCase):
+    # user + cart lookup + one joined item query (the session comes from the cache)
+    GET_CART_QUERIES = 3
+
+    def test_get_cart_query_count_is_independent_of_line_count(self):
+        for lines in (1, 20):
+            self.add_lines(lines, start=self.cart.items.count())
+            with self.assertNumQueries(self.GET_CART_QUERIES):
+                response = self.client.get(reverse('get_cart'))
+            self.assertEqual(len(response.json()['items']), self.cart.items.count())
+
+    def test_get_cart_payload_and_total(self):
+        self.add_lines(3)
+        payload = self.client.get(reverse('get_cart')).json()
+        # 2.50*1 + 3.50*2 + 4.50*3
+        self.assertEqual(payload['total'], 23.0)
+        self.assertEqual(payload['items'][0]['name'], 'Product 0')
+        self.assertEqual(payload['items'][2]['quantity'], 3)
+
+    def test_get_total_reads_the_cart_row(self):
+        self.add_lines(3)
+        with self.assertNumQueries(1):
+            cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(cart.get_total(), Decimal('23.00'))
+            self.assertEqual(cart.item_count, 6)
+
+
+class CartProvisioningTests(TestCase):
+    # Neither includes a cart query: carts are no longer saved with their user.
+    # user lookup, session key check + insert and save (with savepoints), last_login update
+    LOGIN_QUERIES = 9
+    # user, username uniqueness check, user update
+    PROFILE_QUERIES = 3
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper', email='shopper@example.com', password='secret123')
+
+    def test_registration_creates_no_cart(self):
+        self.client.post(reverse('register'), {'email': 'new@example.com', 'password': 'secret123'})
+        self.assertTrue(User.objects.filter(username='new@example.com').exists())
+        self.assertFalse(Cart.objects.exists())
+
+    def test_login_does_not_touch_the_cart(self):
+        with self.assertNumQueries(self.LOGIN_QUERIES):
+            response = self.client.post(reverse('login'), {'username': 'shopper', 'password': 'secret123'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_profile_update_does_not_touch_the_cart(self):
+        self.client.force_login(self.user)
+        with self.assertNumQueries(self.PROFILE_QUERIES):
+            response = self.client.post(reverse('profile'), {
+                'update_profile': '1', 'username': 'shopper', 'email': 'shopper@example.com',
+                'first_name': 'Amina', 'last_name': '',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_empty_cart_is_read_without_a_write(self):
+        self.client.force_login(self.user)
+        # user + cart lookup
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('get_cart'))
+        self.assertEqual(response.json(), {'items': [], 'item_count': 0, 'total': 0.0})
+        response = self.client.get(reverse('get_cart'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.post(reverse('clear_cart')).status_code, 200)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_first_cart_write_creates_the_cart(self):
+        product = Product.objects.create(name='Plum', price=Decimal('3.00'), stock=5)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('update_cart'),
+            data=json.dumps({'product_id': product.id, 'quantity': 2}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['item_count'], 2)
+        self.assertEqual(Cart.objects.get(user=self.user).items.get().quantity, 2)
+
+
+class CartBatchTests(CartTestMixin, TestCase):
+    def test_batch_applies_set_increment_and_remove(self):
+        self.add_lines(3)
+        p0, p1, p2 = Product.objects.order_by('id').values_list('id', flat=True)
+        extra = Product.objects.create(name='Extra', price=Decimal('10.00'), stock=5)
+        response = self.post_batch([
+            {'op': 'set', 'product_id': p0, 'quantity': 5},
+            {'op': 'increment', 'product_id': p1, 'quantity': 3},
+            {'op': 'remove', 'product_id': p2},
+            {'op': 'increment', 'product_id': extra.id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        quantities = dict(self.cart.items.values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {p0: 5, p1: 5, extra.id: 1})
+        self.assertEqual(len(response.json()['items']), 3)
+
+    def test_batch_is_atomic_on_unknown_product(self):
+        self.add_lines(1)
+        product_id = Product.objects.get().id
+        response = self.post_batch([
+            {'op': 'set', 'product_id': product_id, 'quantity': 9},
+            {'op': 'set', 'product_id': 9999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.cart.items.get().quantity, 1)
+
+    def test_removed_lines_adjust_the_cart_once(self):
+        products = [Product.objects.create(name=f'Fig {i}', price=Decimal('1.00'), stock=10) for i in range(10)]
+        apply_cart_operations(self.cart, [('set', product.id, 2) for product in products])
+        with mock.patch.object(carts, 'publish_cart_event') as publish:
+            # savepoint, line read, DELETE, cart UPDATE, cart refresh, release,
+            # and a stock UPDATE per product
+            with self.assertNumQueries(6 + len(products)):
+                apply_cart_operations(self.cart, [('remove', product.id, 0) for product in products])
+        self.assertEqual((self.cart.item_count, self.cart.total), (0, Decimal('0')))
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(Product.objects.filter(stock=10).count(), len(products))
+        self.assertEqual(
+            [call.args for call in publish.call_args_list],
+            [(self.user.pk, 'cart_item_removed', {'product_id': product.id}) for product in products],
+        )
+
+    def test_batch_rejects_malformed_operations(self):
+        self.assertEqual(self.post_batch([{'op': 'explode', 'product_id': 1}]).status_code, 400)
+        self.assertEqual(self.post_batch([]).status_code, 400)
+
+    def test_update_cart_quantity_zero_removes_line(self):
+        self.add_lines(1)
+        product_id = Product.objects.get().id
+        response = self.client.post(
+            reverse('update_cart'),
+            data=json.dumps({'product_id': product_id, 'quantity': 0}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.cart.items.exists())
+
+
+class CartConditionalGetTests(CartTestMixin, TestCase):
+    def test_matching_etag_returns_304_without_reading_lines(self):
+        self.add_lines(2)
+        etag = self.client.get(reverse('get_cart'))['ETag']
+        # user + cart row only
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('get_cart'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_line_change_invalidates_etag(self):
+        self.add_lines(1)
+        etag = self.client.get(reverse('get_cart'))['ETag']
+        item = self.cart.items.get()
+        item.quantity = 7
+        item.save()
+        response = self.client.get(reverse('get_cart'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['items'][0]['quantity'], 7)
+
+    def test_product_rename_invalidates_etag_and_cached_payload(self):
+        self.add_lines(1)
+        etag = self.client.get(reverse('get_cart'))['ETag']
+        product = Product.objects.get()
+        product.name = 'Renamed'
+        product.save()
+        response = self.client.get(reverse('get_cart'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'][0]['name'], 'Renamed')
+
+    def test_unchanged_cart_is_served_from_cache(self):
+        self.add_lines(2)
+        self.client.get(reverse('get_cart'))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('get_cart'))
+        self.assertEqual(len(response.json()['items']), 2)
+
+
+class InventoryTests(CartTestMixin, TestCase):
+    def stock(self, product):
+        product.refresh_from_db(fields=['stock'])
+        return product.stock
+
+    def test_cart_lines_reserve_stock(self):
+        product = Product.objects.create(name='Lime', price=Decimal('1.00'), stock=5)
+        self.post_batch([{'op': 'set', 'product_id': product.id, 'quantity': 3}])
+        self.assertEqual(self.stock(product), 2)
+        line = self.cart.items.get()
+        self.assertEqual(line.reserved_quantity, 3)
+        self.assertGreater(line.reserved_until, timezone.now())
+
+        self.post_batch([{'op': 'set', 'product_id': product.id, 'quantity': 1}])
+        self.assertEqual(self.stock(product), 4)
+        self.post_batch([{'op': 'remove', 'product_id': product.id}])
+        self.assertEqual(self.stock(product), 5)
+
+    def test_out_of_stock_rejects_the_whole_batch(self):
+        lime = Product.objects.create(name='Lime', price=Decimal('1.00'), stock=5)
+        fig = Product.objects.create(name='Fig', price=Decimal('3.00'), stock=2)
+        response = self.post_batch([
+            {'op': 'set', 'product_id': lime.id, 'quantity': 1},
+            {'op': 'set', 'product_id': fig.id, 'quantity': 3},
+        ])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['available'], 2)
+        self.assertEqual((self.stock(lime), self.stock(fig)), (5, 2))
+        self.assertFalse(self.cart.items.exists())
+
+    def test_expired_reservations_are_released_and_taken_again_at_checkout(self):
+        product = Product.objects.create(name='Lime', price=Decimal('1.00'), stock=5)
+        apply_cart_operations(self.cart, [('set', product.id, 3)])
+        self.assertEqual(inventory.release_expired(), 0)
+        self.cart.items.update(reserved_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(inventory.release_expired(), 3)
+        self.assertEqual(self.stock(product), 5)
+        self.assertEqual(self.cart.items.get().reserved_quantity, 0)
+
+        lines = inventory.consume_reservations(self.cart)
+        self.assertEqual([line.quantity for line in lines], [3])
+        self.assertEqual(self.stock(product), 2)
+        self.assertEqual(self.cart.items.get().reserved_quantity, 0)
+
+    def test_checkout_fails_when_released_stock_was_sold(self):
+        product = Product.objects.create(name='Lime', price=Decimal('1.00'), stock=1)
+        CartItem.objects.create(cart=self.cart, product=product, quantity=3)
+        with self.assertRaises(inventory.OutOfStockError):
+            inventory.consume_reservations(self.cart)
+        self.assertEqual(self.stock(product), 1)
+
+    def test_product_create_and_update_both_go_through_save_product(self):
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        fields = {'name': 'Lime', 'price': '1.00', 'stock': '10', 'initial-stock': '0', 'is_active': 'on'}
+        with mock.patch.object(inventory, 'save_product', wraps=inventory.save_product) as save_product:
+            self.client.post(reverse('product_create'), fields)
+            product = Product.objects.get(name='Lime')
+            self.client.post(reverse('product_update', args=[product.id]), {**fields, 'initial-stock': '10'})
+        self.assertEqual(save_product.call_count, 2)
+        self.assertEqual(self.stock(product), 10)
+
+    def test_stock_edit_applies_the_change_since_the_form_was_opened(self):
+        product = Product.objects.create(name='Lime', price=Decimal('1.00'), stock=10)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        # Someone reserves 4 while the form showing 10 is open.
+        inventory.take_stock(product.id, 4)
+        response = self.client.post(reverse('product_update', args=[product.id]), {
+            'name': 'Lime', 'price': '1.50', 'stock': '15', 'initial-stock': '10', 'is_active': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.price), (11, Decimal('1.50')))
+
+
+class CartTotalsTests(CartTestMixin, TestCase):
+    def counters(self):
+        self.cart.refresh_from_db()
+        return self.cart.item_count, self.cart.total
+
+    def test_cart_api_keeps_counters_current(self):
+        apple = Product.objects.create(name='Apple', price=Decimal('1.25'), stock=50)
+        pear = Product.objects.create(name='Pear', price=Decimal('2.00'), stock=50)
+        payload = self.post_batch([
+            {'op': 'set', 'product_id': apple.id, 'quantity': 4},
+            {'op': 'increment', 'product_id': pear.id, 'quantity': 2},
+        ]).json()
+        self.assertEqual((payload['item_count'], payload['total']), (6, 9.0))
+        self.assertEqual(self.counters(), (6, Decimal('9.00')))
+
+        payload = self.post_batch([
+            {'op': 'increment', 'product_id': apple.id, 'quantity': -1},
+            {'op': 'remove', 'product_id': pear.id},
+        ]).json()
+        self.assertEqual((payload['item_count'], payload['total']), (3, 3.75))
+        self.assertEqual(self.counters(), (3, Decimal('3.75')))
+
+        self.client.post(reverse('clear_cart'))
+        self.assertEqual(self.counters(), (0, Decimal('0.00')))
+
+    def test_orm_saves_and_deletes_keep_counters_current(self):
+        self.add_lines(2)
+        self.assertEqual(self.counters(), (3, Decimal('9.50')))
+        line = self.cart.items.order_by('id').first()
+        line.quantity = 4
+        line.save()
+        self.assertEqual(self.counters(), (6, Decimal('17.00')))
+        line.delete()
+        self.assertEqual(self.counters(), (2, Decimal('7.00')))
+
+    def test_price_change_reprices_lines(self):
+        self.add_lines(2)
+        product = Product.objects.get(name='Product 1')
+        product.price = Decimal('5.00')
+        product.save()
+        self.assertEqual(self.cart.items.get(product=product).unit_price, Decimal('5.00'))
+        # 2.50*1 + 5.00*2
+        self.assertEqual(self.counters(), (3, Decimal('12.50')))
+
+    def test_check_totals_repairs_drift(self):
+        self.add_lines(2)
+        Cart.objects.filter(pk=self.cart.pk).update(item_count=7, total=Decimal('1.00'))
+        with self.assertRaises(CommandError):
+            call_command('check_cart_totals', stdout=StringIO())
+        self.assertEqual(carts.check_totals(), [
+            (self.cart.pk, (7, Decimal('1.00')), (3, Decimal('9.50'))),
+        ])
+        call_command('check_cart_totals', '--fix', stdout=StringIO())
+        self.assertEqual(self.counters(), (3, Decimal('9.50')))
+        self.assertEqual(carts.check_totals(), [])
+
+
+class CartLifecycleTests(CartTestMixin, TestCase):
+    def age(self, cart, days):
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now() - timedelta(days=days))
+
+    def test_idle_carts_are_purged_and_archived(self):
+        product = Product.objects.create(name='Kale', price=Decimal('4.00'), stock=10)
+        apply_cart_operations(self.cart, [('set', product.id, 3)])
+        self.age(self.cart, 31)
+        active, _ = Cart.objects.get_or_create(user=User.objects.create_user('active'))
+        CartItem.objects.create(cart=active, product=product, quantity=1)
+
+        stats = cart_lifecycle.purge_idle_carts(archive=True, batch_size=1)
+        self.assertEqual((stats['carts'], stats['lines'], stats['archived']), (1, 1, 1))
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [active.pk])
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+        archived = ArchivedCart.objects.get()
+        self.assertEqual((archived.user, archived.item_count, archived.total), (self.user, 3, Decimal('12.00')))
+        self.assertEqual(archived.lines, [
+            {'product_id': product.id, 'name': 'Kale', 'unit_price': '4.00', 'quantity': 3},
+        ])
+        # The shopper starts over with an empty cart.
+        self.assertEqual(self.client.get(reverse('get_cart')).json()['items'], [])
+
+    def test_empty_carts_go_sooner(self):
+        full, _ = Cart.objects.get_or_create(user=User.objects.create_user('full'))
+        product = Product.objects.create(name='Kale', price=Decimal('4.00'), stock=10)
+        CartItem.objects.create(cart=full, product=product, quantity=1)
+        self.age(self.cart, 2)
+        self.age(full, 2)
+
+        output = StringIO()
+        call_command('purge_carts', '--dry-run', stdout=output)
+        self.assertIn('Would purge 1 carts with 0 lines', output.getvalue())
+        call_command('purge_carts', '--pause', '0', stdout=output)
+        self.assertIn('Purged 1 carts and 0 lines (0 archived)', output.getvalue())
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [full.pk])
+
+    def test_cart_changed_since_it_was_selected_is_kept(self):
+        self.add_lines(1)
+        self.age(self.cart, 31)
+        atomic = transaction.atomic
+
+        def shopper_returns_then_atomic(*args, **kwargs):
+            # The shopper changes the cart after its batch was selected.
+            Cart.bump_version(self.cart.pk)
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(cart_lifecycle, 'transaction', mock.Mock(atomic=shopper_returns_then_atomic)):
+            stats = cart_lifecycle.purge_idle_carts(archive=True)
+        self.assertEqual((stats['carts'], stats['lines'], stats['archived'], stats['batches']), (0, 0, 0, 1))
+        self.assertTrue(self.cart.items.exists())
+        self.assertFalse(ArchivedCart.objects.exists())
+
+
+class CheckoutTests(CartTestMixin, TestCase):
+    DELIVERY = {'country': 'KE', 'county': 'Nairobi', 'mobile_number': '+254712345678'}
+
+    def checkout(self, key='attempt-0001', **fields):
+        return self.client.post(
+            reverse('checkout'),
+            data=json.dumps({'idempotency_key': key, **self.DELIVERY, **fields}),
+            content_type='application/json',
+        )
+
+    def test_checkout_places_order_with_price_snapshot(self):
+        product = Product.objects.create(name='Lime', price=Decimal('2.00'), stock=10)
+        apply_cart_operations(self.cart, [('set', product.id, 3)])
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total'], 206.0)
+
+        Product.objects.filter(pk=product.pk).update(price=Decimal('9.00'))
+        order = Order.objects.get()
+        line = order.lines.get()
+        self.assertEqual((line.product_name, line.unit_price, line.quantity), ('Lime', Decimal('2.00'), 3))
+        self.assertEqual(order.county, 'Nairobi')
+        self.assertFalse(self.cart.items.exists())
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 7)
+
+    def test_checkout_cost_does_not_grow_with_the_lines(self):
+        def checkout_queries(count, key):
+            products = [
+                Product.objects.create(name=f'{key} {i}', price=Decimal('2.00'), stock=10) for i in range(count)
+            ]
+            apply_cart_operations(self.cart, [('set', product.id, 1) for product in products])
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.checkout(key=key).status_code, 201)
+            return len(queries)
+
+        self.assertEqual(checkout_queries(1, 'attempt-0001'), checkout_queries(6, 'attempt-0002'))
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.item_count, self.cart.total), (0, 0))
+        self.assertFalse(self.cart.items.exists())
+
+    def test_checkout_page_posts_to_the_api(self):
+        response = self.client.get(reverse('order'))
+        self.assertContains(response, f'data-checkout-url="{reverse("checkout")}"')
+        self.assertContains(response, 'js/order-page.js')
+
+    def test_retried_checkout_returns_the_same_order(self):
+        self.add_lines(2)
+        first = self.checkout()
+        retry = self.checkout()
+        self.assertEqual((first.status_code, retry.status_code), (201, 200))
+        self.assertEqual(first.json()['id'], retry.json()['id'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderLine.objects.count(), 2)
+
+    def test_empty_cart_and_invalid_details_are_rejected(self):
+        self.assertEqual(self.checkout().status_code, 409)
+        self.add_lines(1)
+        response = self.checkout(mobile_number='call me')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('mobile_number', response.json()['fields'])
+        self.assertEqual(self.checkout(key='x').status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_fails_cleanly_when_stock_ran_out(self):
+        product = Product.objects.create(name='Lime', price=Decimal('2.00'), stock=1)
+        CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['available'], 1)
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(self.cart.items.exists())
+
+    def test_history_pages_through_own_orders(self):
+        for i in range(3):
+            self.add_lines(1, start=i)
+            self.checkout(key=f'attempt-{i:04}')
+        other = User.objects.create_user('other')
+        Order.objects.create(
+            user=other, idempotency_key='theirs-0001', subtotal=1, shipping=0, total=1, **self.DELIVERY,
+        )
+
+        # user + orders + their lines
+        with self.assertNumQueries(3):
+            page = self.client.get(reverse('order_history'), {'limit': 2}).json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(page['results'][0]['lines'][0]['name'], 'Product 2')
+        rest = self.client.get(reverse('order_history'), {'limit': 2, 'cursor': page['next_cursor']}).json()
+        self.assertEqual([order['lines'][0]['name'] for order in rest['results']], ['Product 0'])
+        self.assertIsNone(rest['next_cursor'])
+
+
+class InventoryConcurrencyTests(TransactionTestCase):
+    THREADS = 16
+
+    def hammer(self, work):
+        """Run ``work(i)`` in THREADS threads at once; return what each returned."""
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = {}, []
+
+        def run(i):
+            try:
+                barrier.wait()
+                results[i] = work(i)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def carts(self):
+        return [
+            Cart.objects.get_or_create(user=User.objects.create_user(f'shopper{i}'))[0]
+            for i in range(self.THREADS)
+        ]
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_no_oversell(self):
+        product = Product.objects.create(name='Last Mango', price=Decimal('5.00'), stock=5)
+        carts = self.carts()
+
+        def add_one(i):
+            try:
+                retry_locked(apply_cart_operations, carts[i], [('increment', product.id, 1)])
+            except inventory.OutOfStockError:
+                return False
+            return True
+
+        results = self.hammer(add_one)
+        self.assertEqual(sum(results.values()), 5)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(CartItem.objects.aggregate(total=Sum('reserved_quantity'))['total'], 5)
+
+    @override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+    def test_no_lost_updates(self):
+        product = Product.objects.create(name='Mango', price=Decimal('5.00'), stock=1000)
+        shopper_carts = self.carts()
+
+        def churn(i):
+            for _ in range(3):
+                retry_locked(apply_cart_operations, shopper_carts[i], [('increment', product.id, 3)])
+                retry_locked(apply_cart_operations, shopper_carts[i], [('increment', product.id, -1)])
+
+        self.hammer(churn)
+        product.refresh_from_db()
+        held = CartItem.objects.aggregate(total=Sum('reserved_quantity'))['total']
+        self.assertEqual(held, 6 * self.THREADS)
+        self.assertEqual(product.stock + held, 1000)
+        self.assertEqual(carts.check_totals(), [])
+
+
+def retry_locked(func, *args):
+    # The shared-cache in-memory test database reports lock contention at once
+    # instead of waiting for the lock; back off randomly so threads interleave.
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            return func(*args)
+        except OperationalError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(random.uniform(0, 0.05))
+
+
+class AsyncCartViewTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+
+    async def test_get_cart_and_conditional_get(self):
+        await sync_to_async(self.add_lines)(2)
+        response = await self.async_client.get(reverse('get_cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['items']), 2)
+        response = await self.async_client.get(
+            reverse('get_cart'), headers={'If-None-Match': response['ETag']},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_update_and_clear_cart(self):
+        product = await Product.objects.acreate(name='Kiwi', price=Decimal('1.20'), stock=10)
+        response = await self.async_client.post(
+            reverse('update_cart'),
+            data={'product_id': product.id, 'quantity': 3},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['total'], 3.6)
+        response = await self.async_client.post(
+            reverse('update_cart'),
+            data={'product_id': 9999, 'quantity': 1},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 404)
+        await self.async_client.post(reverse('clear_cart'))
+        self.assertFalse(await self.cart.items.aexists())
+
+    async def test_find_product_by_name(self):
+        await Product.objects.acreate(name='Passion Fruit', price=Decimal('4.00'))
+        response = await self.async_client.get(reverse('find_product_by_name'), {'name': 'passion'})
+        self.assertEqual(response.json()['name'], 'Passion Fruit')
+
+    async def test_anonymous_user_is_redirected_to_login(self):
+        response = await AsyncClient().get(reverse('get_cart'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_password_change_ends_other_sessions(self):
+        await sync_to_async(self.user.set_password)('changed456')
+        await self.user.asave()
+        response = await self.async_client.get(reverse('get_cart'))
+        self.assertEqual(response.status_code, 302)
+
+
+class CartConsumerTests(CartTestMixin, TestCase):
+    application = URLRouter(routing.websocket_urlpatterns)
+
+    def setUp(self):
+        super().setUp()
+        async_to_sync(get_channel_layer().flush)()
+
+    async def connect(self, user):
+        scope = {'type': 'websocket', 'path': '/ws/cart/', 'headers': [], 'user': user}
+        communicator = ApplicationCommunicator(self.application, scope)
+        await communicator.send_input({'type': 'websocket.connect'})
+        response = await communicator.receive_output()
+        return communicator, response['type'] == 'websocket.accept'
+
+    def test_anonymous_socket_is_rejected(self):
+        async def run():
+            _, accepted = await self.connect(AnonymousUser())
+            return accepted
+        self.assertFalse(async_to_sync(run)())
+
+    def test_cart_changes_reach_only_the_owner(self):
+        other = User.objects.create_user('other', password='secret123')
+        product = Product.objects.create(name='Mango', price=Decimal('5.00'), stock=10)
+
+        def add_to_cart():
+            with self.captureOnCommitCallbacks(execute=True):
+                apply_cart_operations(self.cart, [('set', product.id, 2)])
+
+        async def run():
+            mine, _ = await self.connect(self.user)
+            theirs, _ = await self.connect(other)
+            await sync_to_async(add_to_cart)()
+            message = await mine.receive_output()
+            nothing = await theirs.receive_nothing()
+            for communicator in (mine, theirs):
+                await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await communicator.wait()
+            return json.loads(message['text']), nothing
+
+        message, nothing = async_to_sync(run)()
+        self.assertEqual(message, {
+            'type': 'cart_item_added',
+            'data': {'product_id': product.id, 'quantity': 2},
+        })
+        self.assertTrue(nothing)
+
+    def test_socket_events_are_measured(self):
+        instrumentation.reset()
+
+        async def run():
+            communicator, _ = await self.connect(self.user)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+
+        async_to_sync(run)()
+        metrics = instrumentation.prometheus_text()
+        self.assertIn('zaoapp_duration_seconds_count{view="CartConsumer.websocket.connect"} 1', metrics)
+        self.assertIn('zaoapp_duration_seconds_count{view="CartConsumer.websocket.disconnect"} 1', metrics)
+
+    async def group_send(self, *events):
+        layer = get_channel_layer()
+        for event_type, data in events:
+            await layer.group_send(cart_group_name(self.user.pk), {'type': event_type, 'data': data})
+
+    @override_settings(CART_WS_COALESCE_WINDOW=0.2)
+    def test_burst_is_coalesced_into_one_frame(self):
+        async def run():
+            socket, _ = await self.connect(self.user)
+            await self.group_send(
+                ('cart_item_added', {'product_id': 1, 'quantity': 1}),
+                ('cart_item_added', {'product_id': 1, 'quantity': 2}),
+                ('cart_item_added', {'product_id': 2, 'quantity': 1}),
+                ('cart_item_removed', {'product_id': 2}),
+            )
+            frame = await socket.receive_output(timeout=2)
+            nothing = await socket.receive_nothing(timeout=0.5)
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait()
+            return json.loads(frame['text']), nothing
+
+        frame, nothing = async_to_sync(run)()
+        self.assertEqual(frame, {'type': 'cart_patch', 'data': {
+            'snapshot': None,
+            'lines': [{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 0}],
+        }})
+        self.assertTrue(nothing)
+
+    @override_settings(CART_WS_COALESCE_WINDOW=5, CART_WS_MAX_PENDING=3)
+    def test_slow_consumer_is_closed(self):
+        async def run():
+            socket, _ = await self.connect(self.user)
+            await self.group_send(*[('cart_item_added', {'product_id': i, 'quantity': 1}) for i in range(5)])
+            frame = await socket.receive_output(timeout=2)
+            await socket.send_input({'type': 'websocket.disconnect', 'code': CLOSE_SLOW_CONSUMER})
+            await socket.wait()
+            return frame
+
+        self.assertEqual(async_to_sync(run)(), {'type': 'websocket.close', 'code': CLOSE_SLOW_CONSUMER})
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'channels.sqlite3'
+
+    def test_group_send_reaches_channels_of_another_process(self):
+        # Two layer instances stand in for two worker processes.
+        async def run():
+            sender = SQLiteChannelLayer(path=self.path)
+            receiver = SQLiteChannelLayer(path=self.path)
+            first, second = await receiver.new_channel(), await receiver.new_channel()
+            await receiver.group_add('cart_user_1', first)
+            await receiver.group_add('cart_user_1', second)
+            await sender.group_send('cart_user_1', {'type': 'cart_update', 'data': {'n': 1}})
+            return await receiver.receive(first), await receiver.receive(second)
+
+        self.assertEqual(async_to_sync(run)(), ({'type': 'cart_update', 'data': {'n': 1}},) * 2)
+
+    def test_expired_messages_are_dropped_with_their_group_membership(self):
+        async def run():
+            layer = SQLiteChannelLayer(path=self.path, expiry=0.01, cleanup_interval=0)
+            channel = await layer.new_channel()
+            await layer.group_add('cart_user_1', channel)
+            await layer.group_send('cart_user_1', {'type': 'stale'})
+            time.sleep(0.05)
+            await layer._run(layer._clean_expired, time.time())
+            await layer.group_send('cart_user_1', {'type': 'after'})
+            return await layer._run(lambda: layer._db().execute('SELECT COUNT(*) FROM messages').fetchone()[0])
+
+        self.assertEqual(async_to_sync(run)(), 0)
+
+    def test_group_send_honours_channel_capacity(self):
+        async def run():
+            layer = SQLiteChannelLayer(path=self.path, channel_capacity={'specific.*': 1})
+            channel = await layer.new_channel()
+            await layer.group_add('cart_user_1', channel)
+            for n in range(3):
+                await layer.group_send('cart_user_1', {'type': 'cart_update', 'data': {'n': n}})
+            return await layer._run(lambda: layer._db().execute('SELECT COUNT(*) FROM messages').fetchone()[0])
+
+        self.assertEqual(async_to_sync(run)(), 1)
+
+    def test_idle_polls_leave_the_write_lock_alone(self):
+        async def run():
+            layer = SQLiteChannelLayer(path=self.path)
+            await layer.new_channel()
+            await layer._run(layer._db)
+            writer = sqlite3.connect(self.path, isolation_level=None)
+            writer.execute('BEGIN IMMEDIATE')
+            try:
+                started = time.monotonic()
+                rows = await layer._run(layer._claim_local, tuple(layer._owners))
+                return rows, time.monotonic() - started
+            finally:
+                writer.rollback()
+                writer.close()
+
+        rows, elapsed = async_to_sync(run)()
+        self.assertEqual(rows, [])
+        self.assertLess(elapsed, 1)
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(sqlite_backend.close_pool)
+        self.path = Path(directory.name) / 'db.sqlite3'
+
+    def wrapper(self, **options):
+        settings_dict = {**connection.settings_dict, 'NAME': str(self.path)}
+        settings_dict['OPTIONS'] = {**settings_dict['OPTIONS'], **options}
+        wrapper = sqlite_backend.DatabaseWrapper(settings_dict, alias='probe')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connections_are_set_up_and_reused(self):
+        wrapper = self.wrapper()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        raw = wrapper.connection
+        wrapper.close()
+        other = self.wrapper()
+        other.ensure_connection()
+        self.assertIs(other.connection, raw)
+
+    def test_pooled_connections_to_a_replaced_file_are_dropped(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        self.path.unlink()
+        other = self.wrapper()
+        other.ensure_connection()
+        self.assertIsNot(other.connection, raw)
+
+    def test_pooled_connections_are_not_reused_after_a_fork(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        self.addCleanup(raw.close)
+        wrapper.close()
+        with mock.patch.object(sqlite_backend.os, 'getpid', return_value=-1):
+            other = self.wrapper()
+            other.ensure_connection()
+            self.assertIsNot(other.connection, raw)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        writer = self.wrapper()
+        writer.ensure_connection()
+        writer._start_transaction_under_autocommit()
+        self.addCleanup(writer.connection.rollback)
+        waiter = self.wrapper(init_command='PRAGMA busy_timeout=1', pool=False)
+        waiter.ensure_connection()
+        with mock.patch.object(sqlite_backend, 'BEGIN_BACKOFF', 0.001):
+            with self.assertRaisesMessage(OperationalError, 'locked'):
+                waiter._start_transaction_under_autocommit()
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'cache.sqlite3'
+
+    def cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_entries_are_shared_between_processes(self):
+        # Two instances stand in for two worker processes.
+        first, second = self.cache(), self.cache()
+        first.set('greeting', {'text': 'jambo'})
+        self.assertEqual(second.get('greeting'), {'text': 'jambo'})
+        self.assertFalse(second.add('greeting', 'other'))
+        first.set('hits', 1)
+        second.incr('hits')
+        self.assertEqual(first.incr('hits', 5), 7)
+        self.assertTrue(first.delete('greeting'))
+        self.assertIsNone(second.get('greeting'))
+
+    def test_expired_entries_are_gone(self):
+        cache = self.cache()
+        cache.set('stale', 1, timeout=0)
+        self.assertIsNone(cache.get('stale'))
+        self.assertNotIn('stale', cache)
+        self.assertTrue(cache.add('stale', 2))
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        with mock.patch.object(sqlite_cache, 'TOUCH_INTERVAL', 0):
+            cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']), {'a': 'a', 'c': 'c', 'd': 'd'})
+
+
+class StorefrontBenchmarkTests(SimpleTestCase):
+    def test_results_that_regress_past_the_tolerance_are_reported(self):
+        baseline = {'cart': {'requests_per_second': 100, 'p95_ms': 50, 'queries_per_request': 2, 'errors': 0}}
+        results = {
+            'cart': {'requests_per_second': 80, 'p95_ms': 70, 'queries_per_request': 3, 'errors': 0},
+            'find': {'requests_per_second': 1, 'p95_ms': 900},  # not in the baseline
+        }
+        self.assertEqual(bench_storefront.compare(results, baseline, tolerance=0.25), [
+            'cart p95_ms 50 -> 70',
+            'cart queries_per_request 2 -> 3',
+        ])
+
+
+class SessionCacheTests(CartTestMixin, TestCase):
+    def session_cache_key(self):
+        return cached_db.KEY_PREFIX + self.client.session.session_key
+
+    def test_session_evicted_from_the_cache_is_loaded_from_the_database(self):
+        self.assertIsNotNone(cache.get(self.session_cache_key()))
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('get_cart')).status_code, 200)
+        self.assertIsNotNone(cache.get(self.session_cache_key()))
+
+    def test_logout_removes_the_cached_session(self):
+        key = self.session_cache_key()
+        self.client.get(reverse('logout'))
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.client.get(reverse('get_cart')).status_code, 302)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.replica_path = Path(directory.name) / 'replica.sqlite3'
+        connections.settings['replica'] = {
+            **connections.settings['default'],
+            'NAME': f'file:{self.replica_path}?mode=ro',
+            'OPTIONS': {'pool': True},
+        }
+        self.addCleanup(self.remove_replica)
+        db_router._down_until.clear()
+
+        self.user = User.objects.create_user('shopper', password='secret123')
+        self.product = Product.objects.create(name='Mango', price=Decimal('2.00'), stock=10)
+        self.client.force_login(self.user)
+
+    def remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        sqlite_backend.close_pool()
+
+    def sync(self):
+        connections['replica'].close()
+        call_command('sync_replicas', stdout=StringIO())
+
+    def add_to_cart(self, client):
+        return client.post(
+            reverse('update_cart'),
+            data=json.dumps({'product_id': self.product.id, 'quantity': 2}),
+            content_type='application/json',
+        )
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.sync()
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(Product), 'default')
+
+    def test_request_reads_use_the_replica_until_the_browser_writes(self):
+        self.sync()
+        Product.objects.filter(pk=self.product.pk).update(name='Ripe Mango', search_name='ripe mango')
+        # Not yet copied to the replica
+        response = self.client.get(reverse('find_product_by_name'), {'name': 'Mango'})
+        self.assertEqual(response.json()['name'], 'Mango')
+
+        response = self.add_to_cart(self.client)
+        self.assertEqual(response.json()['item_count'], 2)
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        # Pinned to the primary: the cart the browser just wrote
+        self.assertEqual(self.client.get(reverse('get_cart')).json()['item_count'], 2)
+        other_browser = self.client_class()
+        other_browser.force_login(self.user)
+        self.assertEqual(other_browser.get(reverse('get_cart')).json()['item_count'], 0)
+
+        self.sync()
+        self.assertEqual(other_browser.get(reverse('get_cart')).json()['item_count'], 2)
+
+    def test_unavailable_replica_falls_back_to_the_primary(self):
+        # Never synced: the replica file does not exist.
+        response = self.client.get(reverse('find_product_by_name'), {'name': 'Mango'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('replica', db_router._down_until)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name='Pawpaw', price=Decimal('80.00'))
+
+    def test_index_is_served_from_cache(self):
+        self.client.get(reverse('index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Pawpaw')
+
+    def test_carousels_come_from_the_cached_fragments(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'))
+        self.assertTemplateNotUsed(response, 'product_image.html')
+        # The grid, the featured and popular carousels, and two slides in "Just arrived"
+        self.assertContains(response, 'title="Pawpaw"', count=5)
+
+    def test_product_changes_invalidate_the_grid(self):
+        self.client.get(reverse('index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Ripe Pawpaw'
+            self.product.save()
+            Product.objects.create(name='Guava', price=Decimal('20.00'), is_active=False)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Ripe Pawpaw')
+        self.assertNotContains(response, 'Guava')
+
+    def test_concurrent_miss_waits_for_the_rebuild(self):
+        builds = []
+        cache.add('catalog:test:lock', 1)
+        # Another request holds the lock and finishes its rebuild shortly.
+        threading.Timer(0.1, cache.set, ('catalog:test', 'built elsewhere')).start()
+        self.assertEqual(catalog.get_or_build('catalog:test', builds.append), 'built elsewhere')
+        self.assertEqual(builds, [])
+
+
+class InstrumentationTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        instrumentation.reset()
+
+    def test_server_timing_reports_queries_and_cache_lookups(self):
+        self.add_lines(2)
+        self.client.get(reverse('get_cart'))
+        # user + cart lookup; the payload comes from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('get_cart'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries"')
+        self.assertIn('cache;desc="2 hits, 0 misses"', timing)  # session and cart payload
+
+    def test_each_request_is_logged_as_one_json_line(self):
+        with self.assertLogs('zaoapp.instrumentation', 'INFO') as logs:
+            self.client.get(reverse('index'))
+        [line] = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual((line['view'], line['method'], line['status']), ('index', 'GET', 200))
+        self.assertGreater(line['duration_seconds'], 0)
+        self.assertGreater(line['db_queries'], 0)
+
+    def test_metrics_page_has_percentiles_per_view(self):
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        metrics = response.content.decode()
+        self.assertIn('# TYPE zaoapp_duration_seconds summary', metrics)
+        self.assertIn('zaoapp_duration_seconds_count{view="index"} 2', metrics)
+        self.assertIn('zaoapp_db_queries{view="index",quantile="0.99"}', metrics)
+        template_time = re.search(r'zaoapp_template_duration_seconds_sum\{view="index"\} (\S+)', metrics)
+        self.assertGreater(float(template_time[1]), 0)
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        for i in range(7):
+            Product.objects.create(name=f'Item {i}', price=Decimal('1.00') + i, stock=i)
+        Product.objects.create(name='Hidden', price=Decimal('1.00'), is_active=False)
+        # Identical timestamps must still page by id without gaps or repeats.
+        Product.objects.filter(name__in=['Item 2', 'Item 3', 'Item 4']).update(
+            created_at=Product.objects.get(name='Item 2').created_at)
+
+    def test_pages_cover_active_products_once_in_order(self):
+        names, cursor = [], None
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            payload = self.client.get(reverse('product_list'), params).json()
+            names += [row['name'] for row in payload['results']]
+            cursor = payload['next_cursor']
+            if cursor is None:
+                break
+        expected = list(Product.objects.filter(is_active=True).order_by('-created_at', '-id')
+                        .values_list('name', flat=True))
+        self.assertEqual(names, expected)
+        self.assertEqual(len(names), 7)
+
+    def test_fields_projection(self):
+        payload = self.client.get(reverse('product_list'), {'fields': 'name,price', 'limit': 1}).json()
+        self.assertEqual(set(payload['results'][0]), {'name', 'price'})
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'fields': 'password'}, {'cursor': 'not-a-cursor'}, {'limit': '0'}):
+            self.assertEqual(self.client.get(reverse('product_list'), params).status_code, 400)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.papaya = Product.objects.create(name='Papaya', price=Decimal('30.00'))
+        self.passion = Product.objects.create(
+            name='Passion Fruit', price=Decimal('45.00'), description='Tart and fragrant')
+        self.creme = Product.objects.create(name='Crème Fraîche', price=Decimal('90.00'))
+        Product.objects.create(name='Pap Hidden', price=Decimal('1.00'), is_active=False)
+
+    def search(self, q):
+        return [row['name'] for row in self.client.get(reverse('product_search'), {'q': q}).json()['results']]
+
+    def test_find_ignores_case_and_accents(self):
+        response = self.client.get(reverse('find_product_by_name'), {'name': '  creme   FRAICHE '})
+        self.assertEqual(response.json()['id'], self.creme.id)
+
+    def test_find_falls_back_to_partial_match(self):
+        response = self.client.get(reverse('find_product_by_name'), {'name': 'passion'})
+        self.assertEqual(response.json()['id'], self.passion.id)
+
+    def test_prefix_autocomplete_ranks_name_matches_first(self):
+        Product.objects.create(name='Mango', price=Decimal('10.00'), description='Sweeter than papaya')
+        self.assertTrue(search.fts_available())
+        self.assertEqual(self.search('pap')[0], 'Papaya')
+        self.assertEqual(self.search('papaya'), ['Papaya', 'Mango'])
+        self.assertEqual(self.search('passion fr'), ['Passion Fruit'])
+
+    def test_index_follows_renames_and_deletes(self):
+        self.papaya.name = 'Pawpaw'
+        self.papaya.save()
+        self.assertEqual(self.search('papa'), [])
+        self.assertEqual(self.search('pawp'), ['Pawpaw'])
+        self.papaya.delete()
+        self.assertEqual(self.search('pawp'), [])
+
+    def test_rebuild_matches_incremental_index(self):
+        Product.objects.filter(pk=self.papaya.pk).update(name='Guava')
+        search.rebuild_index()
+        self.assertEqual(Product.objects.get(pk=self.papaya.pk).search_name, 'guava')
+        self.assertEqual(self.search('guav'), ['Guava'])
+
+    def test_query_syntax_is_matched_literally(self):
+        self.assertEqual(search.search_products('"NEAR( *'), [])
+        self.assertEqual(self.client.get(reverse('product_search'), {'q': ''}).status_code, 400)
+
+
+class ProductReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reports_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.reports_root.cleanup)
+        settings_override = override_settings(REPORTS_ROOT=Path(self.reports_root.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for i in range(130):
+            Product.objects.create(name=f'Product {i:03}', price=Decimal('2.50'), stock=i)
+        Product.objects.create(name='Café (large) \\ box', price=Decimal('9.00'), is_active=False)
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+    def download(self):
+        response = self.client.get(reverse('product_admin_report_pdf'))
+        if response.status_code == 202:
+            self.assertEqual(jobs.run_pending('test'), 1)
+            response = self.client.get(reverse('product_admin_report_pdf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        return b''.join(response.streaming_content)
+
+    def test_report_lists_every_product_across_pages(self):
+        pdf = self.download()
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.rstrip().endswith(b'%%EOF'))
+        self.assertIn(b'(Product 000)', pdf)
+        self.assertIn(b'(Product 129)', pdf)
+        self.assertIn(b'(Caf\xe9 \\(large\\) \\\\ box)', pdf)
+        self.assertIn(b'/Count 3', pdf)
+
+    def test_names_the_fonts_cannot_show_are_logged(self):
+        Product.objects.create(name='Пирожки', price=Decimal('3.00'))
+        with self.assertLogs('zaoapp.reports', 'WARNING') as logs:
+            pdf = self.download()
+        self.assertIn(b'(???????)', pdf)
+        self.assertIn('1 names', logs.output[0])
+        self.assertIn('Пирожки', logs.output[0])
+
+    def test_reports_are_kept_out_of_media_root(self):
+        with override_settings(REPORTS_ROOT=None), self.assertRaises(ImproperlyConfigured):
+            reports.reports_root()
+        inside_media = Path(settings.MEDIA_ROOT) / 'reports'
+        with override_settings(REPORTS_ROOT=inside_media), self.assertRaises(ImproperlyConfigured):
+            reports.reports_root()
+
+    def test_xref_offsets_point_at_objects(self):
+        pdf = self.download()
+        xref = int(pdf[pdf.rindex(b'startxref') + 9:].split()[0])
+        entries = pdf[xref:].split(b'\n')[2:]
+        for object_id, entry in enumerate(entries[1:], start=1):
+            if not entry.endswith(b' n '):
+                break
+            offset = int(entry[:10])
+            self.assertTrue(pdf[offset:].startswith(b'%d 0 obj' % object_id))
+
+    def test_unchanged_catalog_is_served_from_disk(self):
+        first = self.download()
+        with self.assertNumQueries(2):  # user, last product change
+            self.assertEqual(self.download(), first)
+
+    def test_stock_changes_reach_the_report(self):
+        product = Product.objects.get(name='Product 005')
+        self.download()
+        owner = User.objects.create_user('shopper')
+        cart = Cart.objects.create(user=owner)
+        apply_cart_operations(cart, [('set', product.id, 2)])
+        # Stock alone changed: a report this recent is still served.
+        self.assertIn(b'(5)', self.download())
+        with mock.patch.object(reports, 'STOCK_MAX_AGE', 0):
+            self.assertEqual(self.client.get(reverse('product_admin_report_pdf')).status_code, 202)
+            pdf = self.download()
+        self.assertNotIn(b'(5)', pdf)
+        self.assertEqual(pdf.count(b'(3)'), 2)  # Product 003 and Product 005
+
+    def test_report_deleted_mid_request_is_rebuilt(self):
+        self.download()
+        # A newer version's job removed the file just before it was opened.
+        with mock.patch('zaoapp.reports.open', side_effect=FileNotFoundError, create=True):
+            response = self.client.get(reverse('product_admin_report_pdf'))
+        self.assertEqual(response.status_code, 202)
+
+    def test_report_is_built_in_the_background(self):
+        url = reverse('product_admin_report_pdf')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.client.get(url)
+        job = Job.objects.get()
+        status_url = reverse('job_status', args=[job.pk])
+        self.assertContains(response, status_url, status_code=202)
+        self.assertEqual(self.client.get(status_url).json()['status'], Job.PENDING)
+
+        jobs.run_pending('test')
+        self.assertEqual(self.client.get(status_url).json()['status'], Job.DONE)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_product_change_regenerates_report(self):
+        self.download()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Zucchini', price=Decimal('1.00'))
+        self.assertIn(b'(Zucchini)', self.download())
+        self.assertEqual(len(list(Path(self.reports_root.name).glob('products-*.pdf'))), 1)
+
+
+calls = []
+
+
+@jobs.task('test_flaky', max_attempts=2, retry_delay=0)
+def flaky_task(value):
+    calls.append(value)
+    if len(calls) == 1:
+        raise RuntimeError('first try fails')
+    return value * 2
+
+
+@jobs.task('test_serial', concurrency=1)
+def serial_task():
+    return 'ok'
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_failed_job_is_retried(self):
+        job = flaky_task.enqueue(21)
+        with self.assertLogs('zaoapp.jobs', 'WARNING'):
+            jobs.run(jobs.claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('first try fails', job.error)
+
+        jobs.run(jobs.claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.DONE, 42, 2))
+
+    def test_gives_up_after_max_attempts(self):
+        job = flaky_task.enqueue('x')
+        Job.objects.filter(pk=job.pk).update(max_attempts=1)
+        with self.assertLogs('zaoapp.jobs', 'ERROR'):
+            jobs.run(jobs.claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.to_dict()['error']), (Job.FAILED, 'RuntimeError: first try fails'))
+
+    def test_concurrency_limit_spans_workers(self):
+        first, second = serial_task.enqueue(), serial_task.enqueue()
+        self.assertEqual(jobs.claim('w1').pk, first.pk)
+        self.assertIsNone(jobs.claim('w2'))
+        jobs.run(Job.objects.get(pk=first.pk))
+        self.assertEqual(jobs.claim('w2').pk, second.pk)
+
+    def test_abandoned_jobs_are_requeued(self):
+        job = serial_task.enqueue()
+        jobs.claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(started_at=job.created_at - jobs.lease_timeout() * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.run_pending('w1'), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_unknown_task_fails(self):
+        job = Job.objects.create(task='no_such_task')
+        self.assertIsNone(jobs.claim('w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_status_is_private_to_the_owner(self):
+        owner = User.objects.create_user('owner', password='x')
+        job = serial_task.enqueue(user=owner)
+        self.client.force_login(User.objects.create_user('other', password='x'))
+        self.assertEqual(self.client.get(reverse('job_status', args=[job.pk])).status_code, 404)
+        self.client.force_login(owner)
+        self.assertEqual(self.client.get(reverse('job_status', args=[job.pk])).json()['status'], Job.PENDING)
+
+
+def url_path(url):
+    return url.split('?')[0]
+
+
+def png_upload(name='photo.png', size=(900, 600)):
+    out = BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 128)).save(out, 'PNG')
+    return SimpleUploadedFile(name, out.getvalue(), content_type='image/png')
+
+
+class ImageVariantTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name='Kiwi', price=Decimal('5.00'), image=png_upload())
+        jobs.run_pending('test')
+        self.product.refresh_from_db()
+
+    def test_upload_creates_variants_in_the_background(self):
+        variants = self.product.image_variants
+        self.assertEqual(variants['source'], 'products/photo.png')
+        self.assertEqual(sorted(variants['webp'], key=int), ['160', '320', '640', '900'])
+        with Image.open(self.media_root / variants['jpeg']['320']) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (320, 213)))
+        with Image.open(self.media_root / variants['webp']['160']) as image:
+            self.assertEqual((image.format, image.mode), ('WEBP', 'RGBA'))
+
+    def test_pages_and_apis_use_sized_images(self):
+        self.assertEqual(url_path(self.product.thumbnail_url), '/media/products/photo_160w.jpg')
+        response = self.client.get(reverse('index'))
+        self.assertRegex(response.content.decode(), r'srcset="/media/products/photo_160w\.webp\?v=\w+ 160w, ')
+        self.assertNotContains(response, 'src="/media/products/photo.png')
+
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        line = self.client.get(reverse('get_cart')).json()['items'][0]
+        self.assertEqual(url_path(line['image_url']), '/media/products/photo_160w.jpg')
+        self.assertRegex(line['image_srcset'], r'/media/products/photo_900w\.webp\?v=\w+ 900w')
+
+        row = self.client.get(reverse('product_list')).json()['results'][0]
+        self.assertEqual(url_path(row['image_url']), '/media/products/photo_320w.jpg')
+
+    def test_variant_urls_are_versioned_without_touching_the_files(self):
+        variants = self.product.image_variants
+        versions = variants['versions']
+        self.assertEqual(versions, {
+            name: media.file_version(self.media_root / name) for name in images.variant_names(variants)
+        })
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+        cache.clear()
+        with mock.patch.object(media, 'file_version', wraps=media.file_version) as file_version:
+            response = self.client.get(reverse('index'))
+            self.client.get(reverse('get_cart'))
+            self.client.get(reverse('product_list'))
+        self.assertEqual(file_version.call_count, 0)
+        self.assertContains(response, f'/media/products/photo_160w.webp?v={versions["products/photo_160w.webp"]} 160w')
+
+    def test_each_srcset_is_built_once_per_image(self):
+        with mock.patch.object(images, 'srcset', wraps=images.srcset) as srcset:
+            html = render_to_string('product_image.html', {'product': self.product, 'sizes': '50vw'})
+        self.assertEqual([c.args[2] for c in srcset.call_args_list], ['webp', 'jpeg'])
+        self.assertIn('type="image/webp" srcset="/media/products/photo_160w.webp', html)
+        self.assertIn('srcset="/media/products/photo_160w.jpg', html)
+
+    def test_cached_carts_follow_image_changes(self):
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=1)
+
+        def image_url():
+            return url_path(self.client.get(reverse('get_cart')).json()['items'][0]['image_url'])
+
+        self.assertEqual(image_url(), '/media/products/photo_160w.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.image = png_upload('other.png', (100, 100))
+            self.product.save()
+        self.assertEqual(image_url(), '/media/products/other.png')
+        jobs.run_pending('test')
+        self.assertEqual(image_url(), '/media/products/other_100w.jpg')
+
+    def test_replacing_the_image_replaces_variants(self):
+        old_files = [self.media_root / name for name in self.product.image_variants['webp'].values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.image = png_upload('other.png', (100, 100))
+            self.product.save()
+        # Until the job runs, the new original is served rather than stale variants.
+        self.assertEqual(url_path(self.product.thumbnail_url), '/media/products/other.png')
+        jobs.run_pending('test')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_variants['jpeg'], {'100': 'products/other_100w.jpg'})
+        self.assertFalse(any(path.exists() for path in old_files))
+
+
+class MediaServingTests(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=Path(media.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.body = bytes(range(256)) * 40
+        default_storage.save('products/data.bin', ContentFile(self.body))
+        self.url = default_storage.url('products/data.bin')
+
+    def test_versioned_url_is_cached_for_a_year(self):
+        self.assertRegex(self.url, r'^/media/products/data\.bin\?v=\w{12}$')
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Length'], str(len(self.body)))
+        stale = self.client.get(url_path(self.url) + '?v=000000000000')
+        self.assertEqual(stale['Cache-Control'], 'public, no-cache')
+
+    def test_content_change_changes_the_url(self):
+        default_storage.delete('products/data.bin')
+        default_storage.save('products/data.bin', ContentFile(b'new content'))
+        self.assertNotEqual(default_storage.url('products/data.bin'), self.url)
+
+    def test_conditional_requests(self):
+        response = self.client.get(self.url)
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['Cache-Control'], 'public, max-age=31536000, immutable')
+        since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), self.body[-5:])
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=99999-').status_code, 416)
+        outdated = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"other"')
+        self.assertEqual(outdated.status_code, 200)
+
+    def test_asgi_responses_stream_from_a_thread(self):
+        async def fetch():
+            response = await self.async_client.get(self.url, headers={'Range': 'bytes=100-'})
+            return response, b''.join([chunk async for chunk in response])
+
+        response, content = async_to_sync(fetch)()
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.body[100:])
+
+    def test_accel_redirect(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/products/data.bin')
+        self.assertEqual(response.content, b'')
+
+    def test_paths_outside_media_root_are_not_served(self):
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/products/').status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+class StaticAssetTests(TestCase):
+    def test_pages_carry_no_inline_cart_script(self):
+        response = self.client.get(reverse('index'))
+        self.assertNotContains(response, '<script>')
+        self.assertContains(response, 'src="/static/js/cart.js"')
+        self.assertContains(response, f'data-cart-url="{reverse("get_cart")}"')
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(
+            STATIC_ROOT=static_root,
+            STORAGES={
+                'default': {'BACKEND': 'zaoapp.media.VersionedMediaStorage'},
+                'staticfiles': {'BACKEND': 'zaoapp.staticfiles.StaticFilesStorage'},
+            },
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            manifest = json.loads((Path(static_root) / 'staticfiles.json').read_text())['paths']
+            self.assertRegex(manifest['js/cart.js'], r'^js/cart\.[0-9a-f]{12}\.js$')
+            self.assertTrue((Path(static_root) / (manifest['js/cart.js'] + '.gz')).exists())
+            self.assertNotIn('js/plugins copy.js', manifest)
+            with override_settings(DEBUG=False):
+                response = self.client.get(reverse('login'))
+            self.assertContains(response, f'src="/static/{manifest["js/cart.js"]}"')
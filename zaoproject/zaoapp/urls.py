@@ -14,11 +14,18 @@ urlpatterns = [
     path('order/', views.order, name='order'),
     path('api/cart/get/', views.get_cart, name='get_cart'),
     path('api/cart/update/', views.update_cart, name='update_cart'),
+    path('api/cart/batch/', views.update_cart_batch, name='update_cart_batch'),
     path('api/cart/clear/', views.clear_cart, name='clear_cart'),
+    path('api/orders/', views.order_history, name='order_history'),
+    path('api/orders/checkout/', views.checkout, name='checkout'),
+    path('api/products/', views.product_list, name='product_list'),
+    path('api/products/search/', views.product_search, name='product_search'),
     path('api/products/find/', views.find_product_by_name, name='find_product_by_name'),
+    path('api/jobs/<int:pk>/', views.job_status, name='job_status'),
     path('dashboard/products/', views.product_admin_list, name='product_admin_list'),
     path('dashboard/products/add/', views.product_create, name='product_create'),
     path('dashboard/products/<int:pk>/edit/', views.product_update, name='product_update'),
     path('dashboard/products/<int:pk>/delete/', views.product_delete, name='product_delete'),
     path('dashboard/products/report/pdf/', views.product_admin_report_pdf, name='product_admin_report_pdf'),
+    path('dashboard/metrics/', views.metrics, name='metrics'),
 ]
@@ -44,8 +44,11 @@ INSTALLED_APPS = [
 ASGI_APPLICATION = 'zaoproject.asgi.application'
 
 MIDDLEWARE = [
+    # Server-Timing headers, metrics log lines and the dashboard/metrics/ page
+    'zaoapp.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'zaoapp.db_router.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,7 +61,8 @@ ROOT_URLCONF = 'zaoproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend, timing renders for the request metrics
+        'BACKEND': 'zaoapp.instrumentation.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,22 +80,98 @@ WSGI_APPLICATION = 'zaoproject.wsgi.application'
 # Channels
 ASGI_APPLICATION = 'zaoproject.asgi.application'
 
+# Shared by all gunicorn workers on the host through a small SQLite file, so
+# group sends from one worker reach sockets held by the others.
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'zaoapp.channel_layers.SQLiteChannelLayer',
+        'CONFIG': {
+            'path': BASE_DIR / 'channels.sqlite3',
+        },
     }
 }
 
+# Shared by all gunicorn workers on the host through a SQLite file (see
+# zaoapp.sqlite_cache); past MAX_ENTRIES the least recently used entries go.
+CACHES = {
+    'default': {
+        'BACKEND': 'zaoapp.sqlite_cache.SQLiteCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+# Sessions are read from the cache, falling back to the database, and
+# written to both (manage.py bench_sessions compares with the db engine)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Cart events reaching a socket within this many seconds go out as one frame
+CART_WS_COALESCE_WINDOW = 0.05
+# Sockets with more undelivered cart events than this are closed
+CART_WS_MAX_PENDING = 200
+
+# Background jobs (manage.py run_jobs) still running after this many seconds
+# are assumed abandoned by a dead worker and run again
+JOB_LEASE_TIMEOUT = 15 * 60
+
+# Seconds a cart line keeps its stock reserved after its last change
+CART_RESERVATION_TTL = 15 * 60
+
+# Seconds without a change after which manage.py purge_carts deletes a cart,
+# and a shorter limit for carts with nothing in them
+CART_IDLE_TTL = 30 * 24 * 60 * 60
+CART_EMPTY_IDLE_TTL = 24 * 60 * 60
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for several worker processes (see zaoapp.sqlite_backend):
+# WAL lets readers carry on while one connection writes, synchronous=NORMAL
+# only fsyncs at checkpoints (safe with WAL; a power loss can drop the last
+# commits, never corrupt), writers wait up to 5s for the lock, and
+# transactions take the write lock up front so waiting works at all. Each
+# worker process reuses its open connections through the backend's pool.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'zaoapp.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA busy_timeout=5000;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'pool': {'max_size': 8},
+        },
     }
 }
 
+# Read replicas (see zaoapp.db_router): read-only copies of db.sqlite3,
+# refreshed by manage.py sync_replicas, that serve catalog and cart reads.
+# Empty, everything is read from the primary.
+REPLICA_DATABASE_FILES = []
+# Seconds a browser reads from the primary after writing; keep it above the
+# replicas' lag (the sync_replicas interval)
+REPLICA_PIN_SECONDS = 30
+
+DATABASE_REPLICAS = []
+for number, path in enumerate(REPLICA_DATABASE_FILES, 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'zaoapp.sqlite_backend',
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {
+            'init_command': 'PRAGMA mmap_size=268435456;PRAGMA cache_size=-20000;PRAGMA temp_store=MEMORY',
+            'pool': {'max_size': 8},
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['zaoapp.db_router.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,6 +192,24 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# One JSON line per request and WebSocket event with its time, queries, cache
+# lookups and template time (see zaoapp.instrumentation)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'zaoapp.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -131,6 +229,24 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# The app's assets live in "Static", which the app directories finder (looking
+# for "static") misses on case-sensitive file systems
+STATICFILES_DIRS = [BASE_DIR / 'zaoapp' / 'Static']
+
+STORAGES = {
+    # Media URLs carry a content hash so they can be cached for a year
+    'default': {'BACKEND': 'zaoapp.media.VersionedMediaStorage'},
+    # Content-hashed names (cached forever by WhiteNoise) plus .gz/.br copies
+    'staticfiles': {'BACKEND': 'zaoapp.staticfiles.StaticFilesStorage'},
+}
+
+# Behind nginx, set to an internal location aliased to MEDIA_ROOT (e.g.
+# '/protected-media/') so nginx sends media files itself
+MEDIA_ACCEL_REDIRECT = None
+
+# Generated staff reports, one file per catalog version. Required, and must be
+# outside MEDIA_ROOT, which is served to anyone
+REPORTS_ROOT = BASE_DIR / 'reports'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field